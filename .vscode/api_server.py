@@ -0,0 +1,334 @@
+"""JSON HTTP API over the recommenders, for services that cannot open a Tk window.
+
+  GET /health
+  GET /search?q=star&limit=20
+  GET /recommend?title=Toy+Story&n=5
+  GET /users/<userId>/recommendations?n=10
+  GET /top?n=20&genre=Comedy&min_rating=3.5
+
+Models stay loaded between requests. Concurrent /recommend and user
+requests are gathered for a few milliseconds and answered with one matrix
+operation. Responses are kept in an LRU cache that is dropped whenever the
+catalog version changes.
+"""
+
+import os
+import json
+import math
+import asyncio
+import argparse
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+import movie_repository as repo
+
+HOST = "127.0.0.1"
+PORT = 8080
+CACHE_ENTRIES = 2048
+BATCH_WAIT = 0.005       # seconds a request waits for others to share its batch
+MAX_BATCH = 64
+VERSION_POLL = 2.0       # seconds between catalog version checks
+MAX_N = 100
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def clean(value):
+    """Make Mongo/NumPy/pandas values JSON-safe: ObjectId -> str, NaN -> null."""
+    if isinstance(value, dict):
+        return {k: clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [clean(v) for v in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "item"):  # NumPy scalars
+        return clean(value.item())
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class ResponseCache:
+    """LRU of encoded responses, keyed by path and query string."""
+
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        body = self.entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        self.entries[key] = body
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class MicroBatcher:
+    """Collect concurrent calls for up to `max_wait` seconds and run them as one batch.
+
+    `fn(items)` is blocking, takes a list of items and returns one result
+    per item; it runs on a worker thread so the event loop keeps accepting.
+    """
+
+    def __init__(self, fn, max_batch=MAX_BATCH, max_wait=BATCH_WAIT):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = []
+        self.timer = None
+        self.batches = 0
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            self.batches += 1
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        try:
+            results = await asyncio.to_thread(self.fn, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class RecommendationService:
+    def __init__(self, engine=None, als_model=None):
+        if engine is None:
+            from recommend_engine import RecommenderEngine
+            engine = RecommenderEngine()
+        self.engine = engine
+        self.als = als_model
+        self.cache = ResponseCache()
+        self.title_batcher = MicroBatcher(self._recommend_titles)
+        self.user_batcher = MicroBatcher(self._recommend_users)
+        self.version = None
+        self.titles = {}
+
+    # --- Warm-up and invalidation ---
+
+    def warm_up(self):
+        self.reload()
+        if self.als is None:
+            from matrix_factorization import ALSRecommender, MF_MODEL_DIR
+            if os.path.exists(os.path.join(MF_MODEL_DIR, "meta.json")):
+                self.als = ALSRecommender().load()
+
+    def reload(self):
+        state = self.engine.ensure_current()
+        self.titles = dict(zip(state.df["movieId"], state.df["title"]))
+        self.version = state.version
+
+    async def watch_catalog(self):
+        """Reload the engine and drop cached responses when the catalog changes."""
+        while True:
+            await asyncio.sleep(VERSION_POLL)
+            try:
+                version = await asyncio.to_thread(repo.catalog_version)
+                if version != self.version:
+                    await asyncio.to_thread(self.reload)
+                    self.cache.clear()
+            except Exception as e:
+                print(f"⚠️ Catalog check failed: {e}")
+
+    # --- Batched model calls (worker thread) ---
+
+    def _recommend_titles(self, items):
+        titles = [title for title, _ in items]
+        largest = max(n for _, n in items)
+        results = self.engine.recommend_batch(titles, largest)
+        return [records[:n] for records, (_, n) in zip(results, items)]
+
+    def _recommend_users(self, items):
+        if self.als is None:
+            # No model loaded: serve what batch_recommend.py precomputed
+            return [repo.user_recommendations(user_id)[:n] for user_id, n in items]
+        largest = max(n for _, n in items)
+        results = self.als.recommend_for_users([user_id for user_id, _ in items], largest)
+        return [
+            [{"movieId": int(m), "title": self.titles.get(int(m)), "score": round(float(s), 4)}
+             for m, s in zip(movie_ids[:n], scores[:n])]
+            for (movie_ids, scores), (_, n) in zip(results, items)
+        ]
+
+    # --- Endpoints ---
+
+    async def handle(self, path, params):
+        def param(name, default=None, kind=str):
+            values = params.get(name)
+            if not values:
+                return default
+            try:
+                return kind(values[0])
+            except ValueError:
+                raise HttpError(400, f"invalid {name}: {values[0]!r}")
+
+        n = max(1, min(param("n", 10, int), MAX_N))
+
+        if path == "/health":
+            return {"status": "ok", "catalog_version": self.version, "movies": len(self.engine.df),
+                    "cache": {"entries": len(self.cache.entries), "hits": self.cache.hits,
+                              "misses": self.cache.misses},
+                    "batches": {"recommend": self.title_batcher.batches, "users": self.user_batcher.batches}}
+
+        if path == "/search":
+            text = param("q", "").strip()
+            if not text:
+                raise HttpError(400, "q is required")
+            return {"query": text, "results": await asyncio.to_thread(search, text, param("limit", 20, int))}
+
+        if path == "/recommend":
+            title = param("title", "").strip()
+            if not title:
+                raise HttpError(400, "title is required")
+            return {"title": title, "results": await self.title_batcher.submit((title, n))}
+
+        parts = path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "users" and parts[2] == "recommendations":
+            try:
+                user_id = int(parts[1])
+            except ValueError:
+                raise HttpError(400, f"invalid user id: {parts[1]!r}")
+            return {"userId": user_id, "results": await self.user_batcher.submit((user_id, n))}
+
+        if path == "/top":
+            results = await asyncio.to_thread(
+                self.engine.best_movies, n, param("genre"), param("min_rating", None, float)
+            )
+            return {"results": results}
+
+        raise HttpError(404, f"no such endpoint: {path}")
+
+    async def respond(self, method, target):
+        """(status, JSON bytes) for one request, from the cache when possible."""
+        if method != "GET":
+            return 405, json.dumps({"error": "only GET is supported"}).encode()
+        cached = self.cache.get(target)
+        if cached is not None:
+            return 200, cached
+
+        version = self.version
+        url = urlsplit(target)
+        try:
+            body = json.dumps(clean(await self.handle(url.path, parse_qs(url.query)))).encode()
+        except HttpError as e:
+            return e.status, json.dumps({"error": str(e)}).encode()
+        except Exception as e:
+            print(f"⚠️ {target} failed: {e}")
+            return 500, json.dumps({"error": str(e)}).encode()
+        # A reload during the request may have cleared the cache already; don't refill it with a stale body
+        if url.path != "/health" and version == self.version:
+            self.cache.put(target, body)
+        return 200, body
+
+    # --- HTTP/1.1 over asyncio streams ---
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0) or 0):
+                    await reader.readexactly(int(headers["content-length"]))  # bodies are ignored
+
+                status, body = await self.respond(method, target)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, ready=None):
+        await asyncio.to_thread(self.warm_up)
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        watcher = asyncio.ensure_future(self.watch_catalog())
+        address = server.sockets[0].getsockname()
+        print(f"🌐 Serving recommendations on http://{address[0]}:{address[1]}")
+        if ready is not None:
+            ready(address)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def search(text, limit=20):
+    """Title prefix search, falling back to whole words like the GUIs do."""
+    limit = max(1, min(limit, MAX_N))
+    query = repo.title_prefix_filter(text)
+    results = repo.find_page(query, limit=limit)
+    if not results:
+        try:
+            results = repo.find_page(repo.title_text_filter(text), limit=limit)
+        except Exception:
+            pass  # no text index (or a Mongo stand-in without $text): prefix results only
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP API for movie recommendations.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    repo.ensure_indexes()
+    try:
+        asyncio.run(RecommendationService().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
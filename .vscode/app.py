@@ -1,24 +1,71 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import pymongo
-import subprocess
-import os
-import csv
 from tkinter.filedialog import asksaveasfilename
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
 import poster_api
-
-from sklearn.cluster import KMeans
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.impute import SimpleImputer
-import numpy as np
+import exporter
+import thumbnails
+import movie_repository as repo
+from background import TaskRunner, status_bar
+from virtual_list import VirtualList
+import cluster_cache
+import genre_stats
+import query_cache
+from recommend_engine import engine as hybrid_engine
 
 # MongoDB setup
-client = pymongo.MongoClient("mongodb://localhost:27017/")
-db = client["movie_db"]
-collection = db["movies"]
+collection = repo.movies()
+
+# --- QUERIES (run on background threads; no Tk calls in here) ---
+def recommendation_query(genre, min_rating, title):
+    query = repo.movie_filter(genre, min_rating, title)
+    if title and collection.find_one(query, {"_id": 1}) is None:
+        # No title starts with the search; fall back to whole words anywhere in the title
+        query = repo.movie_filter(genre, min_rating)
+        query.update(repo.title_text_filter(title))
+    return query
+
+
+def find_recommendations(genre, min_rating, title):
+    """(cache key, query) for the filters; repeats skip the title fallback probe."""
+    filters = query_cache.normalize_filters(genre, min_rating, title)
+    return filters, query_cache.cached("query", recommendation_query, genre, min_rating, title, key=filters)
+
+
+def find_page(filters, query, after, sort_dir, limit):
+    after_key = None if after is None else (after.get("rating"), after["_id"])
+    return query_cache.cached("page", repo.find_page, query, after, sort_dir, limit,
+                              key=(filters, after_key, sort_dir, limit))
+
+
+def find_summary(filters, query):
+    return query_cache.cached("summary", repo.summarize, query, key=filters)
+
+
+def find_hybrid(genre, min_rating, title, n=100):
+    hybrid_engine.ensure_current()  # picks up movies added or deleted since the arrays were built
+    return query_cache.cached("hybrid", hybrid_engine.best_movies, n, genre, min_rating, title,
+                              key=(query_cache.normalize_filters(genre, min_rating, title), n))
+
+
+def format_movie(movie):
+    return f"{movie['title']} | {', '.join(movie.get('genres') or [])} | Rating: {movie.get('rating')}"
+
+
+def find_top_movies():
+    return query_cache.cached("top", top_movies)
+
+
+def top_movies():
+    return list(collection.find({}, repo.RESULT_FIELDS).sort("rating", -1).limit(5))
+
+
+def find_poster(movie, size):
+    """Decoded thumbnail of a movie's poster, or None if it has no poster."""
+    data = poster_api.get_poster(movie.get("movieId"), movie["title"])
+    return thumbnails.thumbnail(data, size) if data is not None else None
+
 
 # --- USER LOGIN DATA ---
 VALID_USERS = {
@@ -28,95 +75,115 @@ VALID_USERS = {
 
 # --- MAIN GUI ---
 def launch_main_app():
+    repo.ensure_indexes()
     root = tk.Tk()
     root.title("🎮 Movie Recommendation System")
     root.geometry("950x720")
 
-    def refresh_genres():
-        all_genres = set()
-        for movie in collection.find():
-            all_genres.update(movie.get("genres", []))
-        genre_combo['values'] = sorted(list(all_genres))
+    # Background work: queries and model fits report back through the Tk loop
+    status_frame, status_var, progress = status_bar(root)
+    status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=5)
+    tasks = TaskRunner(root, status_var=status_var, progress=progress)
 
-    def recommend_movies():
-        result_box.delete(0, tk.END)
-        genre = genre_var.get()
-        min_rating = rating_var.get()
-        query = {"rating": {"$gte": min_rating}}
+    # What the result list shows: the query behind it (None for fixed lists), for export
+    current_view = {"query": None, "sort_dir": -1}
+    export_job = [None]
 
-        if genre:
-            query["genres"] = genre
-        if title_var.get():
-            query["title"] = {"$regex": title_var.get(), "$options": "i"}
+    def on_close():
+        if export_job[0] is not None:
+            export_job[0].cancel()
+        tasks.shutdown()
+        root.destroy()
 
-        sort_dir = -1 if sort_order.get() else 1
-        results = list(collection.find(query).sort("rating", sort_dir).limit(20))
+    root.protocol("WM_DELETE_WINDOW", on_close)
 
-        if not results:
-            result_box.insert(tk.END, "No matching movies found.")
-            return
+    def show_error(error):
+        messagebox.showerror("Database Error", str(error))
 
-        for movie in results:
-            result_box.insert(tk.END, f"{movie['title']} | {', '.join(movie['genres'])} | Rating: {movie['rating']}")
-
-        avg = sum(m['rating'] for m in results) / len(results)
-        result_box.insert(tk.END, f"\nAverage Rating: {round(avg, 2)}")
-
-    def cluster_similar_movies():
-        movies = list(collection.find({}, {"title": 1, "genres": 1, "rating": 1}))
-        if not movies:
-            messagebox.showwarning("No Data", "Movie database is empty.")
-            return
-
-        movies = [m for m in movies if m.get("genres") and m.get("rating") is not None]
-        if len(movies) < 5:
-            messagebox.showwarning("Insufficient Data", "Need at least 5 movies with genre and rating.")
-            return
-
-        titles = [m["title"] for m in movies]
-        genres = [", ".join(m["genres"]) for m in movies]
-        ratings = [m["rating"] for m in movies]
-
-        vectorizer = CountVectorizer()
-        genre_matrix = vectorizer.fit_transform(genres).toarray()
-
-        scaler = MinMaxScaler()
-        ratings_scaled = scaler.fit_transform(np.array(ratings).reshape(-1, 1))
-        combined = np.hstack((genre_matrix, ratings_scaled))
-
-        imputer = SimpleImputer(strategy='mean')
-        combined_clean = imputer.fit_transform(combined)
+    def refresh_genres():
+        def done(genres):
+            genre_combo['values'] = genres
 
-        kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
-        labels = kmeans.fit_predict(combined_clean)
+        tasks.submit("genres", query_cache.cached, "genre_names", genre_stats.genre_names, on_done=done, on_error=show_error, status="Loading genres...")
 
-        selection = result_box.curselection()
-        if not selection:
-            messagebox.showwarning("No Selection", "Select a movie to find similar ones.")
+    def recommend_movies():
+        if rank_var.get() == "Hybrid":
+            recommend_hybrid()
             return
+        sort_dir = -1 if sort_order.get() else 1
+        summary_var.set("")
+        tasks.submit(
+            "results", find_recommendations, genre_var.get(), rating_var.get(), title_var.get(),
+            on_done=lambda found: show_recommendations(*found, sort_dir), on_error=show_error,
+            status="Searching movies..."
+        )
+
+    def show_recommendations(filters, query, sort_dir):
+        current_view.update(query=query, sort_dir=sort_dir)
+        # Rows arrive a page at a time as the list scrolls; the summary covers every match
+        result_box.load(lambda after, limit: find_page(filters, query, after, sort_dir, limit), format_movie)
+        tasks.submit("summary", find_summary, filters, query, on_done=show_summary, on_error=show_error,
+                     status="Counting matches...")
+
+    def recommend_hybrid():
+        # Shrunk rating + popularity + recency over in-memory arrays; one scoring pass, top 100
+        def done(movies):
+            current_view.update(query=None)
+            summary_var.set("Ranked by hybrid score (shrunk rating, popularity, recency)")
+            result_box.load(rows=movies, format_row=lambda m: f"{format_movie(m)} | Score: {m['score']:.3f}")
+            if not movies:
+                result_box.show_message("No matching movies found.")
+
+        tasks.submit("results", find_hybrid, genre_var.get(), rating_var.get(), title_var.get(),
+                     on_done=done, on_error=show_error, status="Scoring movies...")
+
+    def show_summary(summary):
+        if summary["count"]:
+            summary_var.set(f"{summary['count']:,} movies | Average Rating: {round(summary['avg'] or 0, 2)}")
+
+    def selected_movie(action):
+        movie = result_box.selected()
+        if movie is None:
+            messagebox.showwarning("No Selection", f"Select a movie to {action}.")
+        return movie
 
-        selected_title = result_box.get(selection[0]).split(" | ")[0].strip()
-        try:
-            idx = titles.index(selected_title)
-        except ValueError:
-            messagebox.showerror("Not Found", "Selected movie not found.")
+    def cluster_similar_movies():
+        movie = selected_movie("find similar ones")
+        if movie is None:
             return
 
-        selected_cluster = labels[idx]
-        similar_movies = [titles[i] for i in range(len(labels)) if labels[i] == selected_cluster and i != idx]
+        selected_title = movie["title"]
+
+        def done(outcome):
+            status, similar_movies = outcome
+            if status == "empty":
+                messagebox.showwarning("No Data", "Movie database is empty.")
+            elif status == "insufficient":
+                messagebox.showwarning("Insufficient Data", "Need at least 5 movies with genre and rating.")
+            elif status == "not_found":
+                messagebox.showerror("Not Found", "Selected movie not found.")
+            elif similar_movies:
+                messagebox.showinfo("🎯 Similar Movies", f"Movies like '{selected_title}':\n\n" + "\n".join(similar_movies))
+            else:
+                messagebox.showinfo("No Matches", f"No similar movies found for '{selected_title}'.")
 
-        if similar_movies:
-            messagebox.showinfo("🎯 Similar Movies", f"Movies like '{selected_title}':\n\n" + "\n".join(similar_movies))
-        else:
-            messagebox.showinfo("No Matches", f"No similar movies found for '{selected_title}'.")
+        tasks.submit("cluster", cluster_cache.cluster_mates, {"_id": movie["_id"]},
+                     on_done=done, on_error=show_error, status="Clustering movies...")
 
     def show_top_movies():
-        result_box.delete(0, tk.END)
-        for movie in collection.find().sort("rating", -1).limit(5):
-            result_box.insert(tk.END, f"🔥 {movie['title']} | Rating: {movie['rating']}")
+        def done(movies):
+            summary_var.set("")
+            current_view.update(query=None)
+            result_box.load(rows=movies, format_row=lambda m: f"🔥 {m['title']} | Rating: {m['rating']}")
+
+        tasks.submit("results", find_top_movies, on_done=done, on_error=show_error, status="Loading top movies...")
 
     def clear_results():
-        result_box.delete(0, tk.END)
+        tasks.cancel("results")
+        tasks.cancel("summary")
+        summary_var.set("")
+        current_view.update(query=None)
+        result_box.clear()
 
     def add_new_movie():
         title = new_title.get().strip()
@@ -131,7 +198,12 @@ def launch_main_app():
             messagebox.showerror("Input Error", "Both title and genres are required.")
             return
 
-        collection.insert_one({"title": title, "genres": genres, "rating": rating})
+        result = collection.insert_one({"movieId": repo.next_movie_id(), "title": title, "title_norm": repo.title_norm(title),
+                                        "genres": genres, "rating": rating})
+        version = repo.bump_catalog_version()
+        query_cache.results.invalidate(version)
+        cluster_cache.movie_added(result.inserted_id, genres, rating, version)
+        genre_stats.movie_added(genres, rating, version)
         messagebox.showinfo("Success", f"Movie '{title}' added successfully.")
 
         new_title.delete(0, tk.END)
@@ -145,60 +217,97 @@ def launch_main_app():
         recommend_movies()
 
     def delete_selected_movie():
-        selection = result_box.curselection()
-        if not selection:
-            messagebox.showwarning("No selection", "Please select a movie to delete.")
+        movie = selected_movie("delete")
+        if movie is None:
             return
 
-        movie_text = result_box.get(selection[0])
-        title = movie_text.split(" | ")[0].strip()
+        title = movie["title"]
 
         confirm = messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{title}'?")
         if confirm:
-            result = collection.delete_one({"title": title})
-            if result.deleted_count:
+            deleted = collection.find_one_and_delete({"_id": movie["_id"]}, projection={"genres": 1, "rating": 1})
+            if deleted:
+                version = repo.bump_catalog_version()
+                query_cache.results.invalidate(version)
+                cluster_cache.movie_deleted(version)
+                genre_stats.movie_deleted(deleted.get("genres"), deleted.get("rating"), version)
+                result_box.remove(movie["_id"])
                 messagebox.showinfo("Deleted", f"Movie '{title}' deleted successfully.")
-                recommend_movies()
                 refresh_genres()
             else:
                 messagebox.showerror("Error", "Could not delete movie.")
 
-    def export_to_csv():
-        data = result_box.get(0, tk.END)
-        if not data:
+    def export_results():
+        """Export every match of the current search, not just the rows scrolled into view."""
+        if export_job[0] is not None:
+            messagebox.showwarning("Export Running", "Wait for the current export to finish or cancel it.")
+            return
+        if current_view["query"] is None and not result_box.rows:
             messagebox.showwarning("No Data", "No recommendations to export.")
             return
 
-        file_path = asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")])
-        if file_path:
-            with open(file_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["Title", "Genres", "Rating"])
-                for line in data:
-                    parts = line.split(" | ")
-                    if len(parts) == 3:
-                        writer.writerow(parts)
-            messagebox.showinfo("Export Successful", f"Saved to {file_path}")
+        file_path = asksaveasfilename(defaultextension=".csv", filetypes=[
+            ("CSV Files", "*.csv"), ("Gzipped CSV", "*.csv.gz"), ("Parquet", "*.parquet")
+        ])
+        if not file_path:
+            return
+
+        if current_view["query"] is not None:
+            job = exporter.ExportJob(exporter.export_catalog, file_path, current_view["query"], current_view["sort_dir"])
+        else:
+            # A fixed list such as Top 5: write the cached records as they are
+            job = exporter.ExportJob(exporter.export_rows, file_path, list(result_box.rows))
+        export_job[0] = job
+        cancel_export_button.grid()
+        watch_export()
+
+    def watch_export():
+        job = export_job[0]
+        if not job.done():
+            export_var.set(f"📤 Exporting... {job.written:,} rows")
+            root.after(200, watch_export)
+            return
+
+        export_job[0] = None
+        export_var.set("")
+        cancel_export_button.grid_remove()
+        if job.error is not None:
+            messagebox.showerror("Export Failed", str(job.error))
+        elif job.result is None:
+            messagebox.showinfo("Export Cancelled", "Export cancelled; no file was written.")
+        else:
+            messagebox.showinfo("Export Successful", f"Saved {job.result:,} movies to {job.path}")
+
+    def cancel_export():
+        if export_job[0] is not None:
+            export_job[0].cancel()
 
     def show_movie_details(event):
-        selection = result_box.curselection()
-        if selection:
-            movie_text = result_box.get(selection[0])
-            title = movie_text.split(" | ")[0].strip()
-            movie = collection.find_one({"title": title})
-            if movie:
-                info = f"Title: {movie['title']}\nGenres: {', '.join(movie['genres'])}\nRating: {movie['rating']}"
-                messagebox.showinfo("Movie Details", info)
+        movie = result_box.selected()
+        if not movie:
+            return
+        info = f"Title: {movie['title']}\nGenres: {', '.join(movie.get('genres') or [])}\nRating: {movie.get('rating')}"
+
+        def done(similar):
+            # Precomputed by batch_recommend.py; empty until that job has run
+            also_liked = "\n".join(f"- {item['title']}" for item in similar[:5] if item.get("title"))
+            messagebox.showinfo("Movie Details", info + (f"\n\nViewers also liked:\n{also_liked}" if also_liked else ""))
+
+        tasks.submit("details", repo.similar_movies, movie.get("movieId"), on_done=done,
+                     on_error=lambda e: messagebox.showinfo("Movie Details", info), status="Loading details...")
 
     def draw_genre_chart():
+        tasks.submit("genre_chart", query_cache.cached, "genre_counts", genre_stats.genre_counts, on_done=show_genre_chart, on_error=show_error,
+                     status="Counting genres...")
+
+    def show_genre_chart(genre_count):
+        if not genre_count:
+            messagebox.showwarning("No Data", "No genres to chart yet.")
+            return
+
         chart_win = tk.Toplevel(root)
         chart_win.title("Genre Frequency Chart")
 
-        genre_count = {}
-        for movie in collection.find():
-            for g in movie.get("genres", []):
-                genre_count[g] = genre_count.get(g, 0) + 1
-
         sorted_genres = sorted(genre_count.items(), key=lambda x: x[1], reverse=True)[:10]
         genres, counts = zip(*sorted_genres)
 
@@ -211,17 +320,62 @@ def launch_main_app():
         canvas.draw()
         canvas.get_tk_widget().pack()
 
+    # Decoded posters stay in memory, so moving through the results re-shows them without disk reads
+    photos = thumbnails.PhotoCache()
+
+    def load_poster(movie, size, callback):
+        """Call `callback(photo or None)`, from the PhotoImage cache or after a background fetch."""
+        photo = photos.get((movie["_id"], size))
+        if photo is not None:
+            callback(photo)
+            return
+
+        def done(image):
+            callback(photos.put((movie["_id"], size), image) if image is not None else None)
+
+        tasks.submit(f"poster_{size}", find_poster, movie, size, on_done=done,
+                     on_error=lambda e: callback(None), status="Fetching poster...")
+
+    def preview_selected_poster(event=None):
+        movie = result_box.selected()
+        if movie is None:
+            return
+
+        def show(photo):
+            if result_box.selected_id() == movie["_id"]:
+                preview_label.configure(image=photo or no_poster, text="" if photo else "No poster")
+                preview_label.image = photo
+
+        load_poster(movie, "small", show)
+
     def show_selected_movie_poster():
-        selection = result_box.curselection()
-        if selection:
-            movie_text = result_box.get(selection[0])
-            title = movie_text.split(" | ")[0].strip()
-            poster_api.show_poster(title)
+        movie = selected_movie("show its poster")
+        if movie is None:
+            return
+        title = movie["title"]
+
+        def show(photo):
+            if photo is None:
+                messagebox.showinfo("No Poster", f"No poster found for '{title}'.")
+                return
+            poster_win = tk.Toplevel(root)
+            poster_win.title(title)
+            label = tk.Label(poster_win, image=photo)
+            label.image = photo  # still shown after the cache evicts it
+            label.pack()
+
+        load_poster(movie, "large", show)
 
     tk.Label(root, text="Movie Recommendation System", font=("Arial", 18, "bold")).pack(pady=10)
 
     sort_order = tk.BooleanVar(value=True)
-    tk.Checkbutton(root, text="Sort by Rating (Descending)", variable=sort_order).pack()
+    rank_frame = tk.Frame(root)
+    rank_frame.pack()
+    tk.Checkbutton(rank_frame, text="Sort by Rating (Descending)", variable=sort_order).pack(side=tk.LEFT)
+    tk.Label(rank_frame, text="Rank by:").pack(side=tk.LEFT, padx=(15, 0))
+    rank_var = tk.StringVar(value="Rating")
+    ttk.Combobox(rank_frame, textvariable=rank_var, values=["Rating", "Hybrid"], state="readonly",
+                 width=8).pack(side=tk.LEFT)
 
     filter_frame = tk.Frame(root)
     filter_frame.pack(pady=10)
@@ -239,10 +393,22 @@ def launch_main_app():
     tk.Label(filter_frame, text="Title Search:").grid(row=1, column=0, pady=10)
     title_var = tk.StringVar()
     tk.Entry(filter_frame, textvariable=title_var, width=40).grid(row=1, column=1, columnspan=3)
-
-    result_box = tk.Listbox(root, width=100, height=20)
-    result_box.pack(pady=10)
-    result_box.bind("<Double-1>", show_movie_details)
+    # Search as you type; each keystroke supersedes the previous query
+    title_var.trace_add("write", lambda *_: tasks.debounce("title_search", 300, recommend_movies))
+
+    results_frame = tk.Frame(root)
+    results_frame.pack(pady=10)
+    result_box = VirtualList(results_frame, width=100, height=20, tasks=tasks, key="result_page",
+                             empty_text="No matching movies found.", on_error=show_error)
+    result_box.pack(side=tk.LEFT)
+    no_poster = tk.PhotoImage(width=92, height=138)  # blank placeholder keeps the preview's size in pixels
+    preview_label = tk.Label(results_frame, image=no_poster, fg="gray", compound=tk.CENTER)
+    preview_label.pack(side=tk.LEFT, padx=5)
+    result_box.bind_rows("<Double-1>", show_movie_details)
+    result_box.bind_rows("<<ListboxSelect>>", preview_selected_poster)
+
+    summary_var = tk.StringVar()
+    tk.Label(root, textvariable=summary_var).pack()
 
     btn_frame = tk.Frame(root)
     btn_frame.pack(pady=5)
@@ -252,7 +418,7 @@ def launch_main_app():
         ("🔥 Top 5 Movies", show_top_movies, "green"),
         ("❌ Clear", clear_results, "red"),
         ("🗑️ Delete Movie", delete_selected_movie, "darkred"),
-        ("📤 Export CSV", export_to_csv, "gray"),
+        ("📤 Export", export_results, "gray"),
         ("📊 Genre Chart", draw_genre_chart, "teal"),
         ("🎯 Cluster Similar", cluster_similar_movies, "orange")
     ]
@@ -281,6 +447,11 @@ def launch_main_app():
     tk.Label(root, text="Double-click a movie to view details", fg="gray").pack()
 
     tk.Button(btn_frame, text="🖼️ Show Poster", command=show_selected_movie_poster, width=15, bg="purple", fg="white").grid(row=1, column=1, padx=5)
+    cancel_export_button = tk.Button(btn_frame, text="⏹️ Cancel Export", command=cancel_export, width=15, bg="gray", fg="white")
+    cancel_export_button.grid(row=1, column=2, padx=5)
+    cancel_export_button.grid_remove()  # shown while an export runs
+    export_var = tk.StringVar()
+    tk.Label(root, textvariable=export_var, fg="gray").pack()
 
     refresh_genres()
     root.mainloop()
@@ -0,0 +1,118 @@
+import queue
+import itertools
+import tkinter as tk
+from tkinter import ttk
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_MS = 30
+
+
+class TaskRunner:
+    """Run slow work (Mongo queries, model fits) off the Tk main thread.
+
+    Results are handed back through a queue that the Tk loop polls with
+    `after()`, so callbacks always run on the main thread. Tasks share a
+    `key`: submitting a new task under a key supersedes the older one. A
+    superseded task is cancelled if it has not started, and its result is
+    dropped if it has.
+
+    Threads are enough here: pymongo waits on sockets and NumPy/sklearn
+    release the GIL in their heavy loops.
+    """
+
+    def __init__(self, root, max_workers=4, status_var=None, progress=None):
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-task")
+        self.status_var = status_var
+        self.progress = progress
+        self.results = queue.Queue()
+        self.latest = {}      # key -> generation of the newest task
+        self.futures = {}     # key -> future of the newest task
+        self.running = {}     # generation -> status text
+        self.debounced = {}   # key -> pending after() id
+        self.generations = itertools.count(1)
+        self.busy = False
+        self.closed = False
+        self.root.after(POLL_MS, self._poll)
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, status="Working..."):
+        old = self.futures.get(key)
+        if old is not None:
+            old.cancel()
+
+        generation = next(self.generations)
+        self.latest[key] = generation
+        self.running[generation] = status
+        self._update_status()
+
+        future = self.pool.submit(fn, *args)
+        self.futures[key] = future
+        future.add_done_callback(
+            lambda f: self.results.put((key, generation, f, on_done, on_error))
+        )
+        return future
+
+    def cancel(self, key):
+        """Drop the pending task under `key`; its result will be ignored if it already started."""
+        future = self.futures.pop(key, None)
+        if future is not None:
+            future.cancel()
+        self.latest[key] = None
+
+    def _poll(self):
+        if self.closed:
+            return
+        while True:
+            try:
+                key, generation, future, on_done, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.running.pop(generation, None)
+            if self.latest.get(key) != generation or future.cancelled():
+                continue  # superseded by a newer request under the same key
+            self.futures.pop(key, None)
+
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    print(f"⚠️ Background task '{key}' failed: {error}")
+            elif on_done:
+                on_done(future.result())
+
+        self._update_status()
+        self.root.after(POLL_MS, self._poll)
+
+    def _update_status(self):
+        busy = bool(self.running)
+        if self.status_var is not None:
+            self.status_var.set(next(reversed(self.running.values())) if busy else "Ready")
+        if self.progress is not None and busy != self.busy:
+            if busy:
+                self.progress.start(10)
+            else:
+                self.progress.stop()
+        self.busy = busy
+
+    def debounce(self, key, delay_ms, callback):
+        """Call `callback` once input has been quiet for `delay_ms` (e.g. while typing)."""
+        pending = self.debounced.get(key)
+        if pending is not None:
+            self.root.after_cancel(pending)
+        self.debounced[key] = self.root.after(delay_ms, callback)
+
+    def shutdown(self):
+        self.closed = True
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def status_bar(parent):
+    """A 'Ready'/'Working...' label with an indeterminate progress bar."""
+    frame = tk.Frame(parent)
+    status_var = tk.StringVar(value="Ready")
+    tk.Label(frame, textvariable=status_var, fg="gray", anchor="w").pack(side=tk.LEFT, fill=tk.X, expand=True)
+    progress = ttk.Progressbar(frame, mode="indeterminate", length=150)
+    progress.pack(side=tk.RIGHT)
+    return frame, status_var, progress
@@ -0,0 +1,144 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pymongo
+
+import movie_repository as repo
+from matrix_factorization import ALSRecommender, MF_MODEL_DIR
+
+DEFAULT_N = 10
+USER_BLOCK = 2000   # users scored per matrix product
+ITEM_BLOCK = 1000   # items compared per matrix product
+
+# Per-process model, loaded once by _init_worker; the factor files are
+# memory-mapped, so every worker shares the same pages
+_model = None
+_unit_items = None
+
+
+def _init_worker(model_dir):
+    global _model, _unit_items
+    _model = ALSRecommender(model_dir).load()
+    items = np.asarray(_model.item_factors, dtype=np.float32)
+    norms = np.linalg.norm(items, axis=1, keepdims=True)
+    _unit_items = items / np.where(norms > 0, norms, 1.0)
+
+
+def user_block(start, stop, n):
+    """(userId, movieIds, predicted ratings) for users start..stop of the model."""
+    user_ids = _model.user_ids[start:stop]
+    results = _model.recommend_for_users(user_ids, n)
+    return [(int(u), items.tolist(), scores.tolist()) for u, (items, scores) in zip(user_ids, results)]
+
+
+def item_block(start, stop, n):
+    """(movieId, movieIds, cosine similarities) for items start..stop, from the ALS item factors."""
+    sims = _unit_items[start:stop] @ _unit_items.T
+    rows = np.arange(stop - start)
+    sims[rows, start + rows] = -np.inf  # a movie is not its own neighbor
+    n = min(n, sims.shape[1] - 1)
+    if n <= 0:
+        return [(int(i), [], []) for i in _model.item_ids[start:stop]]
+    top = np.argpartition(-sims, n - 1, axis=1)[:, :n]
+    top_scores = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    return [
+        (int(item_id), _model.item_ids[neighbors].tolist(), scores.tolist())
+        for item_id, neighbors, scores in zip(_model.item_ids[start:stop], top, top_scores)
+    ]
+
+
+def recommendation_ops(kind, results, titles, run):
+    ops = []
+    for key, movie_ids, scores in results:
+        items = [
+            {"movieId": int(m), "title": titles.get(int(m)), "score": round(float(s), 4)}
+            for m, s in zip(movie_ids, scores)
+        ]
+        ops.append(pymongo.UpdateOne(
+            {"_id": f"{kind}:{key}"},
+            {"$set": {"kind": kind, "key": key, "items": items, "run": run}},
+            upsert=True,
+        ))
+    return ops
+
+
+def run_blocks(pool, fn, total, block_size, n, kind, titles, run):
+    """Fan blocks out to the pool and bulk-upsert each block's results as it arrives."""
+    coll = repo.recommendations()
+    blocks = [(start, min(start + block_size, total)) for start in range(0, total, block_size)]
+    started = time.perf_counter()
+    done = 0
+    if pool is None:
+        results = (fn(start, stop, n) for start, stop in blocks)
+    else:
+        results = (f.result() for f in as_completed([pool.submit(fn, start, stop, n) for start, stop in blocks]))
+
+    for block in results:
+        ops = recommendation_ops(kind, block, titles, run)
+        if ops:
+            coll.bulk_write(ops, ordered=False)
+        done += len(block)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"   {kind}s: {done:,}/{total:,} ({done / elapsed:,.0f} {kind}s/sec)", end="\r")
+
+    # Drop lists of users/movies that are no longer in the model
+    coll.delete_many({"kind": kind, "run": {"$ne": run}})
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"\n✅ {done:,} {kind} lists in {elapsed:.1f}s ({done / elapsed:,.0f} {kind}s/sec)")
+    return done
+
+
+def run_batch(n=DEFAULT_N, model_dir=MF_MODEL_DIR, workers=None, user_block_size=USER_BLOCK,
+              item_block_size=ITEM_BLOCK, users=True, items=True):
+    """Precompute top-n picks for every user and top-n similar movies for every movie."""
+    model = ALSRecommender(model_dir).load()
+    titles = {
+        m["movieId"]: m.get("title")
+        for m in repo.movies().find({"movieId": {"$ne": None}}, {"movieId": 1, "title": 1, "_id": 0})
+    }
+    run = int(time.time())
+    workers = os.cpu_count() if workers is None else workers
+    print(f"🧮 Batch recommendations: {len(model.user_ids):,} users, {len(model.item_ids):,} movies, "
+          f"top {n}, {workers} worker(s)")
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_dir,))
+    else:
+        _init_worker(model_dir)
+    try:
+        counts = {}
+        if users:
+            counts["user"] = run_blocks(pool, user_block, len(model.user_ids), user_block_size, n, "user", titles, run)
+        if items:
+            counts["movie"] = run_blocks(pool, item_block, len(model.item_ids), item_block_size, n, "movie", titles, run)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    repo.catalog_meta().update_one(
+        {"_id": "recommendations"}, {"$set": {"run": run, "n": n, **counts}}, upsert=True
+    )
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute recommendations for every user and movie.")
+    parser.add_argument("-n", type=int, default=DEFAULT_N, help="items per list")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--user-block", type=int, default=USER_BLOCK)
+    parser.add_argument("--item-block", type=int, default=ITEM_BLOCK)
+    parser.add_argument("--skip-users", action="store_true")
+    parser.add_argument("--skip-items", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(MF_MODEL_DIR, "meta.json")):
+        parser.error("no ALS model yet; run 'python matrix_factorization.py --train' first")
+    run_batch(args.n, workers=args.workers, user_block_size=args.user_block, item_block_size=args.item_block,
+              users=not args.skip_users, items=not args.skip_items)
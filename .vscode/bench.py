@@ -0,0 +1,308 @@
+"""Reproducible benchmarks for the ingest, query, recommend, clustering and chart paths.
+
+  python bench.py --scales 10k,100k --mongomock
+  python bench.py --scales 1m,10m                 # local mongod, database movie_bench
+  python bench.py --compare bench_results/old.json bench_results/new.json
+
+Each scale generates (once, from a fixed seed) a MovieLens-shaped
+movies.csv and rating.csv under bench_data/, then runs every stage in a
+fresh process so peak RSS belongs to that scale alone. Results go to one
+JSON file per run, named after the commit, for comparing between commits.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import platform
+import resource
+import subprocess
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "bench_data")
+RESULTS_DIR = os.path.join(SCRIPT_DIR, "bench_results")
+BENCH_DB = "movie_bench"  # never the real catalog: ingest clears the collection
+
+# Scale name -> (movies, ratings); named by rating rows like the MovieLens releases
+SCALES = {
+    "10k": (1_000, 10_000),
+    "100k": (10_000, 100_000),
+    "1m": (30_000, 1_000_000),
+    "10m": (60_000, 10_000_000),
+}
+GENRES = ["Drama", "Comedy", "Thriller", "Romance", "Action", "Crime", "Horror", "Documentary",
+          "Adventure", "Sci-Fi", "Mystery", "Fantasy", "War", "Children", "Musical", "Animation",
+          "Western", "Film-Noir", "IMAX", "(no genres listed)"]
+WORDS = ["The", "Last", "Red", "Night", "City", "Love", "Dark", "Star", "Lost", "Man", "Blue", "House",
+         "Secret", "River", "King", "Little", "Dead", "Wild", "Summer", "Ghost", "Girl", "Road", "War", "Time"]
+WRITE_CHUNK = 1_000_000
+QUERIES = 200
+RECOMMENDS = 200
+SEED = 42
+
+
+# --- Synthetic data ---
+
+def generate(scale, data_dir=DATA_DIR, seed=SEED):
+    """Write movies.csv and rating.csv for `scale` unless they already exist; returns the directory."""
+    n_movies, n_ratings = SCALES[scale]
+    out = os.path.join(data_dir, scale)
+    movies_csv, ratings_csv = os.path.join(out, "movies.csv"), os.path.join(out, "rating.csv")
+    if os.path.exists(movies_csv) and os.path.exists(ratings_csv):
+        return out
+    os.makedirs(out, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+
+    # Genres: a few common ones, a long tail, one to three per movie
+    genre_p = 1.0 / np.arange(1, len(GENRES) + 1)
+    genre_p /= genre_p.sum()
+    words = rng.integers(0, len(WORDS), (n_movies, 2))
+    years = rng.integers(1920, 2016, n_movies)
+    genre_counts = rng.integers(1, 4, n_movies)
+    movies = pd.DataFrame({
+        "movieId": np.arange(1, n_movies + 1),
+        "title": [f"{WORDS[a]} {WORDS[b]} {i} ({y})" for i, ((a, b), y) in enumerate(zip(words, years), 1)],
+        "genres": ["|".join(GENRES[g] for g in sorted(set(rng.choice(len(GENRES), c, p=genre_p))))
+                   for c in genre_counts],
+    })
+    movies.to_csv(movies_csv + ".part", index=False)
+
+    # Ratings: Zipf-like movie popularity, a per-movie quality bias, half-star steps
+    popularity = 1.0 / np.arange(1, n_movies + 1) ** 0.9
+    popularity = popularity[rng.permutation(n_movies)]
+    popularity /= popularity.sum()
+    bias = rng.normal(3.5, 0.6, n_movies)
+    n_users = max(n_ratings // 100, 10)
+    with open(ratings_csv + ".part", "w", newline="") as f:
+        f.write("userId,movieId,rating,timestamp\n")
+        for start in range(0, n_ratings, WRITE_CHUNK):
+            size = min(WRITE_CHUNK, n_ratings - start)
+            movie_rows = rng.choice(n_movies, size, p=popularity)
+            stars = np.clip(np.round((bias[movie_rows] + rng.normal(0, 0.9, size)) * 2) / 2, 0.5, 5.0)
+            pd.DataFrame({
+                "userId": rng.integers(1, n_users + 1, size),
+                "movieId": movie_rows + 1,
+                "rating": stars,
+                "timestamp": rng.integers(800_000_000, 1_430_000_000, size),
+            }).to_csv(f, header=False, index=False)
+
+    os.replace(movies_csv + ".part", movies_csv)
+    os.replace(ratings_csv + ".part", ratings_csv)
+    print(f"🧪 Generated {scale}: {n_movies:,} movies, {n_ratings:,} ratings "
+          f"in {time.perf_counter() - started:.1f}s")
+    return out
+
+
+# --- Measurement ---
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def result(seconds, count=None, unit=None, latencies=None):
+    """A stage record: wall time, throughput, p50/p99 per call and the process's peak RSS so far."""
+    record = {"seconds": round(seconds, 4)}
+    if count is not None:
+        record.update(count=count, unit=unit, throughput=round(count / max(seconds, 1e-9), 1))
+    if latencies:
+        ms = np.array(latencies) * 1000
+        record.update(p50_ms=round(float(np.percentile(ms, 50)), 3), p99_ms=round(float(np.percentile(ms, 99)), 3))
+    record["peak_rss_mb"] = peak_rss_mb()
+    return record
+
+
+def timed_calls(fn, args_list):
+    """(total seconds, per-call latencies) of fn(*args) over args_list, stdout silenced."""
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for args in args_list:
+            call_started = time.perf_counter()
+            fn(*args)
+            latencies.append(time.perf_counter() - call_started)
+        total = time.perf_counter() - started
+    return total, latencies
+
+
+def timed(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        value = fn(*args)
+    return time.perf_counter() - started, value
+
+
+# --- Stages (run inside the per-scale process) ---
+
+def run_scale(scale, data_dir, use_mongomock, stages, seed=SEED):
+    import movie_repository as repo
+    if use_mongomock:
+        import mongomock
+        repo.set_client(mongomock.MongoClient())  # before the modules below grab their collections
+    import load_full_movies
+    import genre_stats
+
+    n_movies, n_ratings = SCALES[scale]
+    load_full_movies.MOVIES_CSV = os.path.join(data_dir, "movies.csv")
+    load_full_movies.RATINGS_CSV = os.path.join(data_dir, "rating.csv")
+    rng = np.random.default_rng(seed)
+    results = {}
+
+    # Ingest: the streaming loader, then the bookkeeping its CLI does afterwards
+    seconds, _ = timed(load_full_movies.load_streaming)
+    results["ingest"] = result(seconds, n_movies + n_ratings, "rows")
+    seconds, _ = timed(lambda: (repo.bump_catalog_version(), genre_stats.refresh()))
+    if not use_mongomock:
+        seconds += timed(repo.ensure_indexes)[0]  # mongomock lacks text indexes
+    results["post_ingest"] = result(seconds)
+
+    if "query" in stages:
+        # The GUI 'Recommend' button: filter, first keyset page, then the match summary
+        filters = [
+            (rng.choice(GENRES[:10]) if rng.random() < 0.7 else None,
+             float(rng.choice([0.0, 2.5, 3.0, 3.5, 4.0])),
+             f"{WORDS[rng.integers(len(WORDS))]} " if rng.random() < 0.3 else None)
+            for _ in range(QUERIES)
+        ]
+
+        def recommend_query(genre, min_rating, title):
+            query = repo.movie_filter(genre, min_rating, title)
+            repo.summarize(query)
+            return repo.find_page(query)
+
+        seconds, latencies = timed_calls(recommend_query, filters)
+        results["query"] = result(seconds, len(filters), "queries", latencies)
+        seconds, latencies = timed_calls(lambda: repo.find_page({}, sort_dir=-1, limit=5), [()] * QUERIES)
+        results["query_top5"] = result(seconds, QUERIES, "queries", latencies)
+
+    if "recommend" in stages:
+        from recommend_engine import RecommenderEngine, CONTENT_ONLY
+        index_dir = tempfile.mkdtemp(prefix="bench_index_")
+        try:
+            engine = RecommenderEngine(index_dir=index_dir)
+            seconds, _ = timed(engine.ensure_loaded)
+            results["recommend_build"] = result(seconds, len(engine.df), "movies")
+            # Built on the first content-only query; timed on its own (empty dir: nothing to reuse)
+            seconds, _ = timed(engine.neighbor_index, engine.state)
+            results["recommend_index"] = result(seconds, len(engine.df), "movies")
+            titles = engine.df["title"].sample(RECOMMENDS, replace=True, random_state=seed).tolist()
+            # Content-only weights are served from the precomputed neighbor index
+            seconds, latencies = timed_calls(engine.recommend, [(t, 10, CONTENT_ONLY) for t in titles])
+            results["recommend_query"] = result(seconds, len(titles), "queries", latencies)
+            # The default weights score every movie with HybridScorer
+            seconds, latencies = timed_calls(engine.recommend, [(t, 10) for t in titles])
+            results["recommend_hybrid"] = result(seconds, len(titles), "queries", latencies)
+        finally:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+    if "cluster" in stages:
+        import cluster_model
+        seconds, _ = timed(cluster_model.perform_clustering, 5)
+        results["cluster"] = result(seconds, n_movies, "movies")
+
+    if "charts" in stages:
+        # What visualize_data.py reads: the genre_stats pipeline and the top-10 query
+        seconds, _ = timed(genre_stats.refresh)
+        results["charts_refresh"] = result(seconds, n_movies, "movies")
+
+        def chart_reads():
+            genre_stats.genre_stats()
+            list(repo.movies().find({"rating": {"$ne": None}}, repo.TITLE_RATING_FIELDS).sort("rating", -1).limit(10))
+
+        seconds, latencies = timed_calls(chart_reads, [()] * 20)
+        results["charts_read"] = result(seconds, 20, "reads", latencies)
+
+    return {"movies": n_movies, "ratings": n_ratings, "stages": results}
+
+
+# --- Runs and comparisons ---
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(scales, use_mongomock=False, stages=("query", "recommend", "cluster", "charts"), out=None, data_dir=DATA_DIR):
+    if not use_mongomock:
+        os.environ.setdefault("MOVIE_DB_NAME", BENCH_DB)  # inherited by the per-scale processes
+    report = {
+        "commit": git_commit(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "backend": "mongomock" if use_mongomock else f"mongod ({os.environ['MOVIE_DB_NAME']})",
+        "scales": {},
+    }
+    context = multiprocessing.get_context("spawn")
+    for scale in scales:
+        scale_dir = generate(scale, data_dir)
+        print(f"⏱️  Benchmarking {scale}...")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            report["scales"][scale] = pool.submit(run_scale, scale, scale_dir, use_mongomock, stages).result()
+        for stage, record in report["scales"][scale]["stages"].items():
+            latency = f" | p50 {record['p50_ms']} ms, p99 {record['p99_ms']} ms" if "p50_ms" in record else ""
+            rate = f" | {record['throughput']:,.0f} {record['unit']}/s" if "throughput" in record else ""
+            print(f"   {stage:<17} {record['seconds']:>9.3f}s{rate}{latency} | peak {record['peak_rss_mb']} MB")
+
+    out = out or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Saved results to {out}")
+    return report
+
+
+def compare(base_path, new_path):
+    """Print each shared stage's change between two result files (negative is faster/smaller)."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"📊 {base['commit']} -> {new['commit']}")
+    for scale, scale_result in new["scales"].items():
+        base_stages = base["scales"].get(scale, {}).get("stages", {})
+        for stage, record in scale_result["stages"].items():
+            old = base_stages.get(stage)
+            if old is None:
+                continue
+            changes = []
+            for metric in ("seconds", "p50_ms", "p99_ms", "peak_rss_mb"):
+                if metric in record and old.get(metric):
+                    changes.append(f"{metric} {(record[metric] - old[metric]) / old[metric] * 100:+.1f}%")
+            print(f"   {scale:>4} {stage:<17} " + ", ".join(changes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingest, queries, recommendations, clustering and charts.")
+    parser.add_argument("--scales", default="10k", help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument("--stages", default="query,recommend,cluster,charts",
+                        help="stages after ingest (ingest always runs)")
+    parser.add_argument("--mongomock", action="store_true", help="run against an in-memory mongomock client")
+    parser.add_argument("--out", help="result file (default: bench_results/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        scales = [s.strip().lower() for s in args.scales.split(",") if s.strip()]
+        unknown = [s for s in scales if s not in SCALES]
+        if unknown:
+            parser.error(f"unknown scale(s): {', '.join(unknown)}")
+        run(scales, args.mongomock, tuple(s.strip() for s in args.stages.split(",")), args.out)
@@ -0,0 +1,74 @@
+import os
+import time
+import random
+import difflib
+
+import pandas as pd
+
+from title_index import TitleIndex
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MOVIES_CSV = os.path.join(SCRIPT_DIR, "movies.csv")
+
+
+# Queries that once resolved wrongly; None means nothing in movies.csv should match
+REGRESSIONS = [
+    ("toy story 1995", "Toy Story (1995)"),
+    ("matrix 1999", "Matrix, The (1999)"),
+    ("Matrix", "Matrix, The (1999)"),
+    ("Amelie", "Amelie (Fabuleux destin d'Amélie Poulain, Le) (2001)"),
+    ("Death Race 2000", "Death Race 2000 (1975)"),
+    ("star wars", None),
+]
+
+
+def make_queries(titles, count, seed=42):
+    """Exact titles, titles without the year, with a bare year ('heat 1995'),
+    without a MovieLens trailing article, with one typo, plus REGRESSIONS."""
+    rng = random.Random(seed)
+    queries = []
+    for title in rng.sample(titles, count):
+        kind = rng.choice(["exact", "no_year", "bare_year", "no_article", "typo"])
+        name, _, year = title.rpartition(" (")
+        if kind == "exact":
+            query = title
+        elif kind == "no_year":
+            query = name.lower()
+        elif kind == "bare_year":
+            query = f"{name.lower()} {year.rstrip(')')}"
+        elif kind == "no_article":
+            query = name.rsplit(", ", 1)[0] if name.endswith((", The", ", A", ", An")) else name
+        else:
+            pos = rng.randrange(len(title))
+            query = title[:pos] + title[pos + 1:]
+        queries.append((query, title))
+    return queries + [(query, title) for query, title in REGRESSIONS if title is None or title in titles]
+
+
+def run(label, resolve, queries):
+    hits = wrong = 0
+    started = time.perf_counter()
+    for query, expected in queries:
+        found = resolve(query)
+        if found and found[0] == expected:
+            hits += 1
+        elif expected is None and not found:
+            hits += 1
+        elif found:
+            wrong += 1
+    elapsed = time.perf_counter() - started
+    print(f"{label:>8}: {elapsed / len(queries) * 1000:8.3f} ms/query | "
+          f"{hits}/{len(queries)} resolved as intended, {wrong} to the wrong title")
+
+
+if __name__ == "__main__":
+    titles = pd.read_csv(MOVIES_CSV)["title"].drop_duplicates().tolist()
+    queries = make_queries(titles, 300)
+    print(f"📚 {len(titles)} titles, {len(queries)} queries\n")
+
+    started = time.perf_counter()
+    index = TitleIndex(titles)
+    print(f"🔨 Built title index in {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+    run("difflib", lambda q: difflib.get_close_matches(q, titles, n=1, cutoff=0.6), queries)
+    run("index", lambda q: index.match(q, n=1, cutoff=0.6), queries)
@@ -0,0 +1,129 @@
+import numpy as np
+import pymongo
+from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.impute import SimpleImputer
+
+import movie_repository as repo
+
+# The "Cluster Similar" model is fitted once and stored: centroids and feature
+# settings in cluster_models, each movie's label in its own `gui_cluster` field.
+MODEL_ID = "gui"
+N_CLUSTERS = 5
+BATCH_SIZE = 1000
+
+collection = repo.movies()
+models = repo.get_db()["cluster_models"]
+
+
+def features(genres, ratings, vocabulary, rating_min, rating_max):
+    """Genre counts plus a min-max scaled rating, matching the fitted model."""
+    vectorizer = CountVectorizer(vocabulary=vocabulary)
+    genre_matrix = vectorizer.transform([", ".join(g) for g in genres]).toarray()
+    span = (rating_max - rating_min) or 1.0
+    ratings_scaled = (np.array(ratings, dtype=float).reshape(-1, 1) - rating_min) / span
+    return np.hstack((genre_matrix, ratings_scaled))
+
+
+def fit():
+    """Cluster the whole catalog and persist labels and centroids.
+
+    Returns False if there are too few usable movies.
+    """
+    version = repo.catalog_version()
+    movies = list(collection.find({}, {"genres": 1, "rating": 1}))
+    movies = [m for m in movies if m.get("genres") and m.get("rating") is not None]
+    if len(movies) < N_CLUSTERS:
+        return False
+
+    genres = [", ".join(m["genres"]) for m in movies]
+    ratings = [m["rating"] for m in movies]
+
+    vectorizer = CountVectorizer()
+    genre_matrix = vectorizer.fit_transform(genres).toarray()
+
+    scaler = MinMaxScaler()
+    ratings_scaled = scaler.fit_transform(np.array(ratings).reshape(-1, 1))
+    combined = np.hstack((genre_matrix, ratings_scaled))
+
+    imputer = SimpleImputer(strategy='mean')
+    combined_clean = imputer.fit_transform(combined)
+
+    kmeans = KMeans(n_clusters=N_CLUSTERS, random_state=42, n_init=10)
+    labels = kmeans.fit_predict(combined_clean)
+
+    # Movies left out of the fit must not keep a label from an older model
+    collection.update_many({"gui_cluster": {"$exists": True}}, {"$unset": {"gui_cluster": ""}})
+    ops = [
+        pymongo.UpdateOne({"_id": m["_id"]}, {"$set": {"gui_cluster": int(label)}})
+        for m, label in zip(movies, labels)
+    ]
+    for i in range(0, len(ops), BATCH_SIZE):
+        collection.bulk_write(ops[i:i + BATCH_SIZE], ordered=False)
+
+    models.replace_one({"_id": MODEL_ID}, {
+        "_id": MODEL_ID,
+        "version": version,
+        "centroids": kmeans.cluster_centers_.tolist(),
+        "vocabulary": {term: int(i) for term, i in vectorizer.vocabulary_.items()},
+        "rating_min": float(scaler.data_min_[0]),
+        "rating_max": float(scaler.data_max_[0]),
+    }, upsert=True)
+    return True
+
+
+def current_model():
+    """The stored model, or None if the catalog changed since it was fitted."""
+    model = models.find_one({"_id": MODEL_ID})
+    if model and model["version"] == repo.catalog_version():
+        return model
+    return None
+
+
+def cluster_mates(movie_filter):
+    """Return (status, titles in the same cluster as the movie matching `movie_filter`).
+
+    A lookup against the stored labels; the model is only refitted when
+    the catalog changed since the last fit.
+    """
+    if current_model() is None:
+        if not collection.find_one({}, {"_id": 1}):
+            return "empty", []
+        if not fit():
+            return "insufficient", []
+
+    movie = collection.find_one(movie_filter, {"gui_cluster": 1})
+    if not movie or "gui_cluster" not in movie:
+        return "not_found", []
+
+    mates = collection.find(
+        {"gui_cluster": movie["gui_cluster"], "_id": {"$ne": movie["_id"]}}, {"title": 1, "_id": 0}
+    )
+    return "ok", [m["title"] for m in mates]
+
+
+def _advance(version):
+    """Move the model from `version - 1` to `version`. False if it was already stale."""
+    result = models.update_one({"_id": MODEL_ID, "version": version - 1}, {"$set": {"version": version}})
+    return result.modified_count == 1
+
+
+def movie_added(doc_id, genres, rating, version):
+    """Keep the model current after an insert: give the new movie its nearest
+    centroid instead of refitting. `version` is the catalog version returned
+    by repo.bump_catalog_version() for this insert."""
+    if not _advance(version):
+        return  # already stale; the next click refits anyway
+
+    if genres and rating is not None:
+        model = models.find_one({"_id": MODEL_ID})
+        x = features([genres], [rating], model["vocabulary"], model["rating_min"], model["rating_max"])
+        centroids = np.array(model["centroids"])
+        label = int(np.argmin(((centroids - x) ** 2).sum(axis=1)))
+        collection.update_one({"_id": doc_id}, {"$set": {"gui_cluster": label}})
+
+
+def movie_deleted(version):
+    """A deletion leaves the other labels valid, so the model just moves to the new version."""
+    _advance(version)
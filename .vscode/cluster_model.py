@@ -1,14 +1,29 @@
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
 from sklearn.preprocessing import MultiLabelBinarizer, StandardScaler
-from pymongo import MongoClient
+from joblib import Parallel, delayed
+from scipy import sparse
 import numpy as np
+import argparse
+import time
+import pymongo
+import movie_repository as repo
+import columnar_store
+import genre_stats
+
+collection = repo.movies()
+
+BATCH_SIZE = 10_000       # documents per cursor batch / partial_fit / bulk_write
+SWEEP_SAMPLE = 50_000     # documents sampled for the k sweep
+SILHOUETTE_SAMPLE = 5_000
 
-client = MongoClient("mongodb://localhost:27017/")
-db = client["movie_db"]
-collection = db["movies"]
 
 def perform_clustering(k=3):
-    movies = list(collection.find())
+    store = columnar_store.open_current(movies_collection=collection)
+    if store is not None:
+        movies = store.frame()[["_id", "title", "genres", "rating"]].to_dict("records")
+    else:
+        movies = list(collection.find({}, repo.LIST_FIELDS))
 
     if not movies:
         print("❌ No movies found in database.")
@@ -45,5 +60,164 @@ def perform_clustering(k=3):
 
     print(f"✅ Assigned movies to {k} clusters.")
 
+
+# =========================
+# Scalable mode
+# =========================
+
+class FeatureSpace:
+    """Sparse genre one-hot + rating features, scaled like StandardScaler.
+
+    Column statistics come from aggregation pipelines, so no pass over the
+    documents is needed in Python. Columns are divided by their standard
+    deviation but not centered: centering would densify the matrix, and
+    k-means distances do not change when every point is shifted.
+    """
+
+    def __init__(self, movies_collection):
+        totals = list(movies_collection.aggregate([
+            {"$project": {"r": {"$ifNull": ["$rating", 0.0]}}},
+            {"$group": {
+                "_id": None,
+                "n": {"$sum": 1},
+                "sum": {"$sum": "$r"},
+                "sum_sq": {"$sum": {"$multiply": ["$r", "$r"]}},
+            }}
+        ]))
+        self.count = totals[0]["n"] if totals else 0
+        genre_counts = {
+            row["_id"]: row["n"]
+            for row in movies_collection.aggregate([
+                {"$project": {"genres": genre_stats.UNIQUE_GENRES}},  # once per movie, as in transform()
+                {"$unwind": "$genres"},
+                {"$group": {"_id": "$genres", "n": {"$sum": 1}}},
+            ])
+        }
+
+        self.genres = sorted(genre_counts)
+        self.columns = {g: i for i, g in enumerate(self.genres)}
+        n = max(self.count, 1)
+        p = np.array([min(genre_counts[g] / n, 1.0) for g in self.genres])
+        genre_std = np.sqrt(p * (1 - p))
+        rating_mean = totals[0]["sum"] / n if totals else 0.0
+        rating_std = np.sqrt(max(totals[0]["sum_sq"] / n - rating_mean ** 2, 0.0)) if totals else 0.0
+        std = np.append(genre_std, rating_std)
+        self.scale = np.where(std > 0, 1.0 / np.where(std > 0, std, 1.0), 1.0)
+
+    def transform(self, movies):
+        rows, cols = [], []
+        for r, movie in enumerate(movies):
+            for genre in set(movie.get("genres") or []):
+                col = self.columns.get(genre)
+                if col is not None:
+                    rows.append(r)
+                    cols.append(col)
+        n_genres = len(self.genres)
+        ratings = np.array([m.get("rating") if m.get("rating") is not None else 0.0 for m in movies],
+                           dtype=np.float64)
+        rows.extend(range(len(movies)))
+        cols.extend([n_genres] * len(movies))
+        values = np.concatenate([np.ones(len(rows) - len(movies)), np.nan_to_num(ratings, nan=0.0)])
+        values *= self.scale[cols]
+        return sparse.csr_matrix((values, (rows, cols)), shape=(len(movies), n_genres + 1))
+
+
+def iter_batches(cursor, batch_size=BATCH_SIZE):
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _score_k(features, k, seed=42):
+    model = MiniBatchKMeans(n_clusters=k, random_state=seed, batch_size=4096, n_init=3)
+    labels = model.fit_predict(features)
+    if len(set(labels)) < 2:
+        return k, -1.0
+    sample = min(SILHOUETTE_SAMPLE, features.shape[0])
+    return k, float(silhouette_score(features, labels, sample_size=sample, random_state=seed))
+
+
+def select_k(space, k_values, sample_size=SWEEP_SAMPLE, n_jobs=-1):
+    """Pick k by silhouette score on a random sample, fitting every candidate in parallel."""
+    sample = list(collection.aggregate([
+        {"$sample": {"size": sample_size}},
+        {"$project": {"genres": 1, "rating": 1}},
+    ]))
+    k_values = [k for k in k_values if 2 <= k < len(sample)]
+    if not k_values:
+        return None
+
+    features = space.transform(sample)
+    scores = Parallel(n_jobs=n_jobs)(delayed(_score_k)(features, k) for k in k_values)
+    for k, score in scores:
+        print(f"   k={k:2d}: silhouette {score:.3f}")
+    return max(scores, key=lambda s: s[1])[0]
+
+
+def perform_clustering_scalable(k=None, k_values=range(2, 13), batch_size=BATCH_SIZE, epochs=1, n_jobs=-1):
+    """Cluster with MiniBatchKMeans in bounded memory.
+
+    Documents stream from the cursor in batches for partial_fit, then a
+    second pass predicts labels and writes them with one bulk_write per
+    batch (one update_many per cluster). Without `k`, a parallel
+    silhouette sweep over `k_values` on a sample picks it.
+    """
+    started = time.perf_counter()
+    space = FeatureSpace(collection)
+    if not space.count:
+        print("❌ No movies found in database.")
+        return
+
+    if k is None:
+        print(f"🔍 Choosing k from {list(k_values)} on a {min(SWEEP_SAMPLE, space.count)}-movie sample")
+        k = select_k(space, k_values, n_jobs=n_jobs)
+        if k is None:
+            print("❌ Not enough movies to choose k.")
+            return
+        print(f"✅ Chose k={k}")
+
+    model = MiniBatchKMeans(n_clusters=k, random_state=42, batch_size=batch_size)
+    fields = {"genres": 1, "rating": 1}
+    for epoch in range(epochs):
+        seen = 0
+        for batch in iter_batches(collection.find({}, fields, batch_size=batch_size), batch_size):
+            seen += len(batch)
+            if len(batch) < k and not hasattr(model, "cluster_centers_"):
+                batch = batch * (k // len(batch) + 1)  # the first partial_fit needs >= k samples
+            model.partial_fit(space.transform(batch))
+        print(f"   epoch {epoch + 1}: fitted {seen:,} movies ({time.perf_counter() - started:.1f}s)")
+
+    written = 0
+    for batch in iter_batches(collection.find({}, fields, batch_size=batch_size), batch_size):
+        labels = model.predict(space.transform(batch))
+        ids = np.array([m["_id"] for m in batch], dtype=object)
+        collection.bulk_write([
+            pymongo.UpdateMany({"_id": {"$in": ids[labels == label].tolist()}}, {"$set": {"cluster": int(label)}})
+            for label in np.unique(labels)
+        ], ordered=False)
+        written += len(batch)
+
+    print(f"✅ Assigned {written:,} movies to {k} clusters in {time.perf_counter() - started:.1f}s.")
+
+
 if __name__ == "__main__":
-    perform_clustering(k=4)
+    parser = argparse.ArgumentParser(description="Cluster movies by genre and rating.")
+    parser.add_argument("--mode", choices=["full", "scalable"], default="full",
+                        help="full: in-memory KMeans; scalable: streamed MiniBatchKMeans")
+    parser.add_argument("--k", type=int, default=None,
+                        help="number of clusters (full mode defaults to 4; scalable mode sweeps if omitted)")
+    parser.add_argument("--k-min", type=int, default=2, help="smallest k in the sweep")
+    parser.add_argument("--k-max", type=int, default=12, help="largest k in the sweep")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel jobs for the sweep (-1 = all cores)")
+    args = parser.parse_args()
+
+    if args.mode == "scalable":
+        perform_clustering_scalable(args.k, range(args.k_min, args.k_max + 1), args.batch_size, n_jobs=args.jobs)
+    else:
+        perform_clustering(k=args.k or 4)
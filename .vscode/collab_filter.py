@@ -0,0 +1,169 @@
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from recommend_engine import build_neighbor_index, BLOCK_SIZE
+from title_index import TitleIndex
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MOVIES_CSV = os.path.join(SCRIPT_DIR, "movies.csv")
+RATINGS_CSV = os.path.join(SCRIPT_DIR, "rating.csv")
+CF_INDEX_DIR = os.path.join(SCRIPT_DIR, "cf_index")
+
+DEFAULT_TOP_K = 50
+MIN_ITEM_RATINGS = 5  # items with fewer ratings give noisy similarities
+
+
+def load_ratings(path=None):
+    """Read (userId, movieId, rating) with compact dtypes."""
+    path = RATINGS_CSV if path is None else path
+    return pd.read_csv(
+        path,
+        usecols=["userId", "movieId", "rating"],
+        dtype={"userId": np.int32, "movieId": np.int32, "rating": np.float32},
+    )
+
+
+def build_user_item_matrix(ratings, min_item_ratings=MIN_ITEM_RATINGS):
+    """CSR user x item matrix of user-mean-centered ratings.
+
+    Returns the matrix plus the movieId of every column.
+    """
+    counts = ratings["movieId"].value_counts()
+    ratings = ratings[ratings["movieId"].isin(counts.index[counts >= min_item_ratings])]
+
+    user_codes, _ = pd.factorize(ratings["userId"])
+    item_codes, item_ids = pd.factorize(ratings["movieId"], sort=True)
+
+    values = ratings["rating"].to_numpy(dtype=np.float32)
+    user_means = np.bincount(user_codes, weights=values) / np.bincount(user_codes)
+    centered = values - user_means[user_codes].astype(np.float32)
+
+    matrix = sparse.csr_matrix(
+        (centered, (user_codes, item_codes)),
+        shape=(user_codes.max() + 1 if len(user_codes) else 0, len(item_ids)),
+        dtype=np.float32,
+    )
+    matrix.eliminate_zeros()  # a rating equal to the user's mean carries no signal
+    return matrix, np.asarray(item_ids, dtype=np.int32)
+
+
+def build_item_neighbors(user_item, k=DEFAULT_TOP_K, block_size=BLOCK_SIZE):
+    """Adjusted-cosine top-k neighbors per item, computed in blocks of sparse products."""
+    item_vectors = normalize(user_item.T.tocsr(), norm="l2", axis=1)
+    return build_neighbor_index(item_vectors, k=k, block_size=block_size)
+
+
+class ItemItemRecommender:
+    """'Users who liked X also liked' recommendations from rating.csv."""
+
+    def __init__(self, index_dir=CF_INDEX_DIR, movies_csv=None):
+        self.index_dir = index_dir
+        self.movies_csv = MOVIES_CSV if movies_csv is None else movies_csv
+        self.item_ids = None
+        self.item_counts = None
+        self.neighbors = None
+        self.scores = None
+        self.positions = None
+        self.movies = None
+        self.title_index = None
+
+    def fit(self, ratings_csv=None, k=DEFAULT_TOP_K, min_item_ratings=MIN_ITEM_RATINGS):
+        started = time.perf_counter()
+        ratings = load_ratings(ratings_csv)
+        user_item, self.item_ids = build_user_item_matrix(ratings, min_item_ratings)
+        self.item_counts = ratings["movieId"].value_counts().reindex(self.item_ids).to_numpy(dtype=np.int64)
+        print(f"✅ Built {user_item.shape[0]} x {user_item.shape[1]} rating matrix "
+              f"({user_item.nnz:,} ratings) in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        self.neighbors, self.scores = build_item_neighbors(user_item, k=k)
+        print(f"✅ Computed top-{self.neighbors.shape[1]} item neighbors in {time.perf_counter() - started:.1f}s")
+        self._index_items()
+        return self
+
+    def save(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        np.save(os.path.join(self.index_dir, "item_ids.npy"), self.item_ids)
+        np.save(os.path.join(self.index_dir, "item_counts.npy"), self.item_counts)
+        np.save(os.path.join(self.index_dir, "neighbors.npy"), self.neighbors)
+        np.save(os.path.join(self.index_dir, "scores.npy"), self.scores)
+
+    def load(self):
+        self.item_ids = np.load(os.path.join(self.index_dir, "item_ids.npy"))
+        counts_path = os.path.join(self.index_dir, "item_counts.npy")
+        # Indexes saved before counts were kept: duplicate titles fall back to the lowest movieId
+        self.item_counts = np.load(counts_path) if os.path.exists(counts_path) else np.zeros(len(self.item_ids))
+        self.neighbors = np.load(os.path.join(self.index_dir, "neighbors.npy"), mmap_mode="r")
+        self.scores = np.load(os.path.join(self.index_dir, "scores.npy"), mmap_mode="r")
+        self._index_items()
+        return self
+
+    def _index_items(self):
+        self.positions = pd.Series(np.arange(len(self.item_ids)), index=self.item_ids)
+        movies = pd.read_csv(self.movies_csv, dtype={"movieId": np.int32})
+        self.movies = movies.set_index("movieId")
+        rated = self.movies.loc[self.movies.index.intersection(self.item_ids)]
+        # A title listed under several movieIds resolves to its most-rated one
+        counts = pd.Series(self.item_counts, index=self.item_ids).reindex(rated.index)
+        rated = rated.assign(count=counts.to_numpy()).sort_values("count", ascending=False, kind="stable")
+        rated = rated[~rated["title"].duplicated()]
+        self.title_index = TitleIndex(rated["title"])
+        self._title_to_id = pd.Series(rated.index, index=rated["title"])
+
+    def similar_items(self, movie_id, n=10):
+        """(movieIds, scores) of the items most similar to `movie_id`."""
+        pos = self.positions.get(movie_id)
+        if pos is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        neighbors = np.asarray(self.neighbors[pos, :n])
+        scores = np.asarray(self.scores[pos, :n])
+        keep = scores > 0  # negative adjusted cosine means "liked by different people"
+        return self.item_ids[neighbors[keep]], scores[keep]
+
+    def recommend(self, title, top_n=5):
+        closest = self.title_index.match(title, n=1, cutoff=0.6)
+        if not closest:
+            print(f"❌ No rated movie found for '{title}'.")
+            return []
+
+        matched_title = closest[0]
+        print(f"✅ Using closest match: '{matched_title}'")
+        # Rated movies missing from movies.csv have no title to show: skip them, keep top_n
+        movie_ids, scores = self.similar_items(int(self._title_to_id[matched_title]), self.neighbors.shape[1])
+        listed = np.isin(movie_ids, self.movies.index.to_numpy())
+        movie_ids, scores = movie_ids[listed][:top_n], scores[listed][:top_n]
+
+        rows = self.movies.loc[movie_ids]
+        return [
+            {"title": t, "genres": g.split("|") if g else [], "score": round(float(s), 3)}
+            for t, g, s in zip(rows["title"], rows["genres"].fillna(""), scores)
+        ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Item-item collaborative filtering over rating.csv.")
+    parser.add_argument("title", nargs="?", help="movie to find 'also liked' titles for")
+    parser.add_argument("--build", action="store_true", help="rebuild the item neighbor index from rating.csv")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="neighbors kept per item")
+    parser.add_argument("--min-ratings", type=int, default=MIN_ITEM_RATINGS,
+                        help="skip items with fewer ratings than this")
+    parser.add_argument("-n", type=int, default=5, help="recommendations to show")
+    args = parser.parse_args()
+
+    recommender = ItemItemRecommender()
+    if args.build or not os.path.exists(os.path.join(CF_INDEX_DIR, "neighbors.npy")):
+        recommender.fit(k=args.top_k, min_item_ratings=args.min_ratings).save()
+        print(f"💾 Saved item neighbor index to {CF_INDEX_DIR}")
+    else:
+        recommender.load()
+
+    if args.title:
+        print(f"\n🎯 Users who liked '{args.title}' also liked:")
+        for r in recommender.recommend(args.title, args.n):
+            print(f"- {r['title']} | Genres: {', '.join(r['genres'])} | Similarity: {r['score']}")
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import shutil
+import argparse
+from array import array
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+
+import movie_repository as repo
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_DIR = os.path.join(SCRIPT_DIR, "movie_snapshot")
+SNAPSHOT_FIELDS = {**repo.MODEL_FIELDS, "rating_sum": 1, "rating_count": 1}
+
+# MongoDB stays the source of truth; the snapshot is a read-only copy of one collection
+
+
+def export_snapshot(movies_collection=None, out_dir=SNAPSHOT_DIR, batch_size=10_000):
+    """Stream the movies collection into a columnar snapshot directory.
+
+    Layout (all little-endian, one row per movie unless noted):
+      ids.npy            S24      hex ObjectId, to get back to the Mongo document
+      movie_ids.npy      int32    MovieLens movieId, -1 if missing
+      title_offsets.npy  int64    N + 1 byte offsets into title_blob.bin
+      title_blob.bin     uint8    UTF-8 titles back to back
+      genre_offsets.npy  int64    N + 1 offsets into genre_codes.npy
+      genre_codes.npy    int32    genre of each (movie, genre) pair, an index into genres.json
+      ratings.npy        float32  NaN if unrated
+      rating_sums.npy    float64  sum of the movie's ratings, NaN if not stored
+      rating_counts.npy  float64  number of ratings, NaN if not stored
+      meta.json                   row count, and the source (repo.source) and catalog version
+                                  the snapshot was taken from
+
+    Columns are built in compact arrays while the cursor streams, and the new
+    snapshot replaces the old one only once it is complete.
+    """
+    movies_collection = repo.movies() if movies_collection is None else movies_collection
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    ids, movie_ids, ratings = [], array("i"), array("f")
+    rating_sums, rating_counts = array("d"), array("d")
+    offsets, genre_offsets, genre_codes = array("q", [0]), array("q", [0]), array("i")
+    genre_codes_by_name = {}
+    # Read first: writes during the export make the snapshot stale, not wrong
+    version = repo.catalog_version(movies_collection.database)
+    started = time.perf_counter()
+
+    cursor = movies_collection.find({}, SNAPSHOT_FIELDS, batch_size=batch_size)
+    with open(os.path.join(tmp_dir, "title_blob.bin"), "wb") as blob:
+        for movie in cursor:
+            encoded = str(movie.get("title", "")).encode("utf-8")
+            blob.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+
+            for genre in dict.fromkeys(movie.get("genres") or []):
+                genre_codes.append(genre_codes_by_name.setdefault(genre, len(genre_codes_by_name)))
+            genre_offsets.append(len(genre_codes))
+
+            rating = movie.get("rating")
+            ratings.append(float("nan") if rating is None else float(rating))
+            for column, field in ((rating_sums, "rating_sum"), (rating_counts, "rating_count")):
+                value = movie.get(field)
+                column.append(float("nan") if value is None else float(value))
+            movie_id = movie.get("movieId")
+            movie_ids.append(-1 if movie_id is None else int(movie_id))
+            ids.append(str(movie["_id"]))
+
+    np.save(os.path.join(tmp_dir, "ids.npy"), np.array(ids, dtype="S24"))
+    np.save(os.path.join(tmp_dir, "movie_ids.npy"), np.frombuffer(movie_ids, dtype=np.int32))
+    np.save(os.path.join(tmp_dir, "title_offsets.npy"), np.frombuffer(offsets, dtype=np.int64))
+    np.save(os.path.join(tmp_dir, "genre_offsets.npy"), np.frombuffer(genre_offsets, dtype=np.int64))
+    np.save(os.path.join(tmp_dir, "genre_codes.npy"), np.frombuffer(genre_codes, dtype=np.int32))
+    np.save(os.path.join(tmp_dir, "ratings.npy"), np.frombuffer(ratings, dtype=np.float32))
+    np.save(os.path.join(tmp_dir, "rating_sums.npy"), np.frombuffer(rating_sums, dtype=np.float64))
+    np.save(os.path.join(tmp_dir, "rating_counts.npy"), np.frombuffer(rating_counts, dtype=np.float64))
+    with open(os.path.join(tmp_dir, "genres.json"), "w") as f:
+        json.dump(sorted(genre_codes_by_name, key=genre_codes_by_name.get), f)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({"count": len(ids), "version": version, "source": repo.source(movies_collection),
+                   "created_at": time.time()}, f)
+
+    # Swap in the finished snapshot
+    old_dir = out_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"✅ Exported {len(ids)} movies to {out_dir} in {time.perf_counter() - started:.1f}s")
+    return len(ids)
+
+
+class ColumnarStore:
+    """Read-only, memory-mapped view of a movie snapshot.
+
+    Opening costs a handful of mmap calls; pages are loaded on demand and
+    shared between every process that maps the same files.
+    """
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        def path(name):
+            return os.path.join(snapshot_dir, name)
+
+        self.snapshot_dir = snapshot_dir
+        self.ids = np.load(path("ids.npy"), mmap_mode="r")
+        self.movie_ids = np.load(path("movie_ids.npy"), mmap_mode="r")
+        self.title_offsets = np.load(path("title_offsets.npy"), mmap_mode="r")
+        self.genre_offsets = np.load(path("genre_offsets.npy"), mmap_mode="r")
+        self.genre_codes = np.load(path("genre_codes.npy"), mmap_mode="r")
+        self.ratings = np.load(path("ratings.npy"), mmap_mode="r")
+        self.rating_sums = np.load(path("rating_sums.npy"), mmap_mode="r")
+        self.rating_counts = np.load(path("rating_counts.npy"), mmap_mode="r")
+        if self.title_offsets[-1]:
+            self.title_blob = np.memmap(path("title_blob.bin"), dtype=np.uint8, mode="r")
+        else:
+            self.title_blob = np.empty(0, dtype=np.uint8)  # mmap cannot map an empty file
+        with open(path("genres.json")) as f:
+            self.genre_names = json.load(f)
+        with open(path("meta.json")) as f:
+            meta = json.load(f)
+        self.version = meta.get("version")
+        self.source = meta.get("source")
+        self.genre_index = {name: i for i, name in enumerate(self.genre_names)}
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def title(self, i):
+        start, stop = self.title_offsets[i], self.title_offsets[i + 1]
+        return self.title_blob[start:stop].tobytes().decode("utf-8")
+
+    def titles(self, rows=None):
+        if rows is not None:
+            return [self.title(int(i)) for i in rows]
+        data = self.title_blob.tobytes()
+        bounds = self.title_offsets.tolist()
+        return [data[a:b].decode("utf-8") for a, b in zip(bounds, bounds[1:])]
+
+    def genres(self, i):
+        start, stop = self.genre_offsets[i], self.genre_offsets[i + 1]
+        return [self.genre_names[c] for c in self.genre_codes[start:stop]]
+
+    def genre_lists(self):
+        """Every movie's genre list, split out of the flat code column in one pass."""
+        if not len(self):
+            return []
+        names = np.array(self.genre_names, dtype=object)
+        return [list(g) for g in np.split(names[self.genre_codes], self.genre_offsets[1:-1])]
+
+    def _pair_rows(self):
+        """Row number of every (movie, genre) pair in genre_codes."""
+        return np.repeat(np.arange(len(self)), np.diff(self.genre_offsets))
+
+    def genre_rows(self, genre):
+        """Boolean mask of the movies tagged with `genre`."""
+        code = self.genre_index.get(genre)
+        keep = np.zeros(len(self), dtype=bool)
+        if code is not None:
+            keep[self._pair_rows()[np.asarray(self.genre_codes) == code]] = True
+        return keep
+
+    def genre_counts(self):
+        """{genre: movie count} from one bincount over the genre codes."""
+        counts = np.bincount(self.genre_codes, minlength=len(self.genre_names))
+        return {name: int(count) for name, count in zip(self.genre_names, counts)}
+
+    def genre_stats(self):
+        """[{genre, count, rated, avg_rating}] like genre_stats.genre_stats(), most common genre first."""
+        ratings = np.asarray(self.ratings, dtype=np.float64)[self._pair_rows()]
+        rated = ~np.isnan(ratings)
+        size = len(self.genre_names)
+        counts = np.bincount(self.genre_codes, minlength=size)
+        rated_counts = np.bincount(self.genre_codes[rated], minlength=size)
+        sums = np.bincount(self.genre_codes[rated], weights=ratings[rated], minlength=size)
+        rows = [
+            {"genre": name, "count": int(count), "rated": int(n_rated),
+             "avg_rating": float(total / n_rated) if n_rated else None}
+            for name, count, n_rated, total in zip(self.genre_names, counts, rated_counts, sums)
+            if count > 0
+        ]
+        return sorted(rows, key=lambda row: (-row["count"], row["genre"]))
+
+    def top_rated(self, n=10, genre=None, min_rating=None):
+        """Row numbers of the best rated movies, optionally filtered."""
+        if n <= 0:
+            return np.empty(0, dtype=np.int64)
+        ratings = np.where(np.isnan(self.ratings), -np.inf, self.ratings)
+        keep = np.isfinite(ratings)
+        if genre:
+            keep &= self.genre_rows(genre)
+        if min_rating is not None:
+            keep &= ratings >= min_rating
+        rows = np.flatnonzero(keep)
+        if len(rows) > n:
+            rows = rows[np.argpartition(-ratings[rows], n - 1)[:n]]
+            rows.sort()
+        return rows[np.argsort(-ratings[rows], kind="stable")]
+
+    def records(self, rows=None):
+        """Movie dicts shaped like the Mongo documents, for code that expects them."""
+        rows = range(len(self)) if rows is None else rows
+        return [
+            {
+                "_id": ObjectId(self.ids[i].decode()),
+                "movieId": int(self.movie_ids[i]) if self.movie_ids[i] >= 0 else None,
+                "title": self.title(i),
+                "genres": self.genres(i),
+                "rating": None if np.isnan(self.ratings[i]) else round(float(self.ratings[i]), 2),
+            }
+            for i in map(int, rows)
+        ]
+
+    def frame(self):
+        """DataFrame shaped like a find() with SNAPSHOT_FIELDS, assembled column by column."""
+        movie_ids = np.asarray(self.movie_ids, dtype=np.int64)
+        if (movie_ids < 0).any():
+            movie_ids = np.where(movie_ids >= 0, movie_ids, np.nan)  # as pandas reads documents missing it
+        return pd.DataFrame({
+            "_id": [ObjectId(i) for i in np.char.decode(np.asarray(self.ids), "ascii")],
+            "movieId": movie_ids,
+            "title": self.titles(),
+            "genres": self.genre_lists(),
+            "rating": np.round(np.asarray(self.ratings, dtype=np.float64), 2),
+            "rating_sum": np.asarray(self.rating_sums),
+            "rating_count": np.asarray(self.rating_counts),
+        })
+
+
+def open_current(snapshot_dir=SNAPSHOT_DIR, movies_collection=None):
+    """The snapshot if it exists, was taken from `movies_collection` (default: the
+    configured catalog) and matches its catalog version, else None (read from Mongo instead)."""
+    try:
+        store = ColumnarStore(snapshot_dir)
+    except (FileNotFoundError, ValueError):
+        return None  # missing, or written by an older layout
+    movies_collection = repo.movies() if movies_collection is None else movies_collection
+    # Versions are counted per database: another database at the same version is another catalog
+    if store.source != repo.source(movies_collection):
+        return None
+    if store.version is None or store.version != repo.catalog_version(movies_collection.database):
+        return None
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar, memory-mapped snapshot of the movies collection.")
+    parser.add_argument("--export", action="store_true",
+                        help="rebuild the snapshot from MongoDB (readers ignore it once the catalog changes)")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="snapshot directory")
+    args = parser.parse_args()
+
+    if args.export:
+        export_snapshot(out_dir=args.dir)
+
+    started = time.perf_counter()
+    store = ColumnarStore(args.dir)
+    print(f"📂 Opened {len(store)} movies in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print("🔥 Top rated:")
+    for row in store.records(store.top_rated(5)):
+        print(f"- {row['title']} | Rating: {row['rating']}")
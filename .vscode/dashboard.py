@@ -2,94 +2,121 @@
 
 import tkinter as tk
 from tkinter import messagebox
-import pymongo
+import movie_repository as repo
+from virtual_list import VirtualList
+import personalize
 
 # MongoDB Setup
-client = pymongo.MongoClient("mongodb://localhost:27017/")
-db = client["movie_db"]
-movies_col = db["movies"]
-likes_col = db["user_likes"]
-tags_col = db["user_tags"]
+movies_col = repo.movies()
+repo.ensure_indexes()
 
 CURRENT_USER = "user_01"
 
 root = tk.Tk()
 root.title("🎬 Movie Dashboard with Tags")
-root.geometry("850x650")
+root.geometry("850x850")
 
 # ----------- Functions -----------
 
 def search_movies():
-    result_listbox.delete(0, tk.END)
     title = search_var.get().strip()
 
     if not title:
+        result_listbox.clear()
         messagebox.showwarning("Empty Search", "Please enter a movie title.")
         return
 
-    results = list(movies_col.find({"title": {"$regex": title, "$options": "i"}}))
-
-    if not results:
-        result_listbox.insert(tk.END, "No movies found.")
+    query = repo.title_prefix_filter(title)
+    if movies_col.find_one(query, {"_id": 1}) is None:
+        # No title starts with the search; fall back to whole words anywhere in the title
+        query = repo.title_text_filter(title)
+
+    # Best rated first, one page at a time as the list scrolls
+    result_listbox.load(
+        lambda after, limit: repo.find_page(query, after, -1, limit),
+        lambda movie: f"{movie['title']} | Rating: {movie.get('rating')}",
+    )
+
+def show_user_picks():
+    try:
+        user_id = int(picks_user_var.get())
+    except ValueError:
+        messagebox.showwarning("User ID", "Enter a numeric MovieLens user id.")
         return
 
-    for movie in results:
-        result_listbox.insert(tk.END, f"{movie['title']} | Rating: {movie['rating']}")
+    # One _id lookup of the list batch_recommend.py precomputed for this user
+    items = repo.user_recommendations(user_id)
+    if not items:
+        result_listbox.show_message("No precomputed picks for this user. Run batch_recommend.py first.")
+        return
+    # Rows are keyed by movieId here: the list carries everything shown, with no per-movie query
+    rows = [{"_id": item["movieId"], "movieId": item["movieId"], "title": item["title"], "score": item["score"]}
+            for item in items]
+    result_listbox.load(rows=rows, format_row=lambda m: f"{m['title']} | Predicted: {m['score']:.2f}")
 
 def like_selected_movie():
-    title = get_selected_title()
-    if not title:
+    movie = get_selected_movie()
+    if movie is None:
         return
 
-    if likes_col.find_one({"user": CURRENT_USER, "title": title}):
+    if not personalize.like(CURRENT_USER, movie):
         messagebox.showinfo("Already Liked", "You already liked this movie.")
         return
 
-    likes_col.insert_one({"user": CURRENT_USER, "title": title})
-    messagebox.showinfo("Liked", f"You liked '{title}'.")
-    refresh_like_history()
+    like_listbox.insert(tk.END, movie["title"])  # no need to refetch the whole history
+    messagebox.showinfo("Liked", f"You liked '{movie['title']}'.")
+    show_recommended()
 
-def get_selected_title():
-    selection = result_listbox.curselection()
-    if not selection:
+def get_selected_movie():
+    """The selected result's record, straight from the list; no query and no text parsing."""
+    movie = result_listbox.selected()
+    if movie is None:
         messagebox.showwarning("No selection", "Select a movie first.")
+    elif movie.get("movieId") is None:
+        messagebox.showwarning("No movieId", "This movie has no movieId, so it cannot be liked or tagged.")
         return None
-
-    movie_text = result_listbox.get(selection[0])
-    return movie_text.split(" | ")[0].strip()
+    return movie
 
 def refresh_like_history():
     like_listbox.delete(0, tk.END)
-    liked = likes_col.find({"user": CURRENT_USER})
-    for entry in liked:
+    for entry in personalize.liked(CURRENT_USER):
         like_listbox.insert(tk.END, entry["title"])
 
 def tag_movie(tag):
-    title = get_selected_title()
-    if not title:
+    movie = get_selected_movie()
+    if movie is None:
         return
 
-    existing = tags_col.find_one({"user": CURRENT_USER, "title": title})
-    if existing:
-        tags_col.update_one(
-            {"user": CURRENT_USER, "title": title},
-            {"$set": {"tag": tag}}
-        )
-    else:
-        tags_col.insert_one({"user": CURRENT_USER, "title": title, "tag": tag})
+    personalize.tag(CURRENT_USER, movie, tag)
+    # Move the title between the two lists in place
+    for name, listbox in tag_listboxes.items():
+        titles = listbox.get(0, tk.END)
+        if movie["title"] in titles:
+            listbox.delete(titles.index(movie["title"]))
+    tag_listboxes[tag].insert(tk.END, movie["title"])
 
-    messagebox.showinfo("Tagged", f"'{title}' tagged as {tag.capitalize()}.")
-    show_tags()
+    messagebox.showinfo("Tagged", f"'{movie['title']}' tagged as {tag.capitalize()}.")
+    if tag == "watched":
+        show_recommended()
 
 def show_tags():
-    watched_listbox.delete(0, tk.END)
-    towatch_listbox.delete(0, tk.END)
+    for listbox in tag_listboxes.values():
+        listbox.delete(0, tk.END)
 
-    for tag in tags_col.find({"user": CURRENT_USER}):
-        if tag["tag"] == "watched":
-            watched_listbox.insert(tk.END, tag["title"])
-        elif tag["tag"] == "to_watch":
-            towatch_listbox.insert(tk.END, tag["title"])
+    for entry in personalize.tagged(CURRENT_USER):
+        listbox = tag_listboxes.get(entry["tag"])
+        if listbox is not None:
+            listbox.insert(tk.END, entry["title"])
+
+def show_recommended():
+    if personalize.get_item_vectors() is None:
+        recommended_listbox.show_message("Train the ALS model (matrix_factorization.py --train) for recommendations.")
+        return
+    movies = personalize.recommended_for(CURRENT_USER)
+    if not movies:
+        recommended_listbox.show_message("Like a few movies to get recommendations.")
+        return
+    recommended_listbox.load(rows=movies, format_row=lambda m: f"{m['title']} | Match: {m['score']:.2f}")
 
 # ----------- Layout -----------
 
@@ -102,9 +129,17 @@ search_var = tk.StringVar()
 tk.Entry(search_frame, textvariable=search_var, width=60).pack(side=tk.LEFT, padx=10)
 tk.Button(search_frame, text="Search", command=search_movies, bg="blue", fg="white").pack(side=tk.LEFT)
 
+picks_frame = tk.Frame(root)
+picks_frame.pack(pady=5)
+tk.Label(picks_frame, text="MovieLens user id:").pack(side=tk.LEFT)
+picks_user_var = tk.StringVar()
+tk.Entry(picks_frame, textvariable=picks_user_var, width=10).pack(side=tk.LEFT, padx=5)
+tk.Button(picks_frame, text="🎯 Top Picks", command=show_user_picks, bg="teal", fg="white").pack(side=tk.LEFT)
+
 # Results
 tk.Label(root, text="Results:").pack(pady=5)
-result_listbox = tk.Listbox(root, width=100, height=10)
+result_listbox = VirtualList(root, width=100, height=10, empty_text="No movies found.",
+                             on_error=lambda e: messagebox.showerror("Database Error", str(e)))
 result_listbox.pack()
 
 # Action Buttons
@@ -134,11 +169,19 @@ tk.Label(tags_frame, text="📺 To Watch").grid(row=0, column=1)
 towatch_listbox = tk.Listbox(tags_frame, width=40, height=6)
 towatch_listbox.grid(row=1, column=1, padx=10)
 
+tag_listboxes = {"watched": watched_listbox, "to_watch": towatch_listbox}
+
 # Refresh
 tk.Button(root, text="🔁 Refresh Tags", command=show_tags, bg="purple", fg="white").pack(pady=5)
 
+# Recommended for you, from the profile of liked movies
+tk.Label(root, text="⭐ Recommended for You").pack(pady=5)
+recommended_listbox = VirtualList(root, width=100, height=6)
+recommended_listbox.pack()
+
 # Init
 refresh_like_history()
 show_tags()
+show_recommended()
 
 root.mainloop()
@@ -0,0 +1,212 @@
+import os
+import csv
+import gzip
+import time
+import argparse
+import threading
+
+import movie_repository as repo
+
+BATCH_SIZE = 5000
+FORMATS = ("csv", "csv.gz", "parquet")
+
+# (name, Parquet type); CSV only uses the names
+CATALOG_COLUMNS = [("movieId", "int64"), ("title", "string"), ("genres", "string"), ("rating", "float64")]
+RECOMMENDATION_COLUMNS = [("userId", "int64"), ("rank", "int32"), ("movieId", "int64"), ("predicted_rating", "float64")]
+
+
+def detect_format(path):
+    """'csv', 'csv.gz' or 'parquet' from the file name."""
+    name = path.lower()
+    if name.endswith(".parquet"):
+        return "parquet"
+    if name.endswith(".gz"):
+        return "csv.gz"
+    return "csv"
+
+
+# --- Writers: write_batch(list of row tuples), close() ---
+
+class CsvWriter:
+    def __init__(self, path, columns, compress=False):
+        self.file = gzip.open(path, "wt", newline="", encoding="utf-8") if compress \
+            else open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write_batch(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """One Parquet row group per batch, so memory stays at one batch."""
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); use .csv or .csv.gz instead")
+        self.pa = pa
+        self.schema = pa.schema([(name, pa.type_for_alias(kind)) for name, kind in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write_batch(self, rows):
+        columns = zip(*rows)
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(path, columns, fmt=None):
+    fmt = fmt or detect_format(path)
+    if fmt == "parquet":
+        return ParquetWriter(path, columns)
+    return CsvWriter(path, columns, compress=fmt == "csv.gz")
+
+
+def write_stream(batches, path, columns, fmt=None, progress=None, cancel=None):
+    """Write batches of rows to `path`, replacing it only once the export completes.
+
+    `progress(rows_written)` is called after every batch. Setting the
+    `cancel` event stops after the current batch and leaves any existing
+    file untouched. Returns the rows written, or None if cancelled.
+    """
+    tmp = path + ".part"
+    writer = open_writer(tmp, columns, fmt or detect_format(path))
+    written = 0
+    completed = False
+    try:
+        for batch in batches:
+            if cancel is not None and cancel.is_set():
+                break
+            writer.write_batch(batch)
+            written += len(batch)
+            if progress:
+                progress(written)
+        else:
+            completed = True
+    finally:
+        writer.close()
+        if not completed:
+            os.remove(tmp)
+    if not completed:
+        return None
+    os.replace(tmp, path)
+    return written
+
+
+# --- Sources ---
+
+def catalog_row(movie):
+    return movie.get("movieId"), movie.get("title"), "|".join(movie.get("genres") or []), movie.get("rating")
+
+
+def catalog_batches(query, sort_dir=-1, batch_size=BATCH_SIZE):
+    """Rows of CATALOG_COLUMNS for every movie matching `query`, in GUI order, streamed from one cursor."""
+    cursor = repo.movies().find(query, repo.RESULT_FIELDS, batch_size=batch_size).sort(repo.page_sort(sort_dir))
+    batch = []
+    for movie in cursor:
+        batch.append(catalog_row(movie))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def recommendation_batches(model, user_ids=None, n=10, batch_size=1000):
+    """Rows of RECOMMENDATION_COLUMNS, scoring `batch_size` users per matrix product."""
+    user_ids = model.user_ids if user_ids is None else user_ids
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        rows = []
+        for user_id, (movie_ids, scores) in zip(chunk, model.recommend_for_users(chunk, n)):
+            rows.extend((int(user_id), rank, int(movie_id), round(float(score), 4))
+                        for rank, (movie_id, score) in enumerate(zip(movie_ids, scores), 1))
+        if rows:
+            yield rows
+
+
+def export_catalog(path, query=None, sort_dir=-1, fmt=None, batch_size=BATCH_SIZE, progress=None, cancel=None):
+    """Export every movie matching `query` (default: the whole catalog)."""
+    return write_stream(catalog_batches(query or {}, sort_dir, batch_size), path, CATALOG_COLUMNS,
+                        fmt, progress, cancel)
+
+
+def export_rows(path, movies, fmt=None, progress=None, cancel=None):
+    """Export movie records already in memory, e.g. a fixed GUI list."""
+    return write_stream([[catalog_row(m) for m in movies]], path, CATALOG_COLUMNS, fmt, progress, cancel)
+
+
+def export_recommendations(path, user_ids=None, n=10, fmt=None, progress=None, cancel=None):
+    """Export the top-n ALS recommendations of every user (or `user_ids`)."""
+    from matrix_factorization import ALSRecommender
+
+    model = ALSRecommender().load()
+    return write_stream(recommendation_batches(model, user_ids, n), path, RECOMMENDATION_COLUMNS,
+                        fmt, progress, cancel)
+
+
+class ExportJob:
+    """An export running on its own thread, for GUIs: poll `written`, call `cancel()`."""
+
+    def __init__(self, export, path, *args, **kwargs):
+        self.path = path
+        self.written = 0
+        self.result = None
+        self.error = None
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(export, path, args, kwargs),
+                                       name="export", daemon=True)
+        self.thread.start()
+
+    def _run(self, export, path, args, kwargs):
+        try:
+            self.result = export(path, *args, progress=self._progress, cancel=self.cancelled, **kwargs)
+        except Exception as e:
+            self.error = e
+
+    def _progress(self, written):
+        self.written = written
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def done(self):
+        return not self.thread.is_alive()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream the catalog or per-user recommendations to a file.")
+    parser.add_argument("what", choices=["catalog", "recommendations"])
+    parser.add_argument("path", help="output file: .csv, .csv.gz or .parquet")
+    parser.add_argument("--format", choices=FORMATS, help="override the format implied by the file name")
+    parser.add_argument("--genre", help="catalog: only this genre")
+    parser.add_argument("--min-rating", type=float, help="catalog: only movies rated at least this")
+    parser.add_argument("--title", help="catalog: only titles starting with this")
+    parser.add_argument("--ascending", action="store_true", help="catalog: lowest rated first")
+    parser.add_argument("-n", type=int, default=10, help="recommendations per user")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def report(written):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"⏱️  {written:,} rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/sec)", end="\r")
+
+    if args.what == "catalog":
+        query = repo.movie_filter(args.genre, args.min_rating, args.title)
+        written = export_catalog(args.path, query, 1 if args.ascending else -1, args.format,
+                                 args.batch_size, progress=report)
+    else:
+        written = export_recommendations(args.path, n=args.n, fmt=args.format, progress=report)
+    print(f"\n✅ Exported {written:,} rows to {args.path} in {time.perf_counter() - started:.1f}s")
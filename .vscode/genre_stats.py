@@ -0,0 +1,98 @@
+import pymongo
+
+import movie_repository as repo
+
+# Per-genre statistics, materialized in the genre_stats collection:
+#   {_id: genre, count: movies, rated: movies with a rating, rating_sum: sum of their ratings}
+# Readers get a few dozen small documents no matter how large the catalog is.
+STATS_ID = "genre_stats"
+
+collection = repo.movies()
+stats = repo.get_db()["genre_stats"]
+
+# Each genre counts once per movie, as in _apply(): duplicates are folded with $setUnion before the $unwind
+UNIQUE_GENRES = {"$setUnion": [{"$cond": [{"$isArray": "$genres"}, "$genres", []]}, []]}
+
+PIPELINE = [
+    {"$project": {"rating": 1, "genres": UNIQUE_GENRES}},
+    {"$unwind": "$genres"},
+    {"$group": {
+        "_id": "$genres",
+        "count": {"$sum": 1},
+        "rated": {"$sum": {"$cond": [{"$eq": [{"$ifNull": ["$rating", None]}, None]}, 0, 1]}},
+        "rating_sum": {"$sum": {"$ifNull": ["$rating", 0]}},
+    }},
+    {"$out": "genre_stats"},
+]
+
+
+def stats_version():
+    doc = repo.catalog_meta().find_one({"_id": STATS_ID}, {"version": 1})
+    return doc["version"] if doc else None
+
+
+def refresh():
+    """Recompute genre_stats server-side with $unwind/$group and swap it in with $out."""
+    version = repo.catalog_version()
+    collection.aggregate(PIPELINE)
+    repo.catalog_meta().update_one({"_id": STATS_ID}, {"$set": {"version": version}}, upsert=True)
+
+
+def ensure_current():
+    if stats_version() != repo.catalog_version():
+        refresh()
+
+
+def genre_stats():
+    """[{genre, count, rated, avg_rating}], most common genre first."""
+    ensure_current()
+    return [
+        {
+            "genre": row["_id"],
+            "count": row["count"],
+            "rated": row["rated"],
+            "avg_rating": row["rating_sum"] / row["rated"] if row["rated"] else None,
+        }
+        for row in stats.find({"count": {"$gt": 0}}).sort([("count", -1), ("_id", 1)])
+    ]
+
+
+def genre_counts():
+    return {row["genre"]: row["count"] for row in genre_stats()}
+
+
+def genre_names():
+    return sorted(row["genre"] for row in genre_stats())
+
+
+def _advance(version):
+    """Move the stats from `version - 1` to `version`. False if they were already stale."""
+    result = repo.catalog_meta().update_one(
+        {"_id": STATS_ID, "version": version - 1}, {"$set": {"version": version}}
+    )
+    return result.modified_count == 1
+
+
+def _apply(genres, rating, sign):
+    ops = [
+        pymongo.UpdateOne({"_id": genre}, {"$inc": {
+            "count": sign,
+            "rated": sign if rating is not None else 0,
+            "rating_sum": sign * (rating or 0.0),
+        }}, upsert=True)
+        for genre in set(genres or [])
+    ]
+    if ops:
+        stats.bulk_write(ops, ordered=False)
+
+
+def movie_added(genres, rating, version):
+    """Fold one inserted movie into the stats instead of recomputing them.
+    `version` is the catalog version returned by repo.bump_catalog_version()."""
+    if _advance(version):
+        _apply(genres, rating, +1)
+
+
+def movie_deleted(genres, rating, version):
+    if _advance(version):
+        _apply(genres, rating, -1)
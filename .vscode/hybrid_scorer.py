@@ -0,0 +1,166 @@
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from title_index import split_year
+
+# Blend of the four signals; each signal is scaled to roughly [0, 1]
+DEFAULT_WEIGHTS = {"content": 0.6, "rating": 0.25, "popularity": 0.15, "recency": 0.0}
+SIGNALS = ("rating", "popularity", "recency")  # the per-movie columns of HybridScorer.features
+
+
+def shrunk_ratings(rating_sum, rating_count, prior_count=None):
+    """Bayesian average: every movie starts with `prior_count` votes at the global mean.
+
+    A movie rated 5.0 by two people no longer outranks one rated 4.4 by
+    two thousand. `prior_count` defaults to the median vote count of rated
+    movies.
+    """
+    rating_sum = np.asarray(rating_sum, dtype=np.float64)
+    rating_count = np.asarray(rating_count, dtype=np.float64)
+    total = rating_count.sum()
+    mean = rating_sum.sum() / total if total else 0.0
+    if prior_count is None:
+        rated = rating_count[rating_count > 0]
+        prior_count = float(np.median(rated)) if len(rated) else 1.0
+    return (prior_count * mean + rating_sum) / (prior_count + rating_count)
+
+
+def top_k(scores, k):
+    """(columns, scores) of the k largest entries in each row of a 2-D array, best first.
+
+    Ties go to the lower column, exactly as a stable descending sort would.
+    argpartition alone picks among entries tied at the k-th score
+    arbitrarily, so every entry at or above that score is ranked by
+    (score, column).
+    """
+    rows, width = scores.shape
+    if k <= 0 or not rows:
+        return np.empty((rows, 0), dtype=np.int64), np.empty((rows, 0), dtype=scores.dtype)
+    kth = np.partition(scores, width - k, axis=1)[:, width - k]
+    r, c = np.nonzero(scores >= kth[:, None])
+    values = scores[r, c]
+    order = np.lexsort((c, -values, r))
+    first = np.searchsorted(r[order], np.arange(rows))
+    picks = order[first[:, None] + np.arange(k)]
+    return c[picks], values[picks]
+
+
+class HybridScorer:
+    """Ranks movies by content similarity, shrunk rating, popularity and recency.
+
+    Everything is a NumPy array aligned with the catalog rows:
+      genres    (N, G) float32, L2-normalized genre vectors
+      features  (N, 3) float32, columns SIGNALS scaled to [0, 1]
+      members   (N, genres) sparse 0/1, built from each movie's genre list
+    so a query's scores are one matrix-vector product plus one dot with
+    the weights, and top-n comes from argpartition.
+    """
+
+    def __init__(self, genre_matrix, rating_sum, rating_count, titles, genre_lists=None, prior_count=None):
+        genres = np.asarray(genre_matrix, dtype=np.float32)
+        norms = np.linalg.norm(genres, axis=1, keepdims=True)
+        self.genres = genres / np.where(norms > 0, norms, 1.0)
+        # Filter by the real genre names ('Sci-Fi', '(no genres listed)'), not the content
+        # matrix's columns, which may be tokens of them
+        binarizer = MultiLabelBinarizer(sparse_output=True)
+        if genre_lists is None:
+            genre_lists = [[]] * len(genres)
+        self.members = binarizer.fit_transform(genre_lists).tocsc()
+        self.genre_columns = {name.lower(): i for i, name in enumerate(binarizer.classes_)}
+
+        counts = np.asarray(rating_count, dtype=np.float64)
+        self.shrunk = shrunk_ratings(rating_sum, counts, prior_count)
+        rating = np.clip((self.shrunk - 0.5) / 4.5, 0.0, 1.0)
+        popularity = np.log1p(counts) / (np.log1p(counts.max()) if len(counts) and counts.max() > 0 else 1.0)
+
+        years = np.array([split_year(t)[1] or 0 for t in titles], dtype=np.float64)
+        known = years > 0
+        recency = np.zeros(len(years))
+        if known.any():
+            oldest, newest = years[known].min(), years[known].max()
+            recency[known] = (years[known] - oldest) / ((newest - oldest) or 1.0)
+
+        self.features = np.column_stack([rating, popularity, recency]).astype(np.float32)
+
+    def __len__(self):
+        return len(self.features)
+
+    @staticmethod
+    def weight_vector(weights=None):
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        return np.float32(weights["content"]), np.array([weights[s] for s in SIGNALS], dtype=np.float32)
+
+    def scores(self, query=None, weights=None):
+        """Hybrid score of every movie; `query` is a genre vector (e.g. a movie's row of `genres`)."""
+        content_weight, signal_weights = self.weight_vector(weights)
+        if query is None or not content_weight:
+            return self.features @ signal_weights
+        return content_weight * (self.genres @ query) + self.features @ signal_weights
+
+    @staticmethod
+    def top(scores, n, mask=None):
+        """Row numbers of the n best scores (ties by row), best first."""
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        n = min(n, int(np.count_nonzero(np.isfinite(scores))))
+        return top_k(scores[None, :], n)[0][0]
+
+    def similar(self, row, n=5, weights=None):
+        """(rows, scores) of the n best movies to recommend to someone who liked `row`."""
+        scores = self.scores(self.genres[row], weights)
+        scores[row] = -np.inf
+        top = self.top(scores, n)
+        return top, scores[top]
+
+    def similar_many(self, rows, n=5, weights=None):
+        """similar() for several movies in one (N x len(rows)) matrix product."""
+        rows = np.asarray(rows)
+        content_weight, signal_weights = self.weight_vector(weights)
+        scores = content_weight * (self.genres @ self.genres[rows].T) + (self.features @ signal_weights)[:, None]
+        scores[rows, np.arange(len(rows))] = -np.inf
+        return top_k(scores.T, min(n, len(self) - 1))
+
+    def genre_mask(self, genre):
+        column = self.genre_columns.get(genre.lower())
+        if column is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.members[:, column].toarray().ravel() > 0
+
+    def best(self, n=20, mask=None, weights=None):
+        """(rows, scores) of the n best movies overall, or among `mask`, with no content anchor."""
+        scores = self.scores(None, weights)
+        top = self.top(scores, n, mask)
+        return top, scores[top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time hybrid top-n queries on a synthetic catalog.")
+    parser.add_argument("--movies", type=int, default=60_000)
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-n", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    genre_matrix = (rng.random((args.movies, args.genres)) < 0.15).astype(np.float32)
+    counts = rng.zipf(1.6, args.movies).clip(0, 50_000)
+    sums = counts * rng.uniform(1.0, 5.0, args.movies)
+    titles = pd.Series(rng.integers(1920, 2016, args.movies)).map(lambda y: f"Movie ({y})")
+
+    started = time.perf_counter()
+    genre_lists = [[f"g{i}" for i in np.flatnonzero(row)] for row in genre_matrix]
+    scorer = HybridScorer(genre_matrix, sums, counts, titles, genre_lists)
+    print(f"🏗️  Built arrays for {args.movies:,} movies in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    rows = rng.integers(0, args.movies, args.queries)
+    latencies = []
+    for row in rows:
+        started = time.perf_counter()
+        scorer.similar(row, args.n)
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"⏱️  similar(): p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms "
+          f"over {args.queries} queries")
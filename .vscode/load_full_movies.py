@@ -1,106 +1,485 @@
 import os
 import csv
+import time
+import argparse
 import pymongo
+from io import BufferedReader, BytesIO, RawIOBase
 from collections import defaultdict
 from pprint import pprint
 
+import pandas as pd
+
+import movie_repository as repo
+import genre_stats
+
 # --- Configuration ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 MOVIES_CSV = os.path.join(SCRIPT_DIR, "movies.csv")
 RATINGS_CSV = os.path.join(SCRIPT_DIR, "rating.csv")
 
-# --- Debug: Verify Files Exist ---
-print("\n=== DEBUG: Checking Files ===")
-print(f"Script directory: {SCRIPT_DIR}")
-print(f"Looking for movies at: {MOVIES_CSV}")
-print(f"Looking for ratings at: {RATINGS_CSV}")
-print("Files in directory:", os.listdir(SCRIPT_DIR))
+# Streaming mode tuning
+RATINGS_CHUNK_SIZE = 500_000   # rating.csv rows parsed per chunk
+INSERT_BATCH_SIZE = 5_000      # movie documents per insert_many call
 
-if not all(os.path.exists(f) for f in [MOVIES_CSV, RATINGS_CSV]):
-    print("\n❌ ERROR: Missing CSV files!")
-    exit(1)
+# Average rating recomputed server-side by incremental runs
+AVERAGE_RATING = {"$round": [{"$divide": ["$rating_sum", "$rating_count"]}, 2]}
 
 # --- MongoDB Setup ---
-client = pymongo.MongoClient("mongodb://localhost:27017/")
-db = client["movie_db"]
-collection = db["movies"]
-collection.delete_many({})  # Clear old data
-
-# --- Step 1: Process Ratings ---
-print("\n=== Processing Ratings CSV ===")
-ratings_sum = defaultdict(float)
-ratings_count = defaultdict(int)
-
-try:
-    with open(RATINGS_CSV, encoding='utf-8') as rfile:
-        reader = csv.DictReader(rfile)
-        for i, row in enumerate(reader, 1):
-            try:
-                movie_id = int(row["movieId"])
-                rating = float(row["rating"])
-                ratings_sum[movie_id] += rating
-                ratings_count[movie_id] += 1
-            except (ValueError, KeyError) as e:
-                print(f"⚠️ Skipping bad row {i}: {e}")
-                continue
-
-    avg_ratings = {
-        mid: round(ratings_sum[mid] / ratings_count[mid], 2)
-        for mid in ratings_sum
-    }
-    print(f"✅ Processed ratings for {len(avg_ratings)} movies")
-
-except Exception as e:
-    print(f"\n❌ Failed to process ratings: {e}")
-    exit(1)
-
-# --- Step 2: Process Movies ---
-print("\n=== Processing Movies CSV ===")
-movies_without_ratings = 0
-inserted_count = 0
-
-try:
-    with open(MOVIES_CSV, encoding='utf-8') as mfile:
-        reader = csv.DictReader(mfile)
-        for row in reader:
-            try:
-                movie_id = int(row["movieId"])
-                title = row["title"]
-                genres = row["genres"].split("|") if row["genres"] else []
-                
-                # Get rating or mark as None if missing
-                if movie_id in avg_ratings:
-                    rating = avg_ratings[movie_id]
-                else:
-                    rating = None
-                    movies_without_ratings += 1
-
-                movie_doc = {
-                    "movieId": movie_id,
-                    "title": title,
-                    "genres": genres,
-                    "rating": rating
-                }
-
-                collection.insert_one(movie_doc)
-                inserted_count += 1
-
-            except Exception as e:
-                print(f"⚠️ Skipping bad movie row: {e}")
-                continue
-
-except Exception as e:
-    print(f"\n❌ Failed to process movies: {e}")
-    exit(1)
-
-# --- Results ---
-print("\n=== Final Results ===")
-print(f"✅ Successfully inserted {inserted_count} movies")
-print(f"⚠️  {movies_without_ratings} movies had no ratings")
-
-# Sample output from MongoDB
-print("\nSample movies from database:")
-for movie in collection.find().limit(5):
-    pprint(movie)
-
-print("\nOperation completed!")
\ No newline at end of file
+collection = repo.movies()
+ingest_state = repo.ingest_state()  # high-water marks for incremental mode
+
+
+def check_files():
+    # --- Debug: Verify Files Exist ---
+    print("\n=== DEBUG: Checking Files ===")
+    print(f"Script directory: {SCRIPT_DIR}")
+    print(f"Looking for movies at: {MOVIES_CSV}")
+    print(f"Looking for ratings at: {RATINGS_CSV}")
+    print("Files in directory:", os.listdir(SCRIPT_DIR))
+
+    if not all(os.path.exists(f) for f in [MOVIES_CSV, RATINGS_CSV]):
+        print("\n❌ ERROR: Missing CSV files!")
+        exit(1)
+
+
+def report_progress(label, rows, started):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"⏱️  {label}: {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/sec)")
+
+
+# =========================
+# Classic (row-by-row) load
+# =========================
+
+def load_classic():
+    collection.delete_many({})  # Clear old data
+    ingest_state.delete_many({})  # Classic loads keep no running sums to build on
+
+    # --- Step 1: Process Ratings ---
+    print("\n=== Processing Ratings CSV ===")
+    ratings_sum = defaultdict(float)
+    ratings_count = defaultdict(int)
+
+    try:
+        with open(RATINGS_CSV, encoding='utf-8') as rfile:
+            reader = csv.DictReader(rfile)
+            for i, row in enumerate(reader, 1):
+                try:
+                    movie_id = int(row["movieId"])
+                    rating = float(row["rating"])
+                    ratings_sum[movie_id] += rating
+                    ratings_count[movie_id] += 1
+                except (ValueError, KeyError) as e:
+                    print(f"⚠️ Skipping bad row {i}: {e}")
+                    continue
+
+        avg_ratings = {
+            mid: round(ratings_sum[mid] / ratings_count[mid], 2)
+            for mid in ratings_sum
+        }
+        print(f"✅ Processed ratings for {len(avg_ratings)} movies")
+
+    except Exception as e:
+        print(f"\n❌ Failed to process ratings: {e}")
+        exit(1)
+
+    # --- Step 2: Process Movies ---
+    print("\n=== Processing Movies CSV ===")
+    movies_without_ratings = 0
+    inserted_count = 0
+
+    try:
+        with open(MOVIES_CSV, encoding='utf-8') as mfile:
+            reader = csv.DictReader(mfile)
+            for row in reader:
+                try:
+                    movie_id = int(row["movieId"])
+                    title = row["title"]
+                    genres = row["genres"].split("|") if row["genres"] else []
+
+                    # Get rating or mark as None if missing
+                    if movie_id in avg_ratings:
+                        rating = avg_ratings[movie_id]
+                    else:
+                        rating = None
+                        movies_without_ratings += 1
+
+                    movie_doc = {
+                        "movieId": movie_id,
+                        "title": title,
+                        "title_norm": repo.title_norm(title),
+                        "genres": genres,
+                        "rating": rating
+                    }
+
+                    collection.insert_one(movie_doc)
+                    inserted_count += 1
+
+                except Exception as e:
+                    print(f"⚠️ Skipping bad movie row: {e}")
+                    continue
+
+    except Exception as e:
+        print(f"\n❌ Failed to process movies: {e}")
+        exit(1)
+
+    return inserted_count, movies_without_ratings
+
+
+# =========================
+# Streaming (bulk) load
+# =========================
+
+def aggregate_ratings_chunked(path=None, chunksize=RATINGS_CHUNK_SIZE, names=None):
+    """Sum and count ratings per movieId, reading the CSV in vectorized chunks.
+
+    `path` may be a file path or a binary buffer. Pass `names` when the
+    source has no header row (an incremental delta).
+    """
+    path = RATINGS_CSV if path is None else path
+    totals = None
+    rows = 0
+    skipped = 0
+    started = time.perf_counter()
+
+    reader = pd.read_csv(path, usecols=["movieId", "rating"], dtype=str, chunksize=chunksize,
+                         header=None if names else "infer", names=names)
+    for chunk in reader:
+        movie_ids = pd.to_numeric(chunk["movieId"], errors="coerce")
+        ratings = pd.to_numeric(chunk["rating"], errors="coerce")
+        valid = movie_ids.notna() & ratings.notna()
+        skipped += int((~valid).sum())
+
+        part = (
+            pd.DataFrame({"movieId": movie_ids[valid].astype("int64"), "rating": ratings[valid]})
+            .groupby("movieId")["rating"]
+            .agg(["sum", "count"])
+        )
+        totals = part if totals is None else totals.add(part, fill_value=0)
+
+        rows += len(chunk)
+        report_progress("Ratings", rows, started)
+
+    if totals is None:
+        totals = pd.DataFrame({"sum": [], "count": []}, index=pd.Index([], name="movieId"))
+    totals["count"] = totals["count"].astype("int64")
+
+    if skipped:
+        print(f"⚠️ Skipped {skipped} bad rating rows")
+    return totals
+
+
+def iter_movie_docs(totals, path=None, chunksize=RATINGS_CHUNK_SIZE, names=None):
+    """Yield movie documents joined with their rating aggregates."""
+    path = MOVIES_CSV if path is None else path
+    reader = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize,
+                         header=None if names else "infer", names=names)
+    for chunk in reader:
+        movie_ids = pd.to_numeric(chunk["movieId"], errors="coerce")
+        bad = movie_ids.isna()
+        if bad.any():
+            print(f"⚠️ Skipping {int(bad.sum())} bad movie rows")
+        chunk = chunk[~bad].assign(movieId=movie_ids[~bad].astype("int64"))
+
+        joined = chunk.join(totals, on="movieId")
+        for movie_id, title, genres, r_sum, r_count in zip(
+            joined["movieId"], joined["title"], joined["genres"], joined["sum"], joined["count"]
+        ):
+            if pd.isna(r_count) or r_count == 0:
+                rating, r_sum, r_count = None, 0.0, 0
+            else:
+                rating = round(float(r_sum) / float(r_count), 2)
+
+            yield {
+                "movieId": int(movie_id),
+                "title": title,
+                "title_norm": repo.title_norm(title),
+                "genres": genres.split("|") if genres else [],
+                "rating": rating,
+                # Persisted so incremental runs can fold in new ratings
+                "rating_sum": float(r_sum),
+                "rating_count": int(r_count)
+            }
+
+
+def insert_batched(docs, batch_size=INSERT_BATCH_SIZE):
+    """Write documents with unordered insert_many calls of `batch_size`."""
+    inserted = 0
+    started = time.perf_counter()
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        try:
+            result = collection.insert_many(batch, ordered=False)
+            inserted += len(result.inserted_ids)
+        except pymongo.errors.BulkWriteError as e:
+            inserted += e.details.get("nInserted", 0)
+            print(f"⚠️ {len(e.details.get('writeErrors', []))} movie documents failed to insert")
+        batch.clear()
+        report_progress("Movies", inserted, started)
+
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    return inserted
+
+
+def load_streaming(batch_size=INSERT_BATCH_SIZE, chunksize=RATINGS_CHUNK_SIZE):
+    collection.delete_many({})  # Clear old data
+    ingest_state.delete_many({})
+
+    # Snapshot the ends first and read only up to them, so rows appended mid-load
+    # are left for the next incremental run instead of being counted twice
+    movies_end = complete_lines_end(MOVIES_CSV)
+    ratings_end = complete_lines_end(RATINGS_CSV)
+
+    print("\n=== Streaming Ratings CSV ===")
+    try:
+        with open_until(RATINGS_CSV, ratings_end) as ratings_file:
+            totals = aggregate_ratings_chunked(ratings_file, chunksize=chunksize)
+        print(f"✅ Processed ratings for {len(totals)} movies")
+    except Exception as e:
+        print(f"\n❌ Failed to process ratings: {e}")
+        exit(1)
+
+    print("\n=== Streaming Movies CSV ===")
+    movies_without_ratings = 0
+
+    def counted(docs):
+        nonlocal movies_without_ratings
+        for doc in docs:
+            if doc["rating"] is None:
+                movies_without_ratings += 1
+            yield doc
+
+    try:
+        with open_until(MOVIES_CSV, movies_end) as movies_file:
+            inserted_count = insert_batched(counted(iter_movie_docs(totals, movies_file, chunksize=chunksize)),
+                                            batch_size)
+    except Exception as e:
+        print(f"\n❌ Failed to process movies: {e}")
+        exit(1)
+
+    save_offset(MOVIES_CSV, movies_end)
+    save_offset(RATINGS_CSV, ratings_end)
+    return inserted_count, movies_without_ratings
+
+
+# =========================
+# Incremental (delta) load
+# =========================
+
+def complete_lines_end(path):
+    """Byte offset just past the last complete line, so a half-written row is never read."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            nl = block.rfind(b"\n")
+            if nl != -1:
+                return pos - step + nl + 1
+            pos -= step
+    return 0
+
+
+class _Prefix(RawIOBase):
+    """The first `end` bytes of a file, as a readable stream."""
+
+    def __init__(self, path, end):
+        self.file = open(path, "rb")
+        self.remaining = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        read = self.file.readinto(memoryview(buffer)[:size])
+        self.remaining -= read
+        return read
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def open_until(path, end):
+    """Open `path` for streaming parsers, ending at byte `end` however much the file has grown."""
+    return BufferedReader(_Prefix(path, end))
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        header = f.readline()
+    return header.decode("utf-8").strip().split(","), len(header)
+
+
+def load_offset(path):
+    state = ingest_state.find_one({"_id": os.path.basename(path)})
+    return state.get("offset") if state else None
+
+
+def load_pending(path):
+    """End offset of a delta that was started but not finished, or None."""
+    state = ingest_state.find_one({"_id": os.path.basename(path)})
+    return state.get("pending_end") if state else None
+
+
+def save_pending(path, end):
+    ingest_state.update_one({"_id": os.path.basename(path)}, {"$set": {"pending_end": end}}, upsert=True)
+
+
+def save_offset(path, offset):
+    ingest_state.update_one(
+        {"_id": os.path.basename(path)},
+        {"$set": {"offset": offset, "updated_at": time.time()}, "$unset": {"pending_end": ""}},
+        upsert=True
+    )
+
+
+def read_delta(path, end=None):
+    """Return (names, bytes, end_offset) for the rows appended since the last run.
+
+    `end` pins the end of the delta, to replay exactly the range of an unfinished run.
+    """
+    names, header_len = read_header(path)
+    start = load_offset(path)
+    if start is None:
+        start = header_len
+    end = complete_lines_end(path) if end is None else end
+
+    if end < start:
+        print(f"\n❌ {os.path.basename(path)} is shorter than the saved high-water mark "
+              f"({end} < {start}); it was replaced. Run a full load instead.")
+        exit(1)
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return names, data, end
+
+
+def bulk_write_batched(ops, batch_size):
+    written = 0
+    started = time.perf_counter()
+    for i in range(0, len(ops), batch_size):
+        collection.bulk_write(ops[i:i + batch_size], ordered=False)
+        written += len(ops[i:i + batch_size])
+        report_progress("Upserts", written, started)
+
+
+def load_incremental(batch_size=INSERT_BATCH_SIZE, chunksize=RATINGS_CHUNK_SIZE):
+    repo.ensure_indexes()  # upserts below look movies up by movieId
+
+    # --- Step 1: New movies ---
+    print("\n=== Incremental Movies CSV ===")
+    names, data, movies_end = read_delta(MOVIES_CSV)
+    movie_ops = []
+    if data:
+        for doc in iter_movie_docs(pd.DataFrame(columns=["sum", "count"]), BytesIO(data),
+                                   chunksize=chunksize, names=names):
+            movie_ops.append(pymongo.UpdateOne(
+                {"movieId": doc["movieId"]},
+                {"$set": {"title": doc["title"], "title_norm": doc["title_norm"], "genres": doc["genres"]},
+                 "$setOnInsert": {"rating": None}},
+                upsert=True
+            ))
+    bulk_write_batched(movie_ops, batch_size)
+    # $set upserts are idempotent: after a crash before this line, rerunning re-applies them harmlessly
+    save_offset(MOVIES_CSV, movies_end)
+    print(f"✅ Upserted {len(movie_ops)} new movie rows")
+
+    # --- Step 2: New ratings ---
+    # Like the full loads, ratings for movies missing from movies.csv are dropped
+    # $inc is not idempotent, so each delta is applied exactly once: its end offset is
+    # recorded as pending before any write, every movie is stamped with it in the same
+    # update as its $inc, and a rerun after a crash replays the same range, skipping
+    # the movies already stamped
+    print("\n=== Incremental Ratings CSV ===")
+    names, data, ratings_end = read_delta(RATINGS_CSV, end=load_pending(RATINGS_CSV))
+    if not data:
+        save_offset(RATINGS_CSV, ratings_end)
+        print("✅ No new ratings since the last run")
+        return len(movie_ops), 0
+    save_pending(RATINGS_CSV, ratings_end)
+
+    totals = aggregate_ratings_chunked(BytesIO(data), chunksize=chunksize, names=names)
+    movie_ids = [int(mid) for mid in totals.index]
+    rating_ops = [
+        pymongo.UpdateOne(
+            {"movieId": mid, "ratings_applied": {"$ne": ratings_end}},
+            {"$inc": {"rating_sum": float(r_sum), "rating_count": int(r_count)},
+             "$set": {"ratings_applied": ratings_end}}
+        )
+        for mid, r_sum, r_count in zip(movie_ids, totals["sum"], totals["count"])
+    ]
+    bulk_write_batched(rating_ops, batch_size)
+
+    # --- Step 3: Recompute averages server-side for touched movies only ---
+    for i in range(0, len(movie_ids), batch_size):
+        collection.update_many(
+            {"movieId": {"$in": movie_ids[i:i + batch_size]}, "rating_count": {"$gt": 0}},
+            [{"$set": {"rating": AVERAGE_RATING}}]
+        )
+
+    # Only advance the high-water mark once the delta is fully applied
+    save_offset(RATINGS_CSV, ratings_end)
+    print(f"✅ Folded new ratings into {len(movie_ids)} movies")
+    return len(movie_ops), len(movie_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load MovieLens CSVs into MongoDB.")
+    parser.add_argument("--mode", choices=["classic", "stream", "incremental"], default="classic",
+                        help="classic: row-by-row inserts; stream: chunked parsing and bulk inserts; "
+                             "incremental: fold in only rows appended since the last stream/incremental run")
+    parser.add_argument("--batch-size", type=int, default=INSERT_BATCH_SIZE,
+                        help="documents per insert_many/bulk_write call (stream and incremental modes)")
+    parser.add_argument("--chunk-size", type=int, default=RATINGS_CHUNK_SIZE,
+                        help="CSV rows parsed per chunk (stream and incremental modes)")
+    args = parser.parse_args()
+
+    check_files()
+    run_mode(args)  # a failed load exits or raises here, before the version bump
+    repo.bump_catalog_version()  # derived caches (e.g. the GUI clusters) are now stale
+    genre_stats.refresh()
+
+
+def run_mode(args):
+    if args.mode == "incremental":
+        upserted, touched = load_incremental(args.batch_size, args.chunk_size)
+        print("\n=== Final Results ===")
+        print(f"✅ Upserted {upserted} movies, updated ratings for {touched} movies")
+        print("\nOperation completed!")
+        return
+
+    if args.mode == "stream":
+        inserted_count, movies_without_ratings = load_streaming(args.batch_size, args.chunk_size)
+    else:
+        inserted_count, movies_without_ratings = load_classic()
+
+    # --- Results ---
+    print("\n=== Final Results ===")
+    print(f"✅ Successfully inserted {inserted_count} movies")
+    print(f"⚠️  {movies_without_ratings} movies had no ratings")
+
+    # Sample output from MongoDB
+    print("\nSample movies from database:")
+    for movie in collection.find().limit(5):
+        pprint(movie)
+
+    print("\nOperation completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from collab_filter import load_ratings
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MF_MODEL_DIR = os.path.join(SCRIPT_DIR, "mf_model")
+
+DEFAULT_FACTORS = 32
+DEFAULT_REG = 0.05
+DEFAULT_ITERATIONS = 10
+MAX_BLOCK_NNZ = 20_000  # ratings per solve block; bounds the (nnz x f x f) scratch array
+
+
+def split_holdout(ratings, test_fraction=0.1, seed=42):
+    rng = np.random.default_rng(seed)
+    test_mask = rng.random(len(ratings)) < test_fraction
+    return ratings[~test_mask], ratings[test_mask]
+
+
+def solve_block(indptr, indices, data, fixed, reg):
+    """Least-squares solve for a block of rows of the rating matrix.
+
+    Each row's normal equations (F_r^T F_r + reg * n_r * I) x = F_r^T y_r
+    are assembled with reduceat over the row's ratings and solved as one
+    batched np.linalg.solve. Rows must have at least one rating.
+    """
+    factors = fixed.shape[1]
+    gathered = fixed[indices]                                   # (nnz, f)
+    starts = indptr[:-1]
+    counts = np.diff(indptr)
+
+    outer = gathered[:, :, None] * gathered[:, None, :]         # (nnz, f, f)
+    lhs = np.add.reduceat(outer, starts, axis=0)                # (rows, f, f)
+    lhs += (reg * counts)[:, None, None] * np.eye(factors, dtype=fixed.dtype)
+    rhs = np.add.reduceat(gathered * data[:, None], starts, axis=0)
+    return np.linalg.solve(lhs, rhs[:, :, None])[:, :, 0].astype(np.float32)
+
+
+_mapped = {}  # worker process: .npy path -> memory-mapped factor matrix
+
+
+def solve_mapped_block(indptr, indices, data, fixed_path, reg):
+    """solve_block in a worker, reading the fixed factors from a memory-mapped .npy file.
+
+    The mapping is opened once per worker and file; the parent rewrites the
+    file in place between half-steps, and the shared pages show the new values.
+    """
+    fixed = _mapped.get(fixed_path)
+    if fixed is None:
+        fixed = _mapped[fixed_path] = np.load(fixed_path, mmap_mode="r")
+    return solve_block(indptr, indices, data, fixed, reg)
+
+
+def make_blocks(matrix, max_nnz=MAX_BLOCK_NNZ):
+    """Split the rows of a CSR matrix into contiguous blocks of about `max_nnz` ratings."""
+    bounds = [0]
+    cumulative = matrix.indptr
+    while bounds[-1] < matrix.shape[0]:
+        start = bounds[-1]
+        stop = int(np.searchsorted(cumulative, cumulative[start] + max_nnz, side="right")) - 1
+        bounds.append(min(max(stop, start + 1), matrix.shape[0]))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def block_args(matrix, start, stop):
+    lo, hi = matrix.indptr[start], matrix.indptr[stop]
+    return matrix.indptr[start:stop + 1] - lo, matrix.indices[lo:hi], matrix.data[lo:hi]
+
+
+def solve_side(matrix, fixed, reg, blocks, pool, out):
+    """Recompute every row's factors of `matrix` into `out` while `fixed` is held constant.
+
+    With a pool, `fixed` must be a memmap of a .npy file: workers map it
+    themselves, so each task carries only its block of ratings.
+    """
+    if pool is None:
+        for start, stop in blocks:
+            out[start:stop] = solve_block(*block_args(matrix, start, stop), fixed, reg)
+        return out
+    futures = [
+        (start, stop, pool.submit(solve_mapped_block, *block_args(matrix, start, stop), fixed.filename, reg))
+        for start, stop in blocks
+    ]
+    for start, stop, future in futures:
+        out[start:stop] = future.result()
+    return out
+
+
+def rmse(users, items, values, user_factors, item_factors, mean):
+    preds = mean + np.einsum("ij,ij->i", user_factors[users], item_factors[items])
+    return float(np.sqrt(np.mean((np.clip(preds, 0.5, 5.0) - values) ** 2)))
+
+
+class ALSRecommender:
+    """Latent-factor model trained with alternating least squares."""
+
+    def __init__(self, model_dir=MF_MODEL_DIR):
+        self.model_dir = model_dir
+        self.user_factors = None
+        self.item_factors = None
+        self.user_ids = None
+        self.item_ids = None
+        self.rated = None
+        self.mean = 0.0
+        self.user_positions = None
+
+    def fit(self, ratings, factors=DEFAULT_FACTORS, reg=DEFAULT_REG, iterations=DEFAULT_ITERATIONS,
+            workers=None, test_fraction=0.1, seed=42):
+        train, test = split_holdout(ratings, test_fraction, seed)
+
+        user_codes, self.user_ids = pd.factorize(train["userId"], sort=True)
+        item_codes, self.item_ids = pd.factorize(train["movieId"], sort=True)
+        self.user_ids = np.asarray(self.user_ids, dtype=np.int32)
+        self.item_ids = np.asarray(self.item_ids, dtype=np.int32)
+        values = train["rating"].to_numpy(dtype=np.float32)
+        self.mean = float(values.mean())
+
+        shape = (len(self.user_ids), len(self.item_ids))
+        by_user = sparse.csr_matrix((values - self.mean, (user_codes, item_codes)), shape=shape, dtype=np.float32)
+        by_item = by_user.T.tocsr()
+        self._index_users()
+
+        # Held-out pairs whose user and item both appear in training
+        test_users = pd.Index(self.user_ids).get_indexer(test["userId"])
+        test_items = pd.Index(self.item_ids).get_indexer(test["movieId"])
+        known = (test_users >= 0) & (test_items >= 0)
+
+        # Everything a user rated, held-out ratings included, is never recommended back
+        all_users = np.concatenate([user_codes, test_users[known]])
+        all_items = np.concatenate([item_codes, test_items[known]])
+        self.rated = sparse.csr_matrix((np.ones(len(all_users), dtype=np.bool_), (all_users, all_items)), shape=shape)
+
+        test_users, test_items = test_users[known], test_items[known]
+        test_values = test["rating"].to_numpy(dtype=np.float32)[known]
+
+        user_blocks, item_blocks = make_blocks(by_user), make_blocks(by_item)
+        workers = os.cpu_count() if workers is None else workers
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        # Workers read the factors from memory-mapped files instead of a pickled copy per block
+        scratch = tempfile.mkdtemp(prefix="als_") if pool is not None else None
+        rng = np.random.default_rng(seed)
+        for name, rows in (("user_factors", shape[0]), ("item_factors", shape[1])):
+            initial = (rng.standard_normal((rows, factors)) * 0.1).astype(np.float32)
+            if scratch is not None:
+                mapped = np.lib.format.open_memmap(os.path.join(scratch, f"{name}.npy"), mode="w+",
+                                                   dtype=np.float32, shape=initial.shape)
+                mapped[:] = initial
+                initial = mapped
+            setattr(self, name, initial)
+
+        print(f"🧮 Training ALS: {shape[0]} users x {shape[1]} items, {by_user.nnz:,} ratings, "
+              f"{factors} factors, {workers} worker(s)")
+        started = time.perf_counter()
+        try:
+            for it in range(1, iterations + 1):
+                solve_side(by_user, self.item_factors, reg, user_blocks, pool, out=self.user_factors)
+                solve_side(by_item, self.user_factors, reg, item_blocks, pool, out=self.item_factors)
+                test_rmse = rmse(test_users, test_items, test_values,
+                                 self.user_factors, self.item_factors, self.mean)
+                print(f"   iteration {it:2d}: held-out RMSE {test_rmse:.4f} "
+                      f"({time.perf_counter() - started:.1f}s)")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+                self.user_factors = np.array(self.user_factors)
+                self.item_factors = np.array(self.item_factors)
+                shutil.rmtree(scratch, ignore_errors=True)
+
+        self.train_seconds = time.perf_counter() - started
+        self.test_rmse = test_rmse if iterations else None
+        if self.test_rmse is not None:
+            print(f"✅ Trained in {self.train_seconds:.1f}s, held-out RMSE {self.test_rmse:.4f} "
+                  f"on {len(test_values):,} ratings")
+        return self
+
+    def _index_users(self):
+        self.user_positions = pd.Series(np.arange(len(self.user_ids)), index=self.user_ids)
+
+    def save(self):
+        os.makedirs(self.model_dir, exist_ok=True)
+        np.save(os.path.join(self.model_dir, "user_factors.npy"), self.user_factors)
+        np.save(os.path.join(self.model_dir, "item_factors.npy"), self.item_factors)
+        np.save(os.path.join(self.model_dir, "user_ids.npy"), self.user_ids)
+        np.save(os.path.join(self.model_dir, "item_ids.npy"), self.item_ids)
+        np.save(os.path.join(self.model_dir, "rated_indptr.npy"), self.rated.indptr)
+        np.save(os.path.join(self.model_dir, "rated_indices.npy"), self.rated.indices)
+        with open(os.path.join(self.model_dir, "meta.json"), "w") as f:
+            json.dump({"mean": self.mean, "test_rmse": self.test_rmse,
+                       "train_seconds": self.train_seconds}, f, indent=2)
+
+    def load(self):
+        def path(name):
+            return os.path.join(self.model_dir, name)
+
+        self.user_factors = np.load(path("user_factors.npy"), mmap_mode="r")
+        self.item_factors = np.load(path("item_factors.npy"), mmap_mode="r")
+        self.user_ids = np.load(path("user_ids.npy"))
+        self.item_ids = np.load(path("item_ids.npy"))
+        indptr = np.load(path("rated_indptr.npy"), mmap_mode="r")
+        indices = np.load(path("rated_indices.npy"), mmap_mode="r")
+        # Only the sparsity pattern is needed, to skip movies a user already rated
+        self.rated = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.bool_), indices, indptr),
+            shape=(len(self.user_ids), len(self.item_ids)),
+        )
+        with open(path("meta.json")) as f:
+            self.mean = json.load(f)["mean"]
+        self._index_users()
+        return self
+
+    def recommend_for_users(self, user_ids, n=10, exclude_rated=True):
+        """Top-n (movieIds, predicted ratings) for each user, from one batched dot product.
+
+        Unknown users get empty results.
+        """
+        positions = self.user_positions.reindex(user_ids).to_numpy()
+        known = ~np.isnan(positions)
+        rows = positions[known].astype(np.int64)
+        results = [(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))] * len(positions)
+        if not len(rows):
+            return results
+
+        scores = np.asarray(self.user_factors[rows]) @ np.asarray(self.item_factors).T + self.mean
+        if exclude_rated:
+            seen = self.rated[rows].tocoo()
+            scores[seen.row, seen.col] = -np.inf
+
+        n = min(n, scores.shape[1])
+        top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for out, items, item_scores in zip(np.flatnonzero(known), top, top_scores):
+            keep = np.isfinite(item_scores)
+            results[out] = (self.item_ids[items[keep]], np.clip(item_scores[keep], 0.5, 5.0))
+        return results
+
+    def recommend_for_user(self, user_id, n=10):
+        return self.recommend_for_users([user_id], n)[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ALS matrix factorization over rating.csv.")
+    parser.add_argument("--train", action="store_true", help="train and save the model")
+    parser.add_argument("--user", type=int, help="show recommendations for this userId")
+    parser.add_argument("--factors", type=int, default=DEFAULT_FACTORS)
+    parser.add_argument("--reg", type=float, default=DEFAULT_REG)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--workers", type=int, default=None, help="processes for the solves (default: all cores)")
+    parser.add_argument("-n", type=int, default=10, help="recommendations to show")
+    args = parser.parse_args()
+
+    model = ALSRecommender()
+    if args.train or not os.path.exists(os.path.join(MF_MODEL_DIR, "meta.json")):
+        model.fit(load_ratings(), args.factors, args.reg, args.iterations, args.workers).save()
+        print(f"💾 Saved factors to {MF_MODEL_DIR}")
+    else:
+        model.load()
+
+    if args.user is not None:
+        movies = pd.read_csv(os.path.join(SCRIPT_DIR, "movies.csv")).set_index("movieId")
+        movie_ids, scores = model.recommend_for_user(args.user, args.n)
+        print(f"\n🎯 Top picks for user {args.user}:")
+        for movie_id, score in zip(movie_ids, scores):
+            title = movies["title"].get(movie_id, f"movieId {movie_id}")
+            print(f"- {title} | Predicted rating: {score:.2f}")
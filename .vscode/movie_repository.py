@@ -0,0 +1,396 @@
+"""Shared MongoDB access for every script and GUI in the project.
+
+One pooled client per process, configured from the environment:
+
+  MOVIE_DB_URI        connection string (default mongodb://localhost:27017/)
+  MOVIE_DB_NAME       database name (default movie_db)
+  MOVIE_DB_POOL_SIZE  max pooled connections (default 20)
+  MOVIE_DB_SLOW_MS    log commands slower than this many ms (default 200, 0 = log all)
+"""
+
+import os
+import argparse
+import threading
+from collections import defaultdict
+
+import pymongo
+from bson import ObjectId
+from pymongo import monitoring
+from pymongo.topology_description import TopologyDescription
+
+from title_index import normalize, split_year
+
+MONGO_URI = os.environ.get("MOVIE_DB_URI", "mongodb://localhost:27017/")
+DB_NAME = os.environ.get("MOVIE_DB_NAME", "movie_db")
+POOL_SIZE = int(os.environ.get("MOVIE_DB_POOL_SIZE", "20"))
+SLOW_MS = float(os.environ.get("MOVIE_DB_SLOW_MS", "200"))
+
+# --- Projections: fetch only the fields a view shows ---
+LIST_FIELDS = {"title": 1, "genres": 1, "rating": 1}
+TITLE_RATING_FIELDS = {"title": 1, "rating": 1}
+GENRE_FIELDS = {"genres": 1, "_id": 0}
+MODEL_FIELDS = {"title": 1, "genres": 1, "rating": 1, "movieId": 1}
+# GUI result rows: enough for details, export and posters without another query
+RESULT_FIELDS = {"title": 1, "genres": 1, "rating": 1, "movieId": 1}
+
+PAGE_SIZE = 50
+
+
+class QueryTimer(monitoring.CommandListener):
+    """Per-command timing: totals per command name, and a log line for slow ones."""
+
+    def __init__(self, slow_ms=SLOW_MS):
+        self.slow_ms = slow_ms
+        self.lock = threading.Lock()
+        self.totals = defaultdict(lambda: [0, 0.0])  # command -> [count, total ms]
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, "")
+
+    def failed(self, event):
+        self._record(event, " (failed)")
+
+    def _record(self, event, suffix):
+        ms = event.duration_micros / 1000
+        with self.lock:
+            entry = self.totals[event.command_name]
+            entry[0] += 1
+            entry[1] += ms
+        if ms >= self.slow_ms:
+            print(f"🐢 Mongo {event.command_name} took {ms:.1f} ms{suffix}")
+
+    def stats(self):
+        with self.lock:
+            return {
+                name: {"count": count, "total_ms": round(total, 1), "avg_ms": round(total / count, 2)}
+                for name, (count, total) in self.totals.items()
+            }
+
+
+query_timer = QueryTimer()
+
+_client = None
+_client_lock = threading.Lock()
+_indexed = set()
+
+
+def get_client():
+    """The process-wide client. pymongo pools connections and connects lazily."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = pymongo.MongoClient(
+                    MONGO_URI, maxPoolSize=POOL_SIZE, event_listeners=[query_timer]
+                )
+    return _client
+
+
+def set_client(client):
+    """Use `client` instead of connecting to MOVIE_DB_URI, e.g. a mongomock.MongoClient in tests."""
+    global _client
+    with _client_lock:
+        _client = client
+    _indexed.discard(DB_NAME)
+
+
+def get_db():
+    return get_client()[DB_NAME]
+
+
+def movies():
+    return get_db()["movies"]
+
+
+def user_likes():
+    return get_db()["user_likes"]
+
+
+def user_tags():
+    return get_db()["user_tags"]
+
+
+def recommendations():
+    return get_db()["recommendations"]
+
+
+def ingest_state():
+    return get_db()["ingest_state"]
+
+
+def catalog_meta(db=None):
+    return (get_db() if db is None else db)["catalog_meta"]
+
+
+def source(collection=None):
+    """Where a collection lives, for files derived from it: the servers (or
+    replica set) its client points at, the database and the collection name.
+    Catalog versions are per database, so they only compare within one source."""
+    collection = movies() if collection is None else collection
+    client = collection.database.client
+    description = getattr(client, "topology_description", None)
+    if isinstance(description, TopologyDescription):
+        servers = ([f"rs:{description.replica_set_name}"] if description.replica_set_name
+                   else sorted(f"{host}:{port}" for host, port in description.server_descriptions()))
+    else:
+        servers = [f"mongomock:{id(client)}"]  # in-memory: a catalog of this client and process only
+    return {"servers": servers, "database": collection.database.name, "collection": collection.name}
+
+
+# --- Catalog version: bumped by every write to the movies collection ---
+
+def catalog_version(db=None):
+    doc = catalog_meta(db).find_one({"_id": "movies"}, {"version": 1})
+    return doc["version"] if doc else 0
+
+
+def bump_catalog_version():
+    """Record that the catalog changed, so derived caches know they are stale."""
+    doc = catalog_meta().find_one_and_update(
+        {"_id": "movies"}, {"$inc": {"version": 1}},
+        upsert=True, return_document=pymongo.ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+def next_movie_id():
+    """A fresh movieId for a movie added by hand, above every id the loaders wrote."""
+    top = movies().find_one({"movieId": {"$ne": None}}, {"movieId": 1}, sort=[("movieId", pymongo.DESCENDING)])
+    counter = catalog_meta()
+    counter.update_one({"_id": "movie_ids"}, {"$max": {"last": top["movieId"] if top else 0}}, upsert=True)
+    doc = counter.find_one_and_update(
+        {"_id": "movie_ids"}, {"$inc": {"last": 1}}, return_document=pymongo.ReturnDocument.AFTER
+    )
+    return doc["last"]
+
+
+# --- Precomputed recommendations (written by batch_recommend.py) ---
+
+def user_recommendations(user_id):
+    """Precomputed [{movieId, title, score}] for a MovieLens userId; one _id lookup."""
+    doc = recommendations().find_one({"_id": f"user:{int(user_id)}"}, {"items": 1})
+    return doc["items"] if doc else []
+
+
+def similar_movies(movie_id):
+    """Precomputed [{movieId, title, score}] most similar to a movie; one _id lookup."""
+    if movie_id is None:
+        return []
+    doc = recommendations().find_one({"_id": f"movie:{int(movie_id)}"}, {"items": 1})
+    return doc["items"] if doc else []
+
+
+# --- Normalized titles ---
+
+def title_norm(title):
+    """Search key stored on every movie as `title_norm`:
+    'Usual Suspects, The (1995)' -> 'the usual suspects'."""
+    return normalize(split_year(title)[0])
+
+
+def backfill_title_norm(batch_size=1000):
+    """Add `title_norm` to movies written before the field existed."""
+    coll = movies()
+    ops = []
+    updated = 0
+    for movie in coll.find({"title_norm": {"$exists": False}}, {"title": 1}):
+        ops.append(pymongo.UpdateOne(
+            {"_id": movie["_id"]}, {"$set": {"title_norm": title_norm(movie.get("title", ""))}}
+        ))
+        if len(ops) >= batch_size:
+            coll.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
+
+
+def backfill_user_movie_ids():
+    """Key likes and tags saved by title (before they carried movieId) by movieId.
+
+    Entries whose title no longer matches a movie are left as they are;
+    duplicates that collapse onto the same (user, movieId) are dropped.
+    """
+    db = get_db()
+    for name in ("user_likes", "user_tags"):
+        coll = db[name]
+        for entry in coll.find({"movieId": {"$exists": False}}, {"user": 1, "title": 1}):
+            movie = db["movies"].find_one({"title": entry.get("title")}, {"movieId": 1})
+            if not movie or movie.get("movieId") is None:
+                continue
+            if coll.find_one({"user": entry["user"], "movieId": movie["movieId"]}, {"_id": 1}):
+                coll.delete_one({"_id": entry["_id"]})
+            else:
+                coll.update_one({"_id": entry["_id"]}, {"$set": {"movieId": movie["movieId"]}})
+
+
+def ensure_indexes():
+    """Create the indexes the queries rely on. Safe to call from every entry point:
+    Mongo treats an existing identical index as a no-op, and each process only asks once."""
+    if DB_NAME in _indexed:
+        return
+    db = get_db()
+    db["movies"].create_index("movieId")
+    db["movies"].create_index("title")
+    db["movies"].create_index([("rating", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+    db["movies"].create_index([("genres", pymongo.ASCENDING), ("rating", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+    db["movies"].create_index("title_norm")
+    db["movies"].create_index([("title", pymongo.TEXT)], default_language="none")
+    db["movies"].create_index("gui_cluster", sparse=True)
+    backfill_title_norm()
+    backfill_user_movie_ids()
+    # One like / one tag per user and movie; the upserts in personalize.py rely on it
+    for name in ("user_likes", "user_tags"):
+        db[name].create_index([("user", 1), ("movieId", 1)], unique=True,
+                              partialFilterExpression={"movieId": {"$exists": True}})
+    _indexed.add(DB_NAME)
+
+
+# --- Query builders (shaped so the indexes above can serve them) ---
+
+def title_prefix_filter(text):
+    """Anchored prefix match on `title_norm`, which the title_norm index serves
+    as a range scan, unlike an unanchored case-insensitive regex on `title`."""
+    # title_norm() leaves only [0-9a-z ], so the key needs no escaping and the
+    # whole pattern stays a simple prefix that Mongo turns into index bounds
+    return {"title_norm": {"$regex": "^" + title_norm(text)}}
+
+
+def title_text_filter(text):
+    """Whole-word match anywhere in the title, served by the text index."""
+    return {"$text": {"$search": text}}
+
+
+def movie_filter(genre=None, min_rating=None, title=None):
+    """Filter used by the GUI 'Recommend' button."""
+    query = {}
+    if min_rating is not None:
+        query["rating"] = {"$gte": min_rating}
+    if genre:
+        query["genres"] = genre
+    if title:
+        query.update(title_prefix_filter(title))
+    return query
+
+
+# --- Keyset pagination on (rating, _id) ---
+
+def page_sort(sort_dir=-1):
+    return [("rating", sort_dir), ("_id", sort_dir)]
+
+
+def keyset_filter(after, sort_dir=-1):
+    """Movies that sort after the document `after` in page_sort(sort_dir) order.
+
+    Unlike skip(), this costs the same on page 1000 as on page 1: the
+    (rating, _id) index seeks straight to the boundary. Missing ratings
+    sort as null, below every number.
+    """
+    rating, last_id = after.get("rating"), after["_id"]
+    op = "$lt" if sort_dir < 0 else "$gt"
+    same_rating = {"rating": rating, "_id": {op: last_id}}
+    if rating is None:
+        return same_rating if sort_dir < 0 else {"$or": [same_rating, {"rating": {"$ne": None}}]}
+    clauses = [{"rating": {op: rating}}, same_rating]
+    if sort_dir < 0:
+        clauses.append({"rating": None})
+    return {"$or": clauses}
+
+
+def find_page(query, after=None, sort_dir=-1, limit=PAGE_SIZE, projection=None):
+    """One page of movies matching `query`, starting after the last document of the previous page."""
+    if after is not None:
+        query = {"$and": [query, keyset_filter(after, sort_dir)]}
+    cursor = movies().find(query, projection or RESULT_FIELDS).sort(page_sort(sort_dir)).limit(limit)
+    return list(cursor)
+
+
+def summarize(query):
+    """Match count and average rating, computed by the server."""
+    result = list(movies().aggregate([
+        {"$match": query},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "avg": {"$avg": "$rating"}}},
+    ]))
+    return result[0] if result else {"count": 0, "avg": None}
+
+
+# --- Query-plan diagnostics ---
+
+def _plan_stages(plan):
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        if plan.get("indexName"):
+            stages[-1] += f"({plan['indexName']})"
+        children = plan.get("inputStages") or []
+        plan = plan.get("inputStage") or (children[0] if children else None)
+    return stages
+
+
+def explain(query, sort=None, limit=None, projection=None):
+    """Summarize how MongoDB executes a find: winning plan stages and work done."""
+    cursor = movies().find(query, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    result = cursor.explain()
+
+    planner = result.get("queryPlanner", {})
+    stages = _plan_stages(planner.get("winningPlan", {}).get("queryPlan", planner.get("winningPlan", {})))
+    stats = result.get("executionStats", {})
+    return {
+        "uses_index": any(s.startswith(("IXSCAN", "TEXT", "IDHACK", "COUNT_SCAN")) for s in stages if s),
+        "stages": stages,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+        "ms": stats.get("executionTimeMillis"),
+    }
+
+
+def gui_queries(sample_genre="Comedy", sample_title="the"):
+    """The queries the GUIs issue, as (label, query, sort, limit)."""
+    next_page = {"$and": [movie_filter(sample_genre, 3.5),
+                          keyset_filter({"rating": 4.0, "_id": ObjectId()})]}
+    return [
+        ("Recommend: min rating", movie_filter(min_rating=3.5), page_sort(), PAGE_SIZE),
+        ("Recommend: genre + rating", movie_filter(sample_genre, 3.5), page_sort(), PAGE_SIZE),
+        ("Recommend: genre + rating, next page", next_page, page_sort(), PAGE_SIZE),
+        ("Recommend: genre + title", movie_filter(sample_genre, 0, sample_title), page_sort(), PAGE_SIZE),
+        ("Top 5 movies", {}, [("rating", -1)], 5),
+        ("Dashboard search (prefix)", title_prefix_filter(sample_title), page_sort(), PAGE_SIZE),
+        ("Dashboard search (words)", title_text_filter(sample_title), page_sort(), PAGE_SIZE),
+    ]
+
+
+def explain_gui_queries():
+    ensure_indexes()
+    report = []
+    for label, query, sort, limit in gui_queries():
+        summary = explain(query, sort, limit)
+        report.append((label, summary))
+        mark = "✅" if summary["uses_index"] else "❌"
+        print(f"{mark} {label}: {' <- '.join(s for s in summary['stages'] if s)} | "
+              f"keys {summary['keys_examined']}, docs {summary['docs_examined']}, "
+              f"returned {summary['returned']}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Movie database maintenance.")
+    parser.add_argument("--ensure-indexes", action="store_true", help="create indexes and backfill title_norm")
+    parser.add_argument("--explain", action="store_true", help="report whether each GUI query uses an index")
+    args = parser.parse_args()
+
+    if args.ensure_indexes:
+        ensure_indexes()
+        print("✅ Indexes are in place.")
+    if args.explain:
+        explain_gui_queries()
+
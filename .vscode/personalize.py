@@ -0,0 +1,157 @@
+"""Likes, tags and the "recommended for you" profile of each dashboard user.
+
+Likes and tags are keyed by (user, movieId) with unique indexes, so every
+action is one atomic upsert. Each user's profile is the sum of the unit
+ALS item vectors of the movies they liked, kept in user_profiles and
+updated with one $inc per like; recommending is a single matrix-vector
+product against every item vector.
+"""
+
+import os
+import time
+
+import numpy as np
+import pymongo
+
+import movie_repository as repo
+from matrix_factorization import ALSRecommender, MF_MODEL_DIR
+
+TAGS = ("watched", "to_watch")
+
+likes = repo.user_likes()
+tags = repo.user_tags()
+profiles = repo.get_db()["user_profiles"]
+
+
+# --- Likes and tags ---
+
+def like(user, movie):
+    """Like a movie; returns False if the user already liked it."""
+    result = likes.update_one(
+        {"user": user, "movieId": movie["movieId"]},
+        {"$setOnInsert": {"title": movie["title"], "liked_at": time.time()}},
+        upsert=True,
+    )
+    if result.upserted_id is None:
+        return False
+    vectors = get_item_vectors()
+    if vectors is not None:
+        vectors.add_like(user, movie["movieId"])
+    return True
+
+
+def tag(user, movie, tag_name):
+    """Set the user's tag for a movie (a movie is either watched or to watch)."""
+    if tag_name not in TAGS:
+        raise ValueError(f"unknown tag {tag_name!r}")
+    tags.update_one(
+        {"user": user, "movieId": movie["movieId"]},
+        {"$set": {"title": movie["title"], "tag": tag_name}},
+        upsert=True,
+    )
+
+
+def liked(user):
+    return list(likes.find({"user": user, "movieId": {"$exists": True}}, {"movieId": 1, "title": 1, "_id": 0})
+                .sort("liked_at", pymongo.ASCENDING))
+
+
+def tagged(user):
+    return list(tags.find({"user": user, "movieId": {"$exists": True}}, {"movieId": 1, "title": 1, "tag": 1, "_id": 0}))
+
+
+# --- Profiles ---
+
+class ItemVectors:
+    """Unit-length ALS item factors, and the per-user sums built from them."""
+
+    def __init__(self, model_dir=MF_MODEL_DIR):
+        model = ALSRecommender(model_dir).load()
+        items = np.asarray(model.item_factors, dtype=np.float32)
+        norms = np.linalg.norm(items, axis=1, keepdims=True)
+        self.unit = items / np.where(norms > 0, norms, 1.0)
+        self.item_ids = model.item_ids
+        self.positions = {int(m): i for i, m in enumerate(self.item_ids)}
+        # Profiles built against other factors are meaningless; tag them with the model they came from
+        self.model_tag = os.path.getmtime(os.path.join(model_dir, "item_factors.npy"))
+
+    def vector(self, movie_id):
+        position = self.positions.get(int(movie_id))
+        return None if position is None else self.unit[position]
+
+    def add_like(self, user, movie_id):
+        """Fold one new like into the stored profile: one atomic $inc, no recomputation."""
+        vector = self.vector(movie_id)
+        if vector is None:
+            return  # movie unknown to the model (e.g. added by hand); it still counts as liked
+        increments = {f"sum.{i}": float(x) for i, x in enumerate(vector)}
+        increments["count"] = 1
+        result = profiles.update_one({"_id": user, "model": self.model_tag}, {"$inc": increments})
+        if result.matched_count == 0:
+            self.rebuild(user)  # no profile yet, or one from an older model
+
+    def rebuild(self, user):
+        """Recompute a profile from all of the user's likes."""
+        total = np.zeros(self.unit.shape[1], dtype=np.float64)
+        count = 0
+        for entry in likes.find({"user": user, "movieId": {"$exists": True}}, {"movieId": 1}):
+            vector = self.vector(entry["movieId"])
+            if vector is not None:
+                total += vector
+                count += 1
+        profile = {"model": self.model_tag, "count": count, "sum": {str(i): float(x) for i, x in enumerate(total)}}
+        profiles.replace_one({"_id": user}, profile, upsert=True)
+        return total, count
+
+    def profile(self, user):
+        """(summed vector, number of liked movies in it) for a user."""
+        doc = profiles.find_one({"_id": user})
+        if doc is None or doc.get("model") != self.model_tag:
+            return self.rebuild(user)
+        total = np.array([doc["sum"].get(str(i), 0.0) for i in range(self.unit.shape[1])])
+        return total, doc["count"]
+
+    def recommend(self, user, n=10, exclude=()):
+        """Top-n (movieIds, scores) by cosine to the mean of the user's liked vectors."""
+        total, count = self.profile(user)
+        if not count:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = total / (np.linalg.norm(total) or 1.0)
+        scores = self.unit @ query.astype(np.float32)
+        skip = list({self.positions[m] for m in map(int, exclude) if m in self.positions})  # liked and watched overlap
+        scores[skip] = -np.inf
+        n = min(n, len(scores) - len(skip))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+        return self.item_ids[top], scores[top]
+
+
+_vectors = None
+
+
+def get_item_vectors():
+    """The loaded item vectors, or None if no ALS model has been trained yet."""
+    global _vectors
+    if _vectors is None and os.path.exists(os.path.join(MF_MODEL_DIR, "meta.json")):
+        _vectors = ItemVectors()
+    return _vectors
+
+
+def recommended_for(user, n=10):
+    """Movie records (RESULT_FIELDS plus `score`) for the 'Recommended for you' panel.
+
+    Liked and watched movies are left out. Empty without a trained model or any likes.
+    """
+    vectors = get_item_vectors()
+    if vectors is None:
+        return []
+    seen = [e["movieId"] for e in likes.find({"user": user, "movieId": {"$exists": True}}, {"movieId": 1})]
+    seen += [e["movieId"] for e in tags.find({"user": user, "tag": "watched", "movieId": {"$exists": True}},
+                                             {"movieId": 1})]
+    movie_ids, scores = vectors.recommend(user, n, seen)
+    if not len(movie_ids):
+        return []
+    by_id = {m["movieId"]: m for m in repo.movies().find({"movieId": {"$in": movie_ids.tolist()}}, repo.RESULT_FIELDS)}
+    return [dict(by_id[int(m)], score=float(s)) for m, s in zip(movie_ids, scores) if int(m) in by_id]
@@ -1,44 +1,342 @@
+import os
+import time
+import asyncio
+import hashlib
+import sqlite3
+import argparse
+import threading
+
 import requests
-from duckduckgo_search import DDGS
-from PIL import Image
-from io import BytesIO
+from requests.adapters import HTTPAdapter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+POSTER_CACHE_DIR = os.path.join(SCRIPT_DIR, "poster_cache")
+
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+CONCURRENCY = 8           # searches + downloads in flight at once
+MISS_TTL = 24 * 3600      # seconds before a title with no poster is searched again
+TIMEOUT = 15
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+def make_session(pool_size=CONCURRENCY):
+    """One requests.Session for every download, so connections are reused."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+# --- Backends: search(title) -> url or None, download(url) -> bytes ---
+# Both are blocking callables; the service runs them on worker threads. Swap
+# them for anything with the same shape, e.g. a local stub server in tests.
 
-def download_poster(title):
-    try:
-        print(f"🔍 Searching poster for: {title}")
+class DuckDuckGoSearch:
+    """First image result for '<title> movie poster'."""
+
+    def __call__(self, title):
+        from duckduckgo_search import DDGS  # only needed when this backend is used
 
-        # Use DuckDuckGo search
         with DDGS() as ddgs:
             results = list(ddgs.images(title + " movie poster", max_results=1))
-            if not results:
-                print("❌ No image results found.")
-                return
-            url = results[0]['image']
-            print(f"✅ Poster URL: {url}")
-
-        # Fix TMDB host if needed
-        if "themoviedb.org/t/p" in url:
-            url = url.replace("www.themoviedb.org/t/p", "image.tmdb.org/t/p")
-            print(f"🔁 Fixed TMDB URL: {url}")
-
-        headers = {
-            "User-Agent": "Mozilla/5.0"
-        }
-        response = requests.get(url, headers=headers, timeout=15)
+        if not results:
+            return None
+        url = results[0]["image"]
+        # TMDB page URLs serve HTML; the image host serves the file itself
+        return url.replace("www.themoviedb.org/t/p", "image.tmdb.org/t/p")
+
+
+class JsonSearch:
+    """GET `endpoint?q=<title>` and read the image URL from a JSON field."""
+
+    def __init__(self, endpoint, session=None, field="image"):
+        self.endpoint = endpoint
+        self.session = session or make_session()
+        self.field = field
+
+    def __call__(self, title):
+        response = self.session.get(self.endpoint, params={"q": title}, timeout=TIMEOUT)
+        response.raise_for_status()
+        return response.json().get(self.field) or None
+
+
+class HttpDownload:
+    def __init__(self, session=None):
+        self.session = session or make_session()
+
+    def __call__(self, url):
+        response = self.session.get(url, timeout=TIMEOUT)
         response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "")
+        if not content_type.startswith("image/"):
+            raise ValueError(f"{url} returned {content_type or 'no content type'}, not an image")
+        return response.content
+
+
+# --- Disk cache ---
+
+class PosterCache:
+    """Content-addressed poster store with LRU eviction.
+
+    Image bytes live in blobs/<sha256[:2]>/<sha256>, so movies that share a
+    poster share one file. index.sqlite maps each movie key to its URL, blob
+    digest and last use. Eviction drops the bytes of the least recently used
+    movies but keeps their URL, so a later request skips the search.
+    """
+
+    def __init__(self, cache_dir=POSTER_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(cache_dir, "blobs"), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS posters (
+                key TEXT PRIMARY KEY, url TEXT, digest TEXT, size INTEGER, checked REAL, used REAL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS posters_used ON posters (used)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS posters_digest ON posters (digest)")
+        self.db.commit()
+
+    def blob_path(self, digest):
+        return os.path.join(self.cache_dir, "blobs", digest[:2], digest)
+
+    def lookup(self, key):
+        """(url, bytes or None, checked time) for a cached key, or None if never seen."""
+        with self.lock:
+            row = self.db.execute("SELECT url, digest, checked FROM posters WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            url, digest, checked = row
+            data = None
+            if digest:
+                try:
+                    with open(self.blob_path(digest), "rb") as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    self.db.execute("UPDATE posters SET digest = NULL, size = NULL WHERE key = ?", (key,))
+                self.db.execute("UPDATE posters SET used = ? WHERE key = ?", (time.time(), key))
+                self.db.commit()
+            return url, data, checked
+
+    def store(self, key, url, data=None):
+        """Record a key's URL (None = no poster found) and, if given, its bytes."""
+        digest = size = None
+        if data is not None:
+            digest = hashlib.sha256(data).hexdigest()
+            size = len(data)
+            path = self.blob_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO posters (key, url, digest, size, checked, used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, digest, size, now, now),
+            )
+            self.db.commit()
+        if data is not None:
+            self.evict()
+
+    def digests(self):
+        """Digests of every poster currently stored."""
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT DISTINCT digest FROM posters WHERE digest IS NOT NULL")]
+
+    def total_bytes(self):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT SUM(size) FROM (SELECT DISTINCT digest, size FROM posters WHERE digest IS NOT NULL)"
+            ).fetchone()
+        return row[0] or 0
+
+    def evict(self):
+        """Drop least recently used blobs until the cache fits in max_bytes."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+        freed = 0
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT digest, MAX(used), MAX(size) FROM posters WHERE digest IS NOT NULL "
+                "GROUP BY digest ORDER BY MAX(used)"
+            ).fetchall()
+            for digest, _, size in rows:
+                if total - freed <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.blob_path(digest))
+                except FileNotFoundError:
+                    pass
+                self.db.execute("UPDATE posters SET digest = NULL, size = NULL WHERE digest = ?", (digest,))
+                freed += size
+            self.db.commit()
+        return freed
+
+    def close(self):
+        with self.lock:
+            self.db.close()
 
-        img = Image.open(BytesIO(response.content))
-        img.verify()
-        img = Image.open(BytesIO(response.content))
 
-        img.show()
-        filename = f"{title.replace(' ', '_')}_poster.jpg"
-        img.save(filename)
-        print(f"💾 Poster saved as: {filename}")
+# --- Service ---
+
+class PosterService:
+    """Fetch posters concurrently on one background event loop.
+
+    At most `concurrency` searches/downloads run at once, and concurrent
+    requests for the same movie share one fetch. Blocking callers (the Tk
+    GUI's worker threads, the CLI) use `get_poster` and `prefetch`; async
+    code can await `poster` and `prefetch_async` on `self.loop`.
+    """
+
+    def __init__(self, search=None, download=None, cache=None, concurrency=CONCURRENCY):
+        session = make_session(concurrency)
+        self.search = search or DuckDuckGoSearch()
+        self.download = download or HttpDownload(session)
+        self.cache = cache or PosterCache()
+        self.concurrency = concurrency
+        self.inflight = {}
+        self.loop = asyncio.new_event_loop()
+        self.limit = None
+        self.thread = threading.Thread(target=self._run, name="poster-loop", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.limit = asyncio.Semaphore(self.concurrency)
+        self.loop.run_forever()
+
+    @staticmethod
+    def key(movie_id, title):
+        """Cache key: the MovieLens movieId, or the title for movies added without one."""
+        return f"m{int(movie_id)}" if movie_id is not None else "t" + hashlib.sha1(title.encode()).hexdigest()
+
+    async def poster(self, movie_id, title):
+        """Poster bytes for a movie, or None if no poster could be found."""
+        key = self.key(movie_id, title)
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, title))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await task
+
+    async def _fetch(self, key, title):
+        cached = await asyncio.to_thread(self.cache.lookup, key)
+        url = None
+        if cached is not None:
+            url, data, checked = cached
+            if data is not None:
+                return data
+            if url is None and time.time() - checked < MISS_TTL:
+                return None
+
+        async with self.limit:
+            if url is None:
+                url = await asyncio.to_thread(self.search, title)
+                if url is None:
+                    await asyncio.to_thread(self.cache.store, key, None)
+                    return None
+            data = await asyncio.to_thread(self.download, url)
+        await asyncio.to_thread(self.cache.store, key, url, data)
+        return data
+
+    async def prefetch_async(self, movies):
+        """Warm the cache for (movie_id, title) pairs; returns {"cached", "missing", "failed"} counts."""
+        counts = {"cached": 0, "missing": 0, "failed": 0}
+
+        async def one(movie_id, title):
+            try:
+                data = await self.poster(movie_id, title)
+                counts["cached" if data is not None else "missing"] += 1
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"⚠️ Poster for '{title}' failed: {e}")
+
+        await asyncio.gather(*(one(movie_id, title) for movie_id, title in movies))
+        return counts
+
+    def get_poster(self, movie_id, title, timeout=None):
+        return asyncio.run_coroutine_threadsafe(self.poster(movie_id, title), self.loop).result(timeout)
+
+    def prefetch(self, movies):
+        return asyncio.run_coroutine_threadsafe(self.prefetch_async(movies), self.loop).result()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.cache.close()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """The process-wide service with the default backends."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PosterService()
+    return _service
+
+
+def get_poster(movie_id, title):
+    return get_service().get_poster(movie_id, title)
+
+
+def download_poster(title, movie_id=None):
+    """Fetch a poster through the cache and save a copy as <title>_poster.jpg."""
+    data = get_poster(movie_id, title)
+    if data is None:
+        print(f"❌ No poster found for: {title}")
+        return None
+    filename = f"{title.replace(' ', '_')}_poster.jpg"
+    with open(filename, "wb") as f:
+        f.write(data)
+    print(f"💾 Poster saved as: {filename}")
+    return filename
+
+
+def movies_for_titles(titles):
+    """(movieId, title) pairs, looking the movieIds up in MongoDB."""
+    import movie_repository as repo
+
+    found = {m["title"]: m.get("movieId") for m in repo.movies().find({"title": {"$in": titles}}, {"title": 1, "movieId": 1})}
+    return [(found.get(title), title) for title in titles]
 
-    except Exception as e:
-        print("⚠️ Error fetching poster:", e)
 
-# Test
 if __name__ == "__main__":
-    download_poster("Nixon (1995)")
+    parser = argparse.ArgumentParser(description="Fetch and cache movie posters.")
+    parser.add_argument("titles", nargs="*", help="movie titles, e.g. 'Nixon (1995)'")
+    parser.add_argument("--prefetch", metavar="FILE", help="warm the cache for the titles in FILE, one per line")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--search-endpoint", help="JSON search service to use instead of DuckDuckGo")
+    args = parser.parse_args()
+
+    titles = list(args.titles)
+    if args.prefetch:
+        with open(args.prefetch, encoding="utf-8") as f:
+            titles += [line.strip() for line in f if line.strip()]
+    if not titles:
+        parser.error("give titles or --prefetch FILE")
+
+    search = JsonSearch(args.search_endpoint) if args.search_endpoint else None
+    _service = PosterService(search=search, concurrency=args.concurrency)
+
+    if args.prefetch:
+        started = time.perf_counter()
+        counts = _service.prefetch(movies_for_titles(titles))
+        print(f"✅ {counts['cached']} posters cached, {counts['missing']} not found, "
+              f"{counts['failed']} failed in {time.perf_counter() - started:.1f}s")
+    else:
+        for movie_id, title in movies_for_titles(titles):
+            download_poster(title, movie_id)
+    _service.close()
@@ -0,0 +1,88 @@
+import time
+import threading
+from collections import OrderedDict
+
+import movie_repository as repo
+
+MAX_ENTRIES = 512
+TTL = 300.0            # seconds a result may be served, even if nothing says it changed
+VERSION_CHECK = 2.0    # seconds between catalog version reads; writes elsewhere show up within this
+
+
+def normalize_filters(genre=None, min_rating=None, title=None):
+    """The cache key part for a GUI filter: inputs that run the same query get the same key
+    ('' and None are no genre; 'Toy ' and 'toy' both search title_norm 'toy')."""
+    return (
+        genre or None,
+        float(min_rating) if min_rating is not None else None,
+        repo.title_norm(title) if title and title.strip() else None,
+    )
+
+
+class QueryCache:
+    """Thread-safe LRU of query results with a TTL, dropped whenever the catalog version moves.
+
+    A hit costs a dict lookup: the version counter is read at most every
+    `version_check` seconds, and writes made by this process call
+    `invalidate()` directly so they never wait for that. Results are shared
+    between callers and must not be mutated.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL, version_check=VERSION_CHECK):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_check = version_check
+        self.entries = OrderedDict()   # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0.0
+        self.hits = self.misses = 0
+
+    def _check_version(self, now):
+        if now - self.checked_at < self.version_check:
+            return
+        version = repo.catalog_version()
+        with self.lock:
+            self.checked_at = now
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+
+    def get(self, key, compute, *args):
+        """`compute(*args)`, or its cached result for `key`."""
+        now = time.monotonic()
+        self._check_version(now)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self.version
+
+        value = compute(*args)
+        with self.lock:
+            # Skip storing if the catalog changed while we were computing
+            if version == self.version:
+                self.entries[key] = (now + self.ttl, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, version=None):
+        """Drop everything; pass the version returned by repo.bump_catalog_version() after a write."""
+        with self.lock:
+            self.entries.clear()
+            self.version = version
+            self.checked_at = time.monotonic() if version is not None else 0.0
+
+
+# Shared by the GUIs of this process
+results = QueryCache()
+
+
+def cached(name, compute, *args, key=None):
+    """`compute(*args)` through the shared cache, keyed by `name` and `key` (default: the args)."""
+    return results.get((name, args if key is None else key), compute, *args)
@@ -1,71 +1,391 @@
-from pymongo import MongoClient
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import pandas as pd
-import difflib
+import numpy as np
+import threading
+import argparse
+import json
+import os
 
-# Connect to MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client["movie_db"]
-collection = db["movies"]
+from title_index import TitleIndex
+from hybrid_scorer import HybridScorer, DEFAULT_WEIGHTS, top_k
+import movie_repository as repo
+import columnar_store
 
-# Load data from MongoDB
-movies = list(collection.find())
+# Connect to MongoDB (the client connects lazily, so importing stays cheap)
+collection = repo.movies()
 
-# Check if we have movies
-if not movies:
-    print("⚠️ No movies found in the database. Please add some first.")
-    exit()
+# Precomputed top-K neighbor index (built offline with --build-index)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(SCRIPT_DIR, "neighbor_index")
+DEFAULT_TOP_K = 50
+BLOCK_SIZE = 512
+ENGINE_FIELDS = {**repo.MODEL_FIELDS, "rating_sum": 1, "rating_count": 1}
+CONTENT_ONLY = {"content": 1.0, "rating": 0.0, "popularity": 0.0, "recency": 0.0}
 
-# Convert to DataFrame
-df = pd.DataFrame(movies)
 
-# Drop rows without genres or non-lists
-df = df[df['genres'].map(lambda x: isinstance(x, list))].copy()
+def build_neighbor_index(matrix, k=DEFAULT_TOP_K, block_size=BLOCK_SIZE):
+    """Top-k cosine neighbors for every row, computed one block of rows at a time.
 
-# Check if anything is left
-if df.empty:
-    print("⚠️ No valid movies with genre data found. Please check your database.")
-    exit()
+    TF-IDF rows are L2-normalized, so a sparse dot product is the cosine
+    similarity. Only a (block_size x N) float32 slab is dense at any time,
+    instead of the full N x N matrix. Ties go to the lower row number.
+    """
+    matrix = matrix.tocsr().astype(np.float32)
+    n = matrix.shape[0]
+    k = max(0, min(k, n - 1))
+    neighbors = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
 
-# Combine genres into a single string
-df["genre_text"] = df["genres"].apply(lambda g: " ".join(g).lower())
+    transposed = matrix.T.tocsc()
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        sims = (matrix[start:stop] @ transposed).toarray()
+        rows = np.arange(stop - start)
+        sims[rows, rows + start] = -np.inf  # a movie is not its own neighbor
+        neighbors[start:stop], scores[start:stop] = top_k(sims, k)
 
-# TF-IDF Vectorizer
-vectorizer = TfidfVectorizer()
-tfidf_matrix = vectorizer.fit_transform(df["genre_text"])
+    return neighbors, scores
 
-# Cosine similarity matrix
-cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
 
-# Map titles to DataFrame indices
-indices = pd.Series(df.index, index=df['title']).drop_duplicates()
+def rating_totals(df):
+    """(rating_sum, rating_count) per row: from the documents when the loader stored
+    them, otherwise aggregated from rating.csv."""
+    if "rating_count" in df and df["rating_count"].notna().any():
+        counts = df["rating_count"].fillna(0).to_numpy(dtype=np.float64, copy=True)
+        sums = df["rating_sum"].fillna(0).to_numpy(dtype=np.float64, copy=True)
+    else:
+        from collab_filter import load_ratings
 
-# 🎯 Recommend similar movies
-def recommend(title, top_n=5):
-    all_titles = list(indices.keys())
-    
-    # Fuzzy match to find closest movie title
-    closest = difflib.get_close_matches(title, all_titles, n=1, cutoff=0.6)
-    if not closest:
-        print(f"❌ No similar movie found for '{title}'.")
-        print("✅ Available titles:", all_titles[:10], "...")
-        return []
+        totals = load_ratings().groupby("movieId")["rating"].agg(["sum", "count"])
+        totals = totals.reindex(df["movieId"]).fillna(0)
+        counts = totals["count"].to_numpy(dtype=np.float64, copy=True)
+        sums = totals["sum"].to_numpy(dtype=np.float64, copy=True)
+    # Movies rated by hand in the GUI have a rating but no votes behind it: count it as one vote
+    hand_rated = (counts == 0) & df["rating"].notna().to_numpy()
+    counts[hand_rated] = 1
+    sums[hand_rated] = df["rating"].to_numpy(dtype=np.float64, na_value=0)[hand_rated]
+    return sums, counts
+
+
+def save_neighbor_index(neighbors, scores, keys, index_dir=INDEX_DIR, source=None, version=None):
+    """Write the index with the catalog it was built from: `source` is repo.source() of the
+    collection and `version` its catalog version when the rows were read."""
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, "neighbors.npy"), neighbors)
+    np.save(os.path.join(index_dir, "scores.npy"), scores)
+    np.save(os.path.join(index_dir, "keys.npy"), keys)
+    with open(os.path.join(index_dir, "meta.json"), "w") as f:
+        json.dump({"source": source, "version": version, "k": int(neighbors.shape[1])}, f)
+
+
+def load_neighbor_index(keys, index_dir=INDEX_DIR, source=None, version=None):
+    """Memory-map a saved index; returns None if it is missing or was built from other rows,
+    another database (versions are per database) or another catalog version."""
+    try:
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            meta = json.load(f)
+        saved_keys = np.load(os.path.join(index_dir, "keys.npy"))
+        neighbors = np.load(os.path.join(index_dir, "neighbors.npy"), mmap_mode="r")
+        scores = np.load(os.path.join(index_dir, "scores.npy"), mmap_mode="r")
+    except FileNotFoundError:
+        return None
+
+    if meta.get("source") != source or meta.get("version") != version or not np.array_equal(saved_keys, keys):
+        return None
+    return neighbors, scores
+
+
+class EngineState:
+    """Everything one load of the catalog produced. Built completely, then swapped in as a unit,
+    so a reader never pairs rows of one load with the index of another."""
+
+    def __init__(self, version, df, tfidf_matrix, indices, title_index, hybrid, neighbor_index=None):
+        self.version = version
+        self.df = df
+        self.tfidf_matrix = tfidf_matrix
+        self.indices = indices
+        self.title_index = title_index
+        self.hybrid = hybrid
+        # (neighbors, scores), attached once by RecommenderEngine.neighbor_index on first content-only query
+        self.neighbor_index = neighbor_index
+
+    @classmethod
+    def empty(cls, version):
+        return cls(version, pd.DataFrame(columns=["title", "genres", "rating"]), None, pd.Series(dtype="int64"),
+                   TitleIndex([]), None, (np.empty((0, 0), dtype=np.int32), np.empty((0, 0), dtype=np.float32)))
+
+    def index_keys(self):
+        """Identify the rows the index was built for, so a stale index is detected."""
+        return self.df["_id"].astype(str).to_numpy(dtype="U24")
+
+
+class RecommenderEngine:
+    """Genre TF-IDF recommender that loads its model on first use.
+
+    One instance can be shared by the GUI or a service: the Mongo scan and
+    TF-IDF fit happen once, until `refresh()` is called. The top-K neighbor
+    index is only needed by content-only queries, so it is loaded from disk
+    or built (and saved) on the first such query of each load, not on every
+    reload. Each query reads `self.state` once and uses that snapshot
+    throughout, so reloads on other threads never change the model under it.
+    """
+
+    def __init__(self, movies_collection=None, index_dir=INDEX_DIR, top_k=DEFAULT_TOP_K):
+        self.collection = collection if movies_collection is None else movies_collection
+        self.index_dir = index_dir
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self.state = None
+
+    # Read-only views of the current state, for callers outside the engine
+    version = property(lambda self: self.state.version if self.state else None)
+    df = property(lambda self: self.state.df if self.state else None)
+    hybrid = property(lambda self: self.state.hybrid if self.state else None)
+
+    @property
+    def neighbors(self):
+        index = self.state.neighbor_index if self.state else None
+        return index[0] if index else None
+
+    # ----- model lifecycle -----
+
+    def _load(self):
+        """Build a new EngineState from the collection; touches no shared attributes."""
+        version = repo.catalog_version()
+        # A current columnar snapshot loads without a collection scan; otherwise read MongoDB
+        store = columnar_store.open_current(movies_collection=self.collection)
+        if store is not None:
+            df = store.frame()
+        else:
+            df = pd.DataFrame(list(self.collection.find({}, ENGINE_FIELDS)))
+
+        # Check if we have movies
+        if df.empty:
+            print("⚠️ No movies found in the database. Please add some first.")
+            return EngineState.empty(version)
+
+        # Drop rows without genres or non-lists
+        df = df[df['genres'].map(lambda x: isinstance(x, list))].copy()
+
+        # Check if anything is left
+        if df.empty:
+            print("⚠️ No valid movies with genre data found. Please check your database.")
+            return EngineState.empty(version)
+
+        # Positional rows: the neighbor index stores row numbers, not labels
+        df = df.reset_index(drop=True)
+
+        # Combine genres into a single string
+        df["genre_text"] = df["genres"].apply(lambda g: " ".join(g).lower())
+
+        # TF-IDF Vectorizer
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform(df["genre_text"])
+        if "movieId" not in df:
+            df["movieId"] = None
+        if "rating" not in df:
+            df["rating"] = None
+        rating_sum, rating_count = rating_totals(df)
+        hybrid = HybridScorer(tfidf_matrix.toarray(), rating_sum, rating_count, df["title"], df["genres"])
+        df["title_norm"] = df["title"].map(repo.title_norm)
 
-    matched_title = closest[0]
-    print(f"✅ Using closest match: '{matched_title}'")
+        # Map titles to DataFrame indices (first row wins for duplicate titles)
+        indices = pd.Series(df.index, index=df['title'])
+        indices = indices[~indices.index.duplicated()]
 
-    idx = indices[matched_title]
-    sim_scores = list(enumerate(cosine_sim[idx]))
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)[1:top_n+1]
-    movie_indices = [i[0] for i in sim_scores]
+        return EngineState(version, df, tfidf_matrix, indices, TitleIndex(indices.index), hybrid)
 
-    return df.iloc[movie_indices][["title", "genres", "rating"]].to_dict("records")
+    def ensure_loaded(self):
+        """The current state, loading it on first use."""
+        state = self.state
+        if state is not None:
+            return state
+        with self._lock:
+            if self.state is None:
+                self.state = self._load()
+            return self.state
+
+    def ensure_current(self):
+        """Load, or reload if the catalog changed since the last load; returns the state."""
+        state = self.state
+        if state is not None and state.version == repo.catalog_version():
+            return state
+        with self._lock:
+            # Another caller may have reloaded while this one waited for the lock
+            if self.state is None or self.state.version != repo.catalog_version():
+                self.state = self._load()
+            return self.state
+
+    def refresh(self):
+        """Reload from the collection, e.g. after movies were added or deleted."""
+        with self._lock:
+            self.state = self._load()
+            return self.state
+
+    def index_keys(self):
+        return self.ensure_loaded().index_keys()
+
+    def neighbor_index(self, state, rebuild=False):
+        """(neighbors, scores) for `state`: the saved index if it was built from this catalog,
+        otherwise built with `self.top_k` and saved for the next load. The only place it is built."""
+        if state.neighbor_index is not None and not rebuild:
+            return state.neighbor_index
+        with self._index_lock:
+            if state.neighbor_index is not None and not rebuild:
+                return state.neighbor_index
+            source = repo.source(self.collection)
+            index = None if rebuild else load_neighbor_index(state.index_keys(), self.index_dir, source, state.version)
+            if index is None:
+                print(f"🔨 Building the top-{self.top_k} neighbor index for {len(state.df)} movies...")
+                index = build_neighbor_index(state.tfidf_matrix, k=self.top_k)
+                save_neighbor_index(*index, state.index_keys(), self.index_dir, source, state.version)
+            state.neighbor_index = index
+            return index
+
+    def build_index(self):
+        """Rebuild the neighbor index for the current catalog and save it to disk."""
+        state = self.ensure_current()
+        if state.tfidf_matrix is None:
+            return 0
+        self.neighbor_index(state, rebuild=True)
+        return len(state.df)
+
+    # ----- queries -----
+
+    def match_title(self, title, state=None):
+        # Fuzzy match to find closest movie title
+        state = state or self.ensure_loaded()
+        closest = state.title_index.match(title, n=1, cutoff=0.6)
+        return closest[0] if closest else None
+
+    @staticmethod
+    def _check_top_n(neighbors, top_n):
+        if top_n > neighbors.shape[1]:
+            print(f"⚠️ Index holds {neighbors.shape[1]} neighbors per movie; returning that many.")
+
+    @staticmethod
+    def _content_only(weights):
+        return {**DEFAULT_WEIGHTS, **(weights or {})} == CONTENT_ONLY
+
+    # 🎯 Recommend similar movies
+    def recommend(self, title, top_n=5, weights=None):
+        """Movies to watch after `title`, ranked by the hybrid score.
+
+        `weights` overrides DEFAULT_WEIGHTS per signal (content, rating,
+        popularity, recency). Content-only weights are served from the
+        precomputed neighbor index.
+        """
+        state = self.ensure_loaded()
+        matched_title = self.match_title(title, state)
+        if matched_title is None:
+            return []
+
+        idx = state.indices[matched_title]
+        if self._content_only(weights):
+            neighbors, _ = self.neighbor_index(state)
+            self._check_top_n(neighbors, top_n)
+            movie_indices = np.asarray(neighbors[idx, :top_n])
+            return state.df.iloc[movie_indices][["title", "genres", "rating"]].to_dict("records")
+
+        rows, scores = state.hybrid.similar(idx, top_n, weights)
+        records = state.df.iloc[rows][["title", "genres", "rating"]].to_dict("records")
+        for record, score in zip(records, scores):
+            record["score"] = round(float(score), 4)
+        return records
+
+    def recommend_batch(self, titles, top_n=5, weights=None):
+        """recommend() for several titles with one hybrid scoring pass; one list per title."""
+        state = self.ensure_loaded()
+        results = [[] for _ in titles]
+        matched = []
+        for position, title in enumerate(titles):
+            matched_title = self.match_title(title, state)
+            if matched_title is not None:
+                matched.append((position, state.indices[matched_title]))
+        if not matched or state.hybrid is None:
+            return results
+
+        rows, scores = state.hybrid.similar_many([idx for _, idx in matched], top_n, weights)
+        records = state.df.iloc[rows.ravel()][["title", "genres", "rating"]].to_dict("records")
+        width = rows.shape[1]
+        for n, (position, _) in enumerate(matched):
+            results[position] = records[n * width:(n + 1) * width]
+            for record, score in zip(results[position], scores[n]):
+                record["score"] = round(float(score), 4)
+        return results
+
+    def best_movies(self, n=20, genre=None, min_rating=None, title=None, weights=None):
+        """Top-n movies by shrunk rating, popularity and recency, filtered like the GUI search."""
+        state = self.ensure_loaded()
+        if state.hybrid is None:
+            return []
+        df = state.df
+        mask = np.ones(len(df), dtype=bool)
+        if genre:
+            mask &= state.hybrid.genre_mask(genre)
+        if min_rating:
+            mask &= df["rating"].fillna(-1).to_numpy(dtype=np.float64) >= min_rating
+        if title:
+            mask &= df["title_norm"].str.startswith(repo.title_norm(title)).to_numpy()
+        rows, scores = state.hybrid.best(n, mask, weights)
+        records = df.iloc[rows][["_id", "movieId", "title", "genres", "rating"]].to_dict("records")
+        for record, score in zip(records, scores):
+            record["score"] = round(float(score), 4)
+        return records
+
+    def recommend_many(self, titles, top_n=5):
+        """Content-only recommendations for several titles at once, keyed by the requested title."""
+        state = self.ensure_loaded()
+        neighbors, _ = self.neighbor_index(state)
+        self._check_top_n(neighbors, top_n)
+
+        results = {title: [] for title in titles}
+        matched = []
+        for title in results:
+            matched_title = self.match_title(title, state)
+            if matched_title is not None:
+                matched.append((title, state.indices[matched_title]))
+        if not matched:
+            return results
+
+        # One gather for every query, then one DataFrame slice
+        rows = np.asarray(neighbors[[idx for _, idx in matched], :top_n])
+        records = state.df.iloc[rows.ravel()][["title", "genres", "rating"]].to_dict("records")
+        width = rows.shape[1]
+        for n, (title, _) in enumerate(matched):
+            results[title] = records[n * width:(n + 1) * width]
+        return results
+
+
+# Shared engine for callers that just want `recommend_engine.recommend(...)`
+engine = RecommenderEngine()
+
+
+def recommend(title, top_n=5):
+    return engine.recommend(title, top_n)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hybrid (genre, rating, popularity, recency) movie recommendations.")
+    parser.add_argument("--build-index", action="store_true",
+                        help="precompute the top-K neighbor index and save it to disk")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K,
+                        help="neighbors kept per movie when building the index")
+    for signal, weight in DEFAULT_WEIGHTS.items():
+        parser.add_argument(f"--{signal}", type=float, default=weight, help=f"weight of {signal} (default {weight})")
+    args = parser.parse_args()
+
+    if args.build_index:
+        engine.top_k = args.top_k
+        count = engine.build_index()
+        print(f"✅ Saved top-{engine.neighbors.shape[1]} neighbors for {count} movies to {INDEX_DIR}")
+        exit()
+
     movie_name = input("🎬 Enter a movie name to get recommendations: ").strip()
-    results = recommend(movie_name)
+    results = engine.recommend(movie_name, weights={s: getattr(args, s) for s in DEFAULT_WEIGHTS})
 
     print(f"\n🎯 Top recommendations for '{movie_name}':")
     if results:
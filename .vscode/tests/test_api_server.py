@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import mongomock
+import pytest
+
+import movie_repository as repo
+from api_server import RecommendationService
+from recommend_engine import RecommenderEngine
+
+MOVIES = [
+    (1, "Toy Story (1995)", ["Adventure", "Animation", "Children", "Comedy", "Fantasy"], 3.9),
+    (2, "Jumanji (1995)", ["Adventure", "Children", "Fantasy"], 3.2),
+    (3, "Grumpier Old Men (1995)", ["Comedy", "Romance"], 3.2),
+    (5, "Father of the Bride Part II (1995)", ["Comedy"], 3.1),
+    (6, "Heat (1995)", ["Action", "Crime", "Thriller"], 3.8),
+    (10, "GoldenEye (1995)", ["Action", "Adventure", "Thriller"], 3.4),
+    (16, "Casino (1995)", ["Crime", "Drama"], 3.8),
+    (13, "Balto (1995)", ["Adventure", "Animation", "Children"], 3.3),
+    (48, "Pocahontas (1995)", ["Animation", "Children", "Drama", "Musical", "Romance"], 2.9),
+]
+
+
+@pytest.fixture
+def service(tmp_path):
+    repo.set_client(mongomock.MongoClient())
+    repo.movies().insert_many([
+        {"movieId": movie_id, "title": title, "title_norm": repo.title_norm(title), "genres": genres,
+         "rating": rating, "rating_sum": rating * 10, "rating_count": 10}
+        for movie_id, title, genres, rating in MOVIES
+    ])
+    service = RecommendationService(RecommenderEngine(repo.movies(), index_dir=str(tmp_path)))
+    service.reload()
+    yield service
+    repo.set_client(None)
+
+
+def get(service, target):
+    status, body = asyncio.run(service.respond("GET", target))
+    return status, json.loads(body)
+
+
+def test_concurrent_recommend_requests_share_one_batch(service):
+    titles = ["Toy Story", "Heat", "Casino", "Jumanji"]
+
+    async def main():
+        return await asyncio.gather(*(service.respond("GET", f"/recommend?title={t}&n=2") for t in titles))
+
+    responses = asyncio.run(main())
+    assert service.title_batcher.batches == 1
+    for title, (status, body) in zip(titles, responses):
+        assert status == 200
+        results = [r["title"] for r in json.loads(body)["results"]]
+        single = [r["title"] for r in service.engine.recommend(title, 2)]
+        assert results == single and len(results) == 2
+
+    status, body = get(service, "/recommend?title=Heat&n=2")
+    assert status == 200 and service.cache.hits == 1
+
+
+def test_unknown_title_returns_no_results(service):
+    assert get(service, "/recommend?title=Zzyzx+Qwrt&n=3") == (200, {"title": "Zzyzx Qwrt", "results": []})
+    assert get(service, "/recommend?n=3") == (400, {"error": "title is required"})
+
+
+def test_search_top_and_health(service):
+    status, body = get(service, "/search?q=toy&limit=5")
+    assert status == 200 and [m["title"] for m in body["results"]] == ["Toy Story (1995)"]
+
+    status, body = get(service, "/top?n=5&genre=Crime")
+    assert status == 200 and {m["title"] for m in body["results"]} == {"Heat (1995)", "Casino (1995)"}
+
+    status, body = get(service, "/health")
+    assert status == 200
+    assert body["status"] == "ok" and body["movies"] == len(MOVIES)
+    assert body["catalog_version"] == repo.catalog_version()
+
+    assert get(service, "/nope")[0] == 404
+    assert get(service, "/top?n=abc")[0] == 400
+
+
+def test_response_is_not_cached_when_catalog_changes_mid_request(service, monkeypatch):
+    handle = service.handle
+
+    async def handle_during_reload(path, params):
+        result = await handle(path, params)
+        service.version = repo.bump_catalog_version()   # what watch_catalog does on a change
+        return result
+
+    monkeypatch.setattr(service, "handle", handle_during_reload)
+    assert get(service, "/top?n=2")[0] == 200
+    assert "/top?n=2" not in service.cache.entries
+
+
+def test_serves_http_over_a_socket(service):
+    async def main():
+        server = await asyncio.start_server(service.serve_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /health HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        data = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return data
+
+    head, _, body = asyncio.run(main()).partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK")
+    assert json.loads(body)["status"] == "ok"
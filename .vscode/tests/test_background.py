@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from background import TaskRunner
+
+
+class FakeRoot:
+    """The after()/after_cancel() part of a Tk root, driven by hand instead of a mainloop."""
+
+    def __init__(self):
+        self.pending = {}
+        self.ids = 0
+
+    def after(self, ms, callback):
+        self.ids += 1
+        self.pending[self.ids] = callback
+        return self.ids
+
+    def after_cancel(self, after_id):
+        del self.pending[after_id]
+
+    def run_pending(self):
+        callbacks, self.pending = list(self.pending.values()), {}
+        for callback in callbacks:
+            callback()
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def set(self, value):
+        self.calls.append(value)
+
+    def start(self, interval):
+        self.calls.append("start")
+
+    def stop(self):
+        self.calls.append("stop")
+
+
+@pytest.fixture
+def runner():
+    root = FakeRoot()
+    runner = TaskRunner(root, max_workers=1, status_var=Recorder(), progress=Recorder())
+    yield runner
+    runner.shutdown()
+
+
+def settle(runner, *futures):
+    for future in futures:
+        try:
+            future.exception(timeout=5)
+        except Exception:
+            pass  # cancelled before it started
+    deadline = time.monotonic() + 5
+    while runner.running and time.monotonic() < deadline:
+        runner.root.run_pending()
+
+
+def test_results_are_handed_to_the_main_thread(runner):
+    done = []
+    future = runner.submit("query", lambda: threading.current_thread().name,
+                           on_done=lambda worker: done.append((worker, threading.current_thread().name)))
+    settle(runner, future)
+    [(worker, caller)] = done
+    assert worker.startswith("gui-task") and caller == threading.current_thread().name
+
+
+def test_newer_task_under_the_same_key_supersedes_the_older_one(runner):
+    release = threading.Event()
+    done = []
+    blocker = runner.submit("other", release.wait)
+    queued = runner.submit("query", lambda: "old", on_done=done.append)
+    started = runner.submit("query", lambda: "new", on_done=done.append)
+    assert queued.cancelled()
+
+    release.set()
+    settle(runner, blocker, queued, started)
+    assert done == ["new"]
+
+
+def test_result_of_a_superseded_task_that_already_ran_is_dropped(runner):
+    release = threading.Event()
+    done = []
+    first = runner.submit("query", lambda: release.wait() and "old", on_done=done.append)
+    release.set()
+    first.result(timeout=5)
+    second = runner.submit("query", lambda: "new", on_done=done.append)
+    settle(runner, first, second)
+    assert done == ["new"]
+
+
+def test_cancelled_and_failed_tasks(runner):
+    done, errors = [], []
+    cancelled = runner.submit("query", lambda: "dropped", on_done=done.append)
+    runner.cancel("query")
+    failed = runner.submit("load", lambda: 1 / 0, on_done=done.append, on_error=errors.append)
+    settle(runner, cancelled, failed)
+    assert done == []
+    assert [type(e) for e in errors] == [ZeroDivisionError]
+
+
+def test_status_shows_the_newest_running_task(runner):
+    release = threading.Event()
+    first = runner.submit("clusters", release.wait, status="Clustering...")
+    second = runner.submit("query", lambda: None, status="Searching...")
+    assert runner.status_var.calls == ["Clustering...", "Searching..."]
+    assert runner.progress.calls == ["start"]
+
+    release.set()
+    settle(runner, first, second)
+    assert runner.status_var.calls[-1] == "Ready"
+    assert runner.progress.calls == ["start", "stop"]
+
+
+def test_debounce_keeps_only_the_last_callback(runner):
+    calls = []
+    for text in ("t", "to", "toy"):
+        runner.debounce("search", 300, lambda text=text: calls.append(text))
+    runner.root.run_pending()
+    assert calls == ["toy"]
@@ -0,0 +1,56 @@
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch_recommend
+import movie_repository as repo
+from matrix_factorization import ALSRecommender
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    users, movies = np.divmod(np.arange(30 * 12), 12)
+    keep = rng.random(len(users)) < 0.5
+    ratings = pd.DataFrame({
+        "userId": users[keep] + 1,
+        "movieId": movies[keep] + 100,
+        "rating": rng.integers(1, 11, keep.sum()) / 2.0,
+    })
+    ALSRecommender(str(tmp_path)).fit(ratings, factors=3, iterations=2, workers=1).save()
+
+    repo.set_client(mongomock.MongoClient())
+    repo.movies().insert_many([{"movieId": m, "title": f"Movie {m} (1995)"} for m in range(100, 112)])
+    yield str(tmp_path)
+    repo.set_client(None)
+
+
+def test_every_user_and_movie_gets_its_precomputed_list(model_dir):
+    stale = {"_id": "user:999", "kind": "user", "key": 999, "items": [], "run": 0}
+    repo.recommendations().insert_one(stale)
+    counts = batch_recommend.run_batch(n=3, model_dir=model_dir, workers=1, user_block_size=7, item_block_size=5)
+
+    model = ALSRecommender(model_dir).load()
+    assert counts == {"user": len(model.user_ids), "movie": len(model.item_ids)}
+    assert repo.user_recommendations(999) == []
+
+    for user_id in model.user_ids:
+        movie_ids, scores = model.recommend_for_user(user_id, n=3)
+        items = repo.user_recommendations(user_id)
+        assert [i["movieId"] for i in items] == movie_ids.tolist()
+        np.testing.assert_allclose([i["score"] for i in items], scores, atol=1e-4)
+        assert all(i["title"] == f"Movie {i['movieId']} (1995)" for i in items)
+
+    for movie_id in model.item_ids:
+        items = repo.similar_movies(movie_id)
+        scores = [i["score"] for i in items]
+        assert len(items) == 3 and movie_id not in [i["movieId"] for i in items]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_process_pool_writes_the_same_lists(model_dir):
+    batch_recommend.run_batch(n=3, model_dir=model_dir, workers=1, user_block_size=7, item_block_size=5)
+    serial = {doc["_id"]: doc["items"] for doc in repo.recommendations().find()}
+    batch_recommend.run_batch(n=3, model_dir=model_dir, workers=2, user_block_size=7, item_block_size=5)
+    assert {doc["_id"]: doc["items"] for doc in repo.recommendations().find()} == serial
@@ -0,0 +1,52 @@
+import json
+
+import pandas as pd
+import pytest
+
+import bench
+
+
+@pytest.fixture
+def tiny(monkeypatch):
+    monkeypatch.setitem(bench.SCALES, "tiny", (40, 2_000))
+    return "tiny"
+
+
+def test_generated_data_is_reproducible_and_consistent(tiny, tmp_path):
+    first = bench.generate(tiny, str(tmp_path / "a"))
+    second = bench.generate(tiny, str(tmp_path / "b"))
+    for name in ("movies.csv", "rating.csv"):
+        assert (tmp_path / "a" / tiny / name).read_bytes() == (tmp_path / "b" / tiny / name).read_bytes()
+
+    movies = pd.read_csv(f"{first}/movies.csv")
+    ratings = pd.read_csv(f"{second}/rating.csv")
+    assert len(movies) == 40 and len(ratings) == 2_000
+    assert ratings["movieId"].isin(movies["movieId"]).all()
+    assert ratings["rating"].between(0.5, 5.0).all() and (ratings["rating"] * 2 % 1 == 0).all()
+    assert movies["genres"].str.split("|").map(lambda g: set(g) <= set(bench.GENRES)).all()
+
+
+def test_stage_record_has_throughput_and_percentiles():
+    record = bench.result(2.0, 100, "queries", [0.001] * 98 + [0.1, 0.2])
+    assert (record["seconds"], record["throughput"], record["unit"]) == (2.0, 50.0, "queries")
+    assert record["p50_ms"] == 1.0 and record["p99_ms"] > 100
+    assert record["peak_rss_mb"] > 0
+
+
+def test_run_writes_a_report_and_compare_reads_it(tmp_path, capsys):
+    out = str(tmp_path / "run.json")
+    report = bench.run(["10k"], use_mongomock=True, stages=(), out=out, data_dir=str(tmp_path / "data"))
+    with open(out) as f:
+        assert json.load(f) == report
+    stages = report["scales"]["10k"]["stages"]
+    assert set(stages) == {"ingest", "post_ingest"}
+    assert stages["ingest"]["count"] == sum(bench.SCALES["10k"])
+
+    faster = json.loads(json.dumps(report))
+    faster["commit"] = "next"
+    faster["scales"]["10k"]["stages"]["ingest"]["seconds"] = stages["ingest"]["seconds"] / 2
+    with open(tmp_path / "next.json", "w") as f:
+        json.dump(faster, f)
+    capsys.readouterr()
+    bench.compare(out, str(tmp_path / "next.json"))
+    assert "10k ingest            seconds -50.0%" in capsys.readouterr().out
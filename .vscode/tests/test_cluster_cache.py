@@ -0,0 +1,78 @@
+import mongomock
+import pytest
+
+import cluster_cache
+import movie_repository as repo
+
+MOVIES = [
+    ("Heat (1995)", ["Action", "Crime"], 4.0),
+    ("Ronin (1998)", ["Action", "Crime"], 3.9),
+    ("Toy Story (1995)", ["Animation", "Children"], 4.1),
+    ("Jumanji (1995)", ["Animation", "Children"], 3.2),
+    ("Casino (1995)", ["Drama"], 4.2),
+    ("Nixon (1995)", ["Drama"], 3.8),
+    ("Sabrina (1995)", ["Comedy", "Romance"], 3.4),
+    ("Clueless (1995)", ["Comedy", "Romance"], 3.5),
+    ("Screamers (1995)", ["Horror", "Sci-Fi"], 1.5),
+    ("Species (1995)", ["Horror", "Sci-Fi"], 1.2),
+]
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    repo.set_client(mongomock.MongoClient())
+    monkeypatch.setattr(cluster_cache, "collection", repo.movies())
+    monkeypatch.setattr(cluster_cache, "models", repo.get_db()["cluster_models"])
+    repo.movies().insert_many([
+        {"movieId": n, "title": title, "genres": genres, "rating": rating}
+        for n, (title, genres, rating) in enumerate(MOVIES, 1)
+    ])
+    repo.bump_catalog_version()
+    yield repo.movies()
+    repo.set_client(None)
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    calls = []
+    fit = cluster_cache.fit
+    monkeypatch.setattr(cluster_cache, "fit", lambda: calls.append(1) or fit())
+    return calls
+
+
+def add_movie(title, genres, rating):
+    doc_id = repo.movies().insert_one({"title": title, "genres": genres, "rating": rating}).inserted_id
+    return doc_id, repo.bump_catalog_version()
+
+
+def test_added_movie_joins_its_nearest_cluster_without_a_refit(catalog, fits):
+    assert cluster_cache.cluster_mates({"title": "Heat (1995)"}) == ("ok", ["Ronin (1998)"])
+
+    doc_id, version = add_movie("Heat 2 (2026)", ["Action", "Crime"], 4.0)
+    cluster_cache.movie_added(doc_id, ["Action", "Crime"], 4.0, version)
+    assert cluster_cache.current_model() is not None
+
+    status, mates = cluster_cache.cluster_mates({"_id": doc_id})
+    assert (status, sorted(mates)) == ("ok", ["Heat (1995)", "Ronin (1998)"])
+    assert fits == [1]
+
+
+def test_unrated_movie_is_left_unlabelled_but_keeps_the_model_current(catalog, fits):
+    cluster_cache.cluster_mates({"title": "Heat (1995)"})
+    doc_id, version = add_movie("Unrated (2026)", ["Drama"], None)
+    cluster_cache.movie_added(doc_id, ["Drama"], None, version)
+
+    assert cluster_cache.cluster_mates({"_id": doc_id}) == ("not_found", [])
+    assert fits == [1]
+
+
+def test_missed_update_makes_the_next_lookup_refit(catalog, fits):
+    cluster_cache.cluster_mates({"title": "Heat (1995)"})
+    repo.bump_catalog_version()  # a change the cache never heard about
+    doc_id, version = add_movie("Heat 2 (2026)", ["Action", "Crime"], 4.0)
+    cluster_cache.movie_added(doc_id, ["Action", "Crime"], 4.0, version)
+    assert cluster_cache.current_model() is None
+
+    status, mates = cluster_cache.cluster_mates({"_id": doc_id})
+    assert (status, sorted(mates)) == ("ok", ["Heat (1995)", "Ronin (1998)"])
+    assert fits == [1, 1]
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from collab_filter import ItemItemRecommender
+
+
+def write_csvs(tmp_path):
+    movies = pd.DataFrame({
+        "movieId": [1, 2, 3, 4],
+        "title": ["Men with Guns (1997)", "Heat (1995)", "Men with Guns (1997)", "Casino (1995)"],
+        "genres": ["Action|Drama", "Action|Crime", "Drama", "Crime|Drama"],
+    })
+    # Movie 3 is the better-rated of the two "Men with Guns"; users who liked it liked Heat
+    ratings = pd.DataFrame(
+        [(u, 3, 5.0) for u in range(1, 7)] + [(u, 2, 5.0) for u in range(1, 7)]
+        + [(u, 1, 1.0) for u in range(4, 7)] + [(u, 4, 1.0) for u in range(1, 7)]
+        + [(u, 1, 5.0) for u in range(1, 3)],
+        columns=["userId", "movieId", "rating"],
+    )
+    movies.to_csv(tmp_path / "movies.csv", index=False)
+    ratings.to_csv(tmp_path / "rating.csv", index=False)
+    return tmp_path / "movies.csv", tmp_path / "rating.csv"
+
+
+def test_duplicate_title_resolves_to_most_rated_movie(tmp_path):
+    movies_csv, ratings_csv = write_csvs(tmp_path)
+    recommender = ItemItemRecommender(index_dir=tmp_path / "index", movies_csv=movies_csv)
+    recommender.fit(ratings_csv, k=3, min_item_ratings=2)
+
+    assert int(recommender._title_to_id["Men with Guns (1997)"]) == 3
+    titles = [r["title"] for r in recommender.recommend("Men with Guns (1997)", 3)]
+    assert titles and titles[0] == "Heat (1995)"
+
+
+def test_duplicate_title_survives_save_and_load(tmp_path):
+    movies_csv, ratings_csv = write_csvs(tmp_path)
+    ItemItemRecommender(index_dir=tmp_path / "index", movies_csv=movies_csv).fit(ratings_csv, k=3,
+                                                                                min_item_ratings=2).save()
+    loaded = ItemItemRecommender(index_dir=tmp_path / "index", movies_csv=movies_csv).load()
+    assert int(loaded._title_to_id["Men with Guns (1997)"]) == 3
+
+
+def test_rated_movie_missing_from_catalog_is_skipped(tmp_path):
+    movies_csv, ratings_csv = write_csvs(tmp_path)
+    # Heat, the best neighbor of "Men with Guns", is rated but no longer listed
+    movies = pd.read_csv(movies_csv)
+    movies[movies["movieId"] != 2].to_csv(movies_csv, index=False)
+
+    recommender = ItemItemRecommender(index_dir=tmp_path / "index", movies_csv=movies_csv)
+    recommender.fit(ratings_csv, k=3, min_item_ratings=2)
+    assert [int(m) for m in recommender.similar_items(3, 3)[0]] == [2]
+    assert recommender.recommend("Men with Guns (1997)", 3) == []
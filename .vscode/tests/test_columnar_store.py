@@ -0,0 +1,55 @@
+import mongomock
+import pytest
+
+import movie_repository as repo
+from columnar_store import ColumnarStore, export_snapshot, open_current
+
+
+def seed(titles):
+    repo.movies().insert_many([
+        {"movieId": n, "title": title, "genres": ["Drama"], "rating": 3.5} for n, title in enumerate(titles, 1)
+    ])
+    repo.bump_catalog_version()
+
+
+@pytest.fixture
+def catalog_a(tmp_path):
+    repo.set_client(mongomock.MongoClient("mongodb://db-a:27017/"))
+    seed(["Heat (1995)", "Casino (1995)"])
+    export_snapshot(out_dir=str(tmp_path / "snapshot"))
+    yield str(tmp_path / "snapshot")
+    repo.set_client(None)
+
+
+def test_snapshot_is_served_for_the_catalog_it_was_taken_from(catalog_a):
+    store = open_current(catalog_a)
+    assert store is not None and store.titles() == ["Heat (1995)", "Casino (1995)"]
+    assert store.source == repo.source()
+
+
+def test_snapshot_is_stale_once_the_catalog_changes(catalog_a):
+    repo.bump_catalog_version()
+    assert open_current(catalog_a) is None
+
+
+def test_other_server_at_the_same_version_is_not_served_the_snapshot(catalog_a):
+    repo.set_client(mongomock.MongoClient("mongodb://db-b:27017/"))
+    seed(["Toy Story (1995)"])
+    assert repo.catalog_version() == ColumnarStore(catalog_a).version
+    assert open_current(catalog_a) is None
+
+
+def test_other_database_at_the_same_version_is_not_served_the_snapshot(catalog_a, monkeypatch):
+    monkeypatch.setattr(repo, "DB_NAME", "movie_bench")
+    seed(["Toy Story (1995)"])
+    assert repo.catalog_version() == ColumnarStore(catalog_a).version
+    assert open_current(catalog_a) is None
+    assert open_current(catalog_a, repo.get_client()["movie_db"]["movies"]) is not None  # A is still current
+
+
+def test_in_memory_catalog_is_not_mistaken_for_a_server_at_the_same_address(catalog_a):
+    assert open_current(catalog_a, mongomock.MongoClient("mongodb://db-a:27017/")["movie_db"]["movies"]) is None
+
+
+def test_snapshot_is_only_served_for_its_own_collection(catalog_a):
+    assert open_current(catalog_a, repo.get_db()["movies_archive"]) is None
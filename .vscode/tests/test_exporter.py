@@ -0,0 +1,93 @@
+import threading
+
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+
+import exporter
+import movie_repository as repo
+from matrix_factorization import ALSRecommender
+
+MOVIES = [
+    (1, 'Usual Suspects, The (1995)', ["Crime", "Mystery"], 4.3),
+    (2, 'Heat (1995)', ["Action", "Crime"], 3.9),
+    (3, 'Sabrina "Remake" (1995)', ["Comedy"], 3.4),
+    (4, "Untitled (2026)", [], None),
+    (5, "Amélie (2001)", ["Comedy", "Romance"], 4.1),
+]
+
+
+@pytest.fixture
+def catalog():
+    repo.set_client(mongomock.MongoClient())
+    repo.movies().insert_many([
+        {"movieId": movie_id, "title": title, "genres": genres, "rating": rating}
+        for movie_id, title, genres, rating in MOVIES
+    ])
+    yield repo.movies()
+    repo.set_client(None)
+
+
+def read_back(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, keep_default_na=False, na_values={"rating": [""]})
+
+
+@pytest.mark.parametrize("name", ["movies.csv", "movies.csv.gz", "movies.parquet"])
+def test_catalog_round_trips_in_gui_order(catalog, tmp_path, name):
+    if name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / name)
+    progress = []
+    assert exporter.export_catalog(path, batch_size=2, progress=progress.append) == len(MOVIES)
+    assert progress == [2, 4, 5]
+
+    frame = read_back(path)
+    assert list(frame.columns) == [name for name, _ in exporter.CATALOG_COLUMNS]
+    expected = sorted(MOVIES, key=lambda m: (m[3] is not None, m[3] or 0.0), reverse=True)
+    assert frame["movieId"].tolist() == [m[0] for m in expected]
+    assert frame["title"].tolist() == [m[1] for m in expected]
+    assert frame["genres"].tolist() == ["|".join(m[2]) for m in expected]
+    np.testing.assert_array_equal(frame["rating"].to_numpy(), [np.nan if m[3] is None else m[3] for m in expected])
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_cancelled_export_leaves_the_previous_file(catalog, tmp_path):
+    path = tmp_path / "movies.csv"
+    path.write_text("previous export\n")
+    cancel = threading.Event()
+    assert exporter.export_catalog(str(path), batch_size=2, progress=lambda _: cancel.set(), cancel=cancel) is None
+    assert path.read_text() == "previous export\n"
+    assert not list(tmp_path.glob("*.part"))
+
+
+@pytest.mark.parametrize("name", ["recs.csv.gz", "recs.parquet"])
+def test_recommendations_round_trip(tmp_path, name):
+    if name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+    rng = np.random.default_rng(0)
+    users, movies = np.divmod(np.arange(12 * 10), 10)
+    keep = rng.random(len(users)) < 0.5  # leave each user movies to recommend
+    ratings = pd.DataFrame({
+        "userId": users[keep] + 1,
+        "movieId": movies[keep] + 100,
+        "rating": rng.integers(1, 11, keep.sum()) / 2.0,
+    })
+    model = ALSRecommender(str(tmp_path / "model")).fit(ratings, factors=3, iterations=2, workers=1)
+
+    expected = [
+        (user_id, rank, movie_id, score)
+        for user_id in model.user_ids
+        for rank, (movie_id, score) in enumerate(zip(*model.recommend_for_user(user_id, n=3)), 1)
+    ]
+
+    path = str(tmp_path / name)
+    batches = exporter.recommendation_batches(model, n=3, batch_size=5)
+    assert exporter.write_stream(batches, path, exporter.RECOMMENDATION_COLUMNS) == len(expected)
+
+    frame = read_back(path)
+    assert list(frame.columns) == [name for name, _ in exporter.RECOMMENDATION_COLUMNS]
+    assert frame[["userId", "rank", "movieId"]].values.tolist() == [list(row[:3]) for row in expected]
+    np.testing.assert_allclose(frame["predicted_rating"], [row[3] for row in expected], atol=1e-4)
@@ -0,0 +1,43 @@
+import mongomock
+import numpy as np
+import pytest
+
+import genre_stats
+import movie_repository as repo
+from cluster_model import FeatureSpace
+
+MOVIES = [
+    {"movieId": 1, "title": "Heat (1995)", "genres": ["Action", "Crime", "Crime"], "rating": 4.0},
+    {"movieId": 2, "title": "Casino (1995)", "genres": ["Crime", "Drama"], "rating": 3.5},
+    {"movieId": 3, "title": "Jumanji (1995)", "genres": ["Adventure", "Adventure"], "rating": None},
+    {"movieId": 4, "title": "Untitled", "genres": None},
+]
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    repo.set_client(mongomock.MongoClient())
+    monkeypatch.setattr(genre_stats, "collection", repo.movies())
+    monkeypatch.setattr(genre_stats, "stats", repo.get_db()["genre_stats"])
+    yield repo.movies()
+    repo.set_client(None)
+
+
+def test_full_refresh_agrees_with_incremental_updates(catalog):
+    genre_stats.refresh()
+    for movie in MOVIES:
+        catalog.insert_one(dict(movie))
+        genre_stats.movie_added(movie["genres"], movie.get("rating"), repo.bump_catalog_version())
+    incremental = genre_stats.genre_stats()
+
+    genre_stats.refresh()
+    assert genre_stats.genre_stats() == incremental
+    assert genre_stats.genre_counts() == {"Crime": 2, "Action": 1, "Adventure": 1, "Drama": 1}
+
+
+def test_feature_space_counts_each_genre_once_per_movie(catalog):
+    catalog.insert_many([dict(m) for m in MOVIES])
+    space = FeatureSpace(catalog)
+    onehot = (space.transform(MOVIES)[:, :-1] / space.scale[:-1]).toarray()
+    assert onehot.max() == 1.0
+    np.testing.assert_allclose(space.scale[:-1], 1.0 / onehot.std(axis=0))
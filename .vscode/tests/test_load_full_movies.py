@@ -0,0 +1,107 @@
+import mongomock
+import pytest
+
+import load_full_movies as loader
+import movie_repository as repo
+
+MOVIES = "movieId,title,genres\n1,Heat (1995),Action|Crime\n2,Casino (1995),Crime|Drama\n"
+RATINGS = "userId,movieId,rating,timestamp\n1,1,4.0,100\n2,1,3.0,100\n1,2,5.0,100\n"
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    movies, ratings = tmp_path / "movies.csv", tmp_path / "rating.csv"
+    movies.write_text(MOVIES)
+    ratings.write_text(RATINGS)
+    monkeypatch.setattr(loader, "MOVIES_CSV", str(movies))
+    monkeypatch.setattr(loader, "RATINGS_CSV", str(ratings))
+
+    repo.set_client(mongomock.MongoClient())
+    monkeypatch.setattr(loader, "collection", repo.movies())
+    monkeypatch.setattr(loader, "ingest_state", repo.ingest_state())
+    # mongomock has no $round
+    monkeypatch.setattr(loader, "AVERAGE_RATING", {"$divide": ["$rating_sum", "$rating_count"]})
+
+    loader.load_streaming(batch_size=1, chunksize=2)
+    yield movies, ratings
+    repo.set_client(None)
+
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def ratings_of(movie_id):
+    doc = repo.movies().find_one({"movieId": movie_id})
+    return doc["rating_sum"], doc["rating_count"], doc["rating"]
+
+
+def test_full_load_records_the_end_of_each_file(files):
+    movies, ratings = files
+    assert loader.load_offset(str(movies)) == len(MOVIES)
+    assert loader.load_offset(str(ratings)) == len(RATINGS)
+    assert ratings_of(1) == (7.0, 2, 3.5)
+
+
+def test_incremental_run_reads_only_complete_rows_past_the_high_water_mark(files):
+    movies, ratings = files
+    append(movies, "3,Ronin (1998),Action|Thriller\n")
+    append(ratings, "3,1,5.0,200\n1,3,2.0,200\n4,2,1.")  # the last row is still being written
+
+    assert loader.load_incremental(batch_size=1, chunksize=2) == (1, 2)
+    assert ratings_of(1) == (12.0, 3, 4.0)
+    assert ratings_of(2) == (5.0, 1, 5.0)
+    assert ratings_of(3) == (2.0, 1, 2.0)
+    assert loader.load_offset(str(ratings)) == len(RATINGS) + len("3,1,5.0,200\n1,3,2.0,200\n")
+
+    append(ratings, "0,200\n")
+    assert loader.load_incremental(batch_size=1, chunksize=2) == (0, 1)
+    assert ratings_of(2) == (6.0, 2, 3.0)
+    assert loader.load_incremental(batch_size=1, chunksize=2) == (0, 0)
+    assert ratings_of(1) == (12.0, 3, 4.0)
+
+
+def test_rerun_after_a_crash_applies_each_delta_exactly_once(files, monkeypatch):
+    _, ratings = files
+    append(ratings, "3,1,5.0,200\n3,2,1.0,200\n")
+    end = len(RATINGS) + len("3,1,5.0,200\n3,2,1.0,200\n")
+
+    write = loader.bulk_write_batched
+    calls = []
+
+    def crash_after_first_rating(ops, batch_size):
+        calls.append(len(ops))
+        if len(calls) == 2:  # movies first, then ratings
+            write(ops[:1], batch_size)
+            raise RuntimeError("connection lost")
+        write(ops, batch_size)
+
+    monkeypatch.setattr(loader, "bulk_write_batched", crash_after_first_rating)
+    with pytest.raises(RuntimeError):
+        loader.load_incremental(batch_size=1, chunksize=2)
+    assert ratings_of(1)[:2] == (12.0, 3)
+    assert loader.load_offset(str(ratings)) == len(RATINGS)
+    assert loader.load_pending(str(ratings)) == end
+
+    # Rows appended before the rerun wait for the next run
+    append(ratings, "4,1,1.0,300\n")
+    monkeypatch.setattr(loader, "bulk_write_batched", write)
+    assert loader.load_incremental(batch_size=1, chunksize=2) == (0, 2)
+    assert ratings_of(1) == (12.0, 3, 4.0)
+    assert ratings_of(2) == (6.0, 2, 3.0)
+    assert loader.load_offset(str(ratings)) == end
+    assert loader.load_pending(str(ratings)) is None
+
+    assert loader.load_incremental(batch_size=1, chunksize=2) == (0, 1)
+    assert ratings_of(1) == (13.0, 4, 3.25)
+
+
+def test_failed_load_does_not_bump_the_catalog_version(files, monkeypatch):
+    version = repo.catalog_version()
+    monkeypatch.setattr("sys.argv", ["load_full_movies.py", "--mode", "incremental"])
+    monkeypatch.setattr(loader, "check_files", lambda: None)
+    monkeypatch.setattr(loader, "load_incremental", lambda *args: exit(1))
+    with pytest.raises(SystemExit):
+        loader.main()
+    assert repo.catalog_version() == version
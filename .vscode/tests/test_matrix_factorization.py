@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from matrix_factorization import ALSRecommender, split_holdout
+
+
+@pytest.fixture(scope="module")
+def ratings():
+    rng = np.random.default_rng(0)
+    users, movies = np.divmod(np.arange(60 * 40), 40)
+    keep = rng.random(len(users)) < 0.5
+    return pd.DataFrame({
+        "userId": users[keep] + 1,
+        "movieId": movies[keep] + 100,
+        "rating": rng.integers(1, 11, keep.sum()) / 2.0,
+    })
+
+
+def test_process_pool_matches_serial_solve(ratings, tmp_path):
+    serial = ALSRecommender(str(tmp_path / "serial")).fit(ratings, factors=4, iterations=3, workers=1)
+    pooled = ALSRecommender(str(tmp_path / "pooled")).fit(ratings, factors=4, iterations=3, workers=2)
+    np.testing.assert_allclose(pooled.user_factors, serial.user_factors, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(pooled.item_factors, serial.item_factors, rtol=1e-5, atol=1e-6)
+    assert not list(tmp_path.glob("als_*"))
+
+
+def test_held_out_ratings_are_not_recommended_back(ratings, tmp_path):
+    model = ALSRecommender(str(tmp_path)).fit(ratings, factors=4, iterations=2, workers=1)
+    _, test = split_holdout(ratings)
+    test = test[test["movieId"].isin(model.item_ids) & test["userId"].isin(model.user_ids)]
+    assert len(test)
+
+    for reloaded in (model, (model.save(), ALSRecommender(str(tmp_path)).load())[1]):
+        for user_id, held_out in test.groupby("userId")["movieId"]:
+            recommended, _ = reloaded.recommend_for_user(user_id, n=len(model.item_ids))
+            rated = ratings.loc[ratings["userId"] == user_id, "movieId"]
+            assert not set(recommended) & set(rated)
+            assert not set(recommended) & set(held_out)
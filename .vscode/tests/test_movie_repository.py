@@ -0,0 +1,118 @@
+import threading
+from types import SimpleNamespace
+
+import mongomock
+import pymongo
+import pytest
+
+import movie_repository as repo
+
+
+@pytest.fixture
+def db():
+    repo.set_client(mongomock.MongoClient())
+    yield repo.get_db()
+    repo.set_client(None)
+
+
+def test_ensure_indexes_backfills_title_norm(db):
+    db["movies"].insert_many([
+        {"movieId": 1, "title": "Usual Suspects, The (1995)"},
+        {"movieId": 2, "title": "Heat (1995)", "title_norm": "heat"},
+    ])
+    repo.ensure_indexes()
+    assert [m["title_norm"] for m in db["movies"].find().sort("movieId")] == ["the usual suspects", "heat"]
+    assert db["movies"].find_one(repo.title_prefix_filter("The Usual"))["movieId"] == 1
+
+
+def test_ensure_indexes_keys_old_likes_and_tags_by_movie_id(db):
+    db["movies"].insert_many([{"movieId": 1, "title": "Heat (1995)"}, {"movieId": 2, "title": "Casino (1995)"}])
+    db["user_likes"].insert_many([
+        {"user": "ann", "title": "Heat (1995)"},
+        {"user": "ann", "title": "Casino (1995)", "movieId": 2},
+        {"user": "ann", "title": "Casino (1995)"},  # collapses onto the like above
+        {"user": "bob", "title": "Removed (1990)"},  # no such movie any more
+    ])
+    db["user_tags"].insert_one({"user": "bob", "title": "Heat (1995)", "tag": "watched"})
+
+    repo.ensure_indexes()
+    likes = sorted((e["user"], e["title"], e.get("movieId")) for e in db["user_likes"].find())
+    assert likes == [("ann", "Casino (1995)", 2), ("ann", "Heat (1995)", 1), ("bob", "Removed (1990)", None)]
+    assert db["user_tags"].find_one({"user": "bob"})["movieId"] == 1
+
+    with pytest.raises(pymongo.errors.DuplicateKeyError):
+        db["user_likes"].insert_one({"user": "ann", "movieId": 1})
+    db["user_likes"].insert_one({"user": "bob", "title": "Also Removed (1991)"})  # unkeyed entries may repeat
+
+
+def page_through(query, sort_dir, limit):
+    pages, after = [], None
+    while True:
+        page = repo.find_page(query, after=after, sort_dir=sort_dir, limit=limit)
+        if not page:
+            return pages
+        pages.append([m["_id"] for m in page])
+        after = page[-1]
+
+
+@pytest.mark.parametrize("sort_dir", [-1, 1])
+def test_keyset_pages_cover_every_movie_once_in_sort_order(db, sort_dir):
+    ratings = [4.0, 3.5, None, 4.0, 2.0, None, 4.0, 3.5, None]
+    db["movies"].insert_many([
+        {"_id": i, "movieId": i, "title": f"Movie {i}", "genres": ["Drama"] if i % 3 else ["Comedy"], "rating": r}
+        for i, r in enumerate(ratings)
+    ])
+    db["movies"].update_one({"_id": 8}, {"$unset": {"rating": ""}})  # missing sorts like null
+
+    # Nulls sort below every rating, and ties are broken by _id
+    def expected(ids):
+        key = [(ratings[i] is not None, ratings[i] or 0.0, i) for i in ids]
+        return [i for _, i in sorted(zip(key, ids), reverse=sort_dir < 0)]
+
+    for query, ids in [({}, range(9)), ({"genres": "Drama"}, [i for i in range(9) if i % 3])]:
+        pages = page_through(query, sort_dir, limit=2)
+        assert all(len(page) == 2 for page in pages[:-1])
+        assert sum(pages, []) == expected(ids)
+
+
+def test_threads_share_one_pooled_client(monkeypatch):
+    monkeypatch.setattr(repo, "MONGO_URI", "mongodb://db-test:27017/?connect=false")
+    repo.set_client(None)
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(repo.get_client())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert len({id(client) for client in clients}) == 1
+        assert clients[0].options.pool_options.max_pool_size == repo.POOL_SIZE
+    finally:
+        clients[0].close()
+        repo.set_client(None)
+
+
+def test_query_timer_totals_and_logs_slow_commands(capsys):
+    timer = repo.QueryTimer(slow_ms=50)
+    for name, micros in [("find", 2000), ("find", 4000), ("aggregate", 80000)]:
+        timer.succeeded(SimpleNamespace(command_name=name, duration_micros=micros))
+    timer.failed(SimpleNamespace(command_name="insert", duration_micros=60000))
+
+    assert timer.stats() == {
+        "find": {"count": 2, "total_ms": 6.0, "avg_ms": 3.0},
+        "aggregate": {"count": 1, "total_ms": 80.0, "avg_ms": 80.0},
+        "insert": {"count": 1, "total_ms": 60.0, "avg_ms": 60.0},
+    }
+    assert capsys.readouterr().out.splitlines() == [
+        "🐢 Mongo aggregate took 80.0 ms",
+        "🐢 Mongo insert took 60.0 ms (failed)",
+    ]
+
+
+
+def test_plan_stages_follow_the_winning_plan_down_to_its_index():
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {
+        "stage": "IXSCAN", "indexName": "genres_1_rating_-1__id_-1"}}}
+    assert repo._plan_stages(plan) == ["LIMIT", "FETCH", "IXSCAN(genres_1_rating_-1__id_-1)"]
+    assert repo._plan_stages({"stage": "OR", "inputStages": [{"stage": "IXSCAN", "indexName": "title_1"}]}) == \
+        ["OR", "IXSCAN(title_1)"]
@@ -0,0 +1,35 @@
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+
+import personalize
+from matrix_factorization import ALSRecommender
+
+
+@pytest.fixture
+def vectors(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    users, movies = np.divmod(np.arange(20 * 12), 12)
+    ratings = pd.DataFrame({
+        "userId": users + 1,
+        "movieId": movies + 100,
+        "rating": rng.integers(1, 11, len(users)) / 2.0,
+    })
+    ALSRecommender(str(tmp_path)).fit(ratings, factors=3, iterations=2, workers=1).save()
+
+    db = mongomock.MongoClient()["movie_db"]
+    monkeypatch.setattr(personalize, "likes", db["user_likes"])
+    monkeypatch.setattr(personalize, "profiles", db["user_profiles"])
+    return personalize.ItemVectors(str(tmp_path))
+
+
+def test_movies_both_liked_and_watched_are_skipped_once(vectors):
+    personalize.likes.insert_many([{"user": "ann", "movieId": m} for m in (100, 101)])
+    all_items = len(vectors.item_ids)
+    exclude = [100, 101, 101, 100, 102, 999]  # liked, then tagged watched; 999 is unknown to the model
+
+    ids, scores = vectors.recommend("ann", n=all_items, exclude=exclude)
+    assert len(ids) == all_items - 3
+    assert not set(ids) & {100, 101, 102}
+    assert np.isfinite(scores).all()
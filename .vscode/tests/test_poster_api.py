@@ -0,0 +1,174 @@
+import json
+import time
+import hashlib
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+import poster_api
+from poster_api import HttpDownload, JsonSearch, PosterCache, PosterService
+
+POSTERS = {
+    "Heat (1995)": b"\x89PNG heat",
+    "Casino (1995)": b"\x89PNG casino",
+    "Heat (1986)": b"\x89PNG heat",       # same image as the 1995 Heat
+}
+
+
+class PosterServer(ThreadingHTTPServer):
+    """/search?q=<title> -> {"image": url}, /img/<n> -> image bytes; counts requests per path."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), PosterHandler)
+        self.requests = {"search": 0, "img": 0}
+        self.counter_lock = threading.Lock()
+        self.images = {f"/img/{n}": data for n, data in enumerate(POSTERS.values())}
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class PosterHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        kind = url.path.split("/")[1]
+        with self.server.counter_lock:
+            self.server.requests[kind] = self.server.requests.get(kind, 0) + 1
+        if kind == "search":
+            title = parse_qs(url.query)["q"][0]
+            n = list(POSTERS).index(title) if title in POSTERS else None
+            body = json.dumps({"image": self.server.url(f"/img/{n}") if n is not None else None}).encode()
+            self.reply("application/json", body)
+        elif url.path in self.server.images:
+            self.reply("image/png", self.server.images[url.path])
+        else:
+            self.send_error(404)
+
+    def reply(self, content_type, body):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = PosterServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def http_service(server, cache_dir, **kwargs):
+    return PosterService(search=JsonSearch(server.url("/search")), download=HttpDownload(),
+                         cache=PosterCache(str(cache_dir), **kwargs))
+
+
+def test_cache_hit_is_served_from_content_addressed_blob(server, tmp_path):
+    service = http_service(server, tmp_path)
+    try:
+        assert service.get_poster(1, "Heat (1995)") == POSTERS["Heat (1995)"]
+        assert service.get_poster(2, "Heat (1986)") == POSTERS["Heat (1986)"]
+        assert service.get_poster(1, "Heat (1995)") == POSTERS["Heat (1995)"]
+    finally:
+        service.close()
+    assert server.requests == {"search": 2, "img": 2}
+
+    # Both movies point at one blob named by the SHA-256 of its bytes
+    digest = hashlib.sha256(POSTERS["Heat (1995)"]).hexdigest()
+    assert (tmp_path / "blobs" / digest[:2] / digest).read_bytes() == POSTERS["Heat (1995)"]
+    assert sorted(p.name for p in (tmp_path / "blobs").rglob("*") if p.is_file()) == [digest]
+
+    # A new process with the same cache dir never touches the network
+    service = http_service(server, tmp_path)
+    try:
+        assert service.get_poster(2, "Heat (1986)") == POSTERS["Heat (1986)"]
+    finally:
+        service.close()
+    assert server.requests == {"search": 2, "img": 2}
+
+
+def test_missing_poster_is_not_searched_again(server, tmp_path):
+    service = http_service(server, tmp_path)
+    try:
+        assert service.get_poster(9, "Unknown (2001)") is None
+        assert service.get_poster(9, "Unknown (2001)") is None
+    finally:
+        service.close()
+    assert server.requests == {"search": 1, "img": 0}
+
+
+def test_concurrency_is_limited_and_duplicates_share_one_fetch(tmp_path):
+    lock = threading.Lock()
+    running = peak = 0
+    searched = []
+
+    def track(fn):
+        def wrapper(arg):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            try:
+                time.sleep(0.02)
+                return fn(arg)
+            finally:
+                with lock:
+                    running -= 1
+        return wrapper
+
+    def search(title):
+        searched.append(title)
+        return "stub://" + title
+
+    service = PosterService(search=track(search), download=track(lambda url: url.encode()),
+                            cache=PosterCache(str(tmp_path)), concurrency=3)
+    try:
+        movies = [(n, f"Movie {n}") for n in range(12)]
+        counts = service.prefetch(movies + movies)
+    finally:
+        service.close()
+    assert counts == {"cached": 24, "missing": 0, "failed": 0}
+    assert peak == 3
+    assert sorted(searched) == sorted(title for _, title in movies)
+
+
+def test_lru_eviction_keeps_cache_under_size_cap(tmp_path, monkeypatch):
+    clock = itertools.count(1)
+    monkeypatch.setattr(poster_api.time, "time", lambda: float(next(clock)))
+    cache = PosterCache(str(tmp_path), max_bytes=250)
+    try:
+        cache.store("m1", "stub://1", b"1" * 100)
+        cache.store("m2", "stub://2", b"2" * 100)
+        assert cache.lookup("m1")[1] == b"1" * 100   # m1 is now the most recently used
+        cache.store("m3", "stub://3", b"3" * 100)
+
+        assert cache.total_bytes() == 200
+        assert cache.lookup("m2")[:2] == ("stub://2", None)   # bytes dropped, URL kept
+        assert cache.lookup("m1")[1] == b"1" * 100
+        assert cache.lookup("m3")[1] == b"3" * 100
+        evicted = hashlib.sha256(b"2" * 100).hexdigest()
+        assert evicted not in cache.digests()
+        assert not (tmp_path / "blobs" / evicted[:2] / evicted).exists()
+    finally:
+        cache.close()
+
+
+def test_evicted_poster_is_downloaded_again_without_searching(server, tmp_path):
+    service = http_service(server, tmp_path, max_bytes=len(POSTERS["Casino (1995)"]))
+    try:
+        service.get_poster(1, "Heat (1995)")
+        service.get_poster(3, "Casino (1995)")        # evicts Heat
+        assert service.get_poster(1, "Heat (1995)") == POSTERS["Heat (1995)"]
+    finally:
+        service.close()
+    assert server.requests == {"search": 2, "img": 3}
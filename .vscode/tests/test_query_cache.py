@@ -0,0 +1,95 @@
+import mongomock
+import pytest
+
+import movie_repository as repo
+import query_cache
+from query_cache import QueryCache, normalize_filters
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache, "time", clock)
+    repo.set_client(mongomock.MongoClient())
+    yield clock
+    repo.set_client(None)
+
+
+def counting():
+    calls = []
+    return calls, lambda key: calls.append(key) or f"result {key}"
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = QueryCache(ttl=10.0)
+    calls, compute = counting()
+    assert cache.get("a", compute, "a") == "result a"
+    clock.now += 9.0
+    assert cache.get("a", compute, "a") == "result a"
+    assert calls == ["a"]
+
+    clock.now += 2.0
+    cache.get("a", compute, "a")
+    assert calls == ["a", "a"]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(max_entries=2)
+    calls, compute = counting()
+    for key in ("a", "b", "a", "c"):  # reading 'a' makes 'b' the oldest
+        cache.get(key, compute, key)
+    assert list(cache.entries) == ["a", "c"]
+
+    cache.get("b", compute, "b")
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_catalog_version_change_drops_every_entry(clock):
+    cache = QueryCache(version_check=2.0)
+    calls, compute = counting()
+    cache.get("a", compute, "a")
+
+    repo.bump_catalog_version()  # written by another process
+    cache.get("a", compute, "a")
+    assert calls == ["a"]  # version is only re-read every version_check seconds
+
+    clock.now += 2.0
+    cache.get("a", compute, "a")
+    assert calls == ["a", "a"]
+
+
+def test_invalidate_with_the_new_version_skips_the_reread(clock, monkeypatch):
+    cache = QueryCache()
+    calls, compute = counting()
+    cache.get("a", compute, "a")
+
+    cache.invalidate(repo.bump_catalog_version())
+    monkeypatch.setattr(repo, "catalog_version", lambda: pytest.fail("version re-read"))
+    cache.get("a", compute, "a")
+    cache.get("a", compute, "a")
+    assert calls == ["a", "a"]
+
+
+def test_result_computed_across_a_catalog_change_is_not_stored(clock):
+    cache = QueryCache()
+
+    def compute_during_write():
+        cache.invalidate(repo.bump_catalog_version())
+        return "old catalog"
+
+    assert cache.get("a", compute_during_write) == "old catalog"
+    assert "a" not in cache.entries
+
+
+def test_equivalent_filters_share_a_key():
+    assert normalize_filters("", None, "  ") == normalize_filters(None, None, None)
+    assert normalize_filters("Comedy", 4, "Toy ") == normalize_filters("Comedy", 4.0, "toy")
@@ -0,0 +1,133 @@
+import threading
+
+import mongomock
+import pytest
+
+import movie_repository as repo
+import recommend_engine
+from recommend_engine import CONTENT_ONLY, RecommenderEngine
+
+MOVIES = [
+    ("Toy Story (1995)", ["Adventure", "Animation", "Children", "Comedy", "Fantasy"]),
+    ("Jumanji (1995)", ["Adventure", "Children", "Fantasy"]),
+    ("Grumpier Old Men (1995)", ["Comedy", "Romance"]),
+    ("Heat (1995)", ["Action", "Crime", "Thriller"]),
+    ("Casino (1995)", ["Crime", "Drama"]),
+    ("GoldenEye (1995)", ["Action", "Adventure", "Thriller"]),
+]
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Count calls to the (expensive) neighbor index builder."""
+    calls = []
+    build = recommend_engine.build_neighbor_index
+
+    def counting(matrix, k=recommend_engine.DEFAULT_TOP_K, **kwargs):
+        calls.append(k)
+        return build(matrix, k=k, **kwargs)
+
+    monkeypatch.setattr(recommend_engine, "build_neighbor_index", counting)
+    return calls
+
+
+@pytest.fixture
+def catalog():
+    repo.set_client(mongomock.MongoClient())
+    repo.movies().insert_many([
+        {"movieId": n, "title": title, "genres": genres, "rating": 3.5, "rating_sum": 35.0, "rating_count": 10}
+        for n, (title, genres) in enumerate(MOVIES, 1)
+    ])
+    repo.bump_catalog_version()
+    yield repo.movies()
+    repo.set_client(None)
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Count full model loads (Mongo scan + TF-IDF fit)."""
+    calls = []
+    load = RecommenderEngine._load
+    monkeypatch.setattr(RecommenderEngine, "_load", lambda self: calls.append(1) or load(self))
+    return calls
+
+
+def add_movie(title, genres):
+    repo.movies().insert_one({"movieId": 99, "title": title, "genres": genres, "rating": 4.0})
+    repo.bump_catalog_version()
+
+
+def test_loads_and_hybrid_queries_do_not_build_the_index(catalog, builds, tmp_path):
+    engine = RecommenderEngine(catalog, index_dir=str(tmp_path), top_k=3)
+    assert [r["title"] for r in engine.recommend("Heat", 2)]
+    add_movie("Ronin (1998)", ["Action", "Crime", "Thriller"])
+    assert engine.ensure_current().version == repo.catalog_version()
+    assert engine.recommend("Heat", 2)
+    assert builds == []
+
+
+def test_content_only_query_builds_once_and_saves_for_the_next_load(catalog, builds, tmp_path):
+    engine = RecommenderEngine(catalog, index_dir=str(tmp_path), top_k=3)
+    first = engine.recommend("Heat", 2, CONTENT_ONLY)
+    assert engine.recommend_many(["Casino"], 2)["Casino"]
+    assert builds == [3]
+
+    # Another engine over the same catalog reuses the saved index
+    reloaded = RecommenderEngine(catalog, index_dir=str(tmp_path), top_k=3)
+    assert reloaded.recommend("Heat", 2, CONTENT_ONLY) == first
+    assert builds == [3]
+
+
+def test_saved_index_is_not_reused_after_a_catalog_change(catalog, builds, tmp_path):
+    RecommenderEngine(catalog, index_dir=str(tmp_path), top_k=3).recommend("Heat", 2, CONTENT_ONLY)
+    repo.movies().update_one({"title": "Casino (1995)"}, {"$set": {"genres": ["Comedy"]}})
+    repo.bump_catalog_version()  # same rows, new content
+
+    engine = RecommenderEngine(catalog, index_dir=str(tmp_path), top_k=3)
+    assert "Casino (1995)" not in [r["title"] for r in engine.recommend("Heat", 3, CONTENT_ONLY)]
+    assert builds == [3, 3]
+
+
+def test_saved_index_is_not_reused_for_another_database(catalog, builds, tmp_path, monkeypatch):
+    RecommenderEngine(catalog, index_dir=str(tmp_path), top_k=3).recommend("Heat", 2, CONTENT_ONLY)
+    other = repo.get_client()["movie_bench"]["movies"]
+    other.insert_many(list(catalog.find()))  # same _ids, same rows
+    monkeypatch.setattr(repo, "DB_NAME", "movie_bench")
+    repo.bump_catalog_version()  # same version number as movie_db
+
+    RecommenderEngine(other, index_dir=str(tmp_path), top_k=3).recommend("Heat", 2, CONTENT_ONLY)
+    assert builds == [3, 3]
+
+
+def test_build_index_uses_the_same_builder(catalog, builds, tmp_path):
+    engine = RecommenderEngine(catalog, index_dir=str(tmp_path), top_k=4)
+    assert engine.build_index() == len(MOVIES)
+    assert engine.neighbors.shape == (len(MOVIES), 4)
+    RecommenderEngine(catalog, index_dir=str(tmp_path), top_k=4).recommend("Heat", 2, CONTENT_ONLY)
+    assert builds == [4]
+
+
+def test_engine_loads_once_on_first_use(catalog, loads, tmp_path):
+    engine = RecommenderEngine(catalog, index_dir=str(tmp_path))
+    assert engine.state is None and loads == []
+
+    threads = [threading.Thread(target=engine.recommend, args=("Heat", 2)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.recommend("Casino", 2)
+    assert loads == [1]
+
+
+def test_catalog_change_swaps_in_a_new_state(catalog, loads, tmp_path):
+    engine = RecommenderEngine(catalog, index_dir=str(tmp_path))
+    before = engine.ensure_current()
+    assert engine.ensure_current() is before
+
+    add_movie("Ronin (1998)", ["Action", "Crime", "Thriller"])
+    after = engine.ensure_current()
+    assert after is not before and loads == [1, 1]
+    # A query still holding the old state keeps a consistent model
+    assert len(before.df) == len(MOVIES) and len(after.df) == len(MOVIES) + 1
+    assert "Ronin (1998)" in [r["title"] for r in engine.recommend("Heat", 3)]
@@ -0,0 +1,79 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image, ImageTk
+
+import thumbnails
+from poster_api import PosterCache
+from thumbnails import SIZES, PhotoCache
+
+
+def poster_bytes(width=300, height=450, color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def photos(monkeypatch):
+    # PhotoImage needs a Tk display; the cache only holds on to whatever it returns
+    monkeypatch.setattr(ImageTk, "PhotoImage", lambda image: ("photo", image.size))
+
+
+def image(width, height):
+    return Image.new("RGB", (width, height))
+
+
+def test_photo_cache_evicts_least_recently_used_by_decoded_size(photos):
+    cache = PhotoCache(max_bytes=3 * 10 * 10 * 4)
+    for key in ("a", "b", "c"):
+        cache.put(key, image(10, 10))
+    assert cache.get("a") == ("photo", (10, 10))  # 'b' is now the oldest
+
+    cache.put("d", image(10, 10))
+    assert list(cache.items) == ["c", "a", "d"]
+    assert cache.get("b") is None
+    assert cache.bytes == 3 * 10 * 10 * 4
+
+
+def test_photo_cache_replaces_an_entry_and_keeps_one_oversized_image(photos):
+    cache = PhotoCache(max_bytes=1000)
+    cache.put("a", image(10, 10))
+    cache.put("a", image(5, 5))
+    assert (list(cache.items), cache.bytes) == (["a"], 5 * 5 * 4)
+
+    assert cache.put("big", image(100, 100)) == ("photo", (100, 100))
+    assert (list(cache.items), cache.bytes) == (["big"], 100 * 100 * 4)
+
+
+def test_thumbnail_is_rendered_once_and_fits_its_size(tmp_path, monkeypatch):
+    data = poster_bytes()
+    renders = []
+    render = thumbnails.render
+    monkeypatch.setattr(thumbnails, "render", lambda *args: renders.append(args[1]) or render(*args))
+
+    for _ in range(2):
+        thumb = thumbnails.thumbnail(data, "small", "JPEG", str(tmp_path))
+        assert thumb.width <= SIZES["small"][0] and thumb.height <= SIZES["small"][1]
+    assert renders == [["small"]]
+    assert os.path.exists(thumbnails.thumbnail_path(hashlib.sha256(data).hexdigest(), "small", "JPEG", str(tmp_path)))
+
+
+def test_build_thumbnails_renders_missing_sizes_and_prunes_evicted_posters(tmp_path):
+    cache = PosterCache(str(tmp_path / "posters"))
+    cache.store("heat", "http://example/heat.jpg", poster_bytes(color=(10, 10, 10)))
+    cache.store("casino", "http://example/casino.jpg", poster_bytes(color=(250, 250, 250)))
+    thumb_dir = str(tmp_path / "thumbs")
+    stale = thumbnails.thumbnail_path("0" * 64, "small", "JPEG", thumb_dir)
+    os.makedirs(os.path.dirname(stale))
+    open(stale, "wb").close()
+
+    assert thumbnails.build_thumbnails(cache, ("small", "medium"), "JPEG", thumb_dir, workers=1) == 4
+    assert not os.path.exists(stale)
+    assert thumbnails.build_thumbnails(cache, ("small", "medium", "large"), "JPEG", thumb_dir, workers=1) == 2
+    for digest in cache.digests():
+        for size in SIZES:
+            with Image.open(thumbnails.thumbnail_path(digest, size, "JPEG", thumb_dir)) as thumb:
+                assert thumb.width <= SIZES[size][0] and thumb.height <= SIZES[size][1]
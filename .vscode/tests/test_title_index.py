@@ -0,0 +1,52 @@
+import pytest
+
+from title_index import TitleIndex
+
+CATALOG = [
+    "Toy Story (1995)",
+    "Toy Story 2 (1999)",
+    "Matrix, The (1999)",
+    "Matrix Reloaded, The (2003)",
+    "Marci X (2003)",
+    "Star Wars: Episode IV - A New Hope (1977)",
+    "Car Wash (1976)",
+    "Amelie (Fabuleux destin d'Amélie Poulain, Le) (2001)",
+    "Amelia (2009)",
+    "Death Race 2000 (1975)",
+    "Death Race (2008)",
+    "Hamlet (1948)",
+    "Hamlet (1996)",
+    "Die Hard (1988)",
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return TitleIndex(CATALOG)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("toy story 1995", "Toy Story (1995)"),
+    ("Toy Story (1995)", "Toy Story (1995)"),
+    ("matrix 1999", "Matrix, The (1999)"),
+    ("Matrix", "Matrix, The (1999)"),
+    ("the matrix", "Matrix, The (1999)"),
+    ("Amelie", "Amelie (Fabuleux destin d'Amélie Poulain, Le) (2001)"),
+    ("Death Race 2000", "Death Race 2000 (1975)"),
+    ("death race 2008", "Death Race (2008)"),
+    ("hamlet 1996", "Hamlet (1996)"),
+    ("die hard", "Die Hard (1988)"),
+    ("toy stroy", "Toy Story (1995)"),
+])
+def test_resolves_common_queries(index, query, expected):
+    assert index.match(query) == [expected]
+
+
+@pytest.mark.parametrize("query", ["star wars", "Amelia Earhart biopic", "zzzz"])
+def test_short_queries_do_not_match_unrelated_titles(index, query):
+    assert index.match(query) == []
+
+
+def test_near_name_is_not_preferred_over_no_match():
+    # Without the exact alias, 'amelie' must not fall through to 'Amelia'
+    assert TitleIndex(["Amelia (2009)", "Car Wash (1976)"]).match("Amelie") == []
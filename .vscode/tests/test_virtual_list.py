@@ -0,0 +1,147 @@
+import tkinter as tk
+
+import pytest
+
+from virtual_list import VirtualList
+
+
+class FakeListbox:
+    """The Listbox calls VirtualList makes, without a Tk display."""
+
+    def __init__(self, parent, **options):
+        self.items = []
+        self.selection = ()
+
+    def pack(self, **options):
+        pass
+
+    def bind(self, sequence, callback, add=None):
+        pass
+
+    def delete(self, first, last=None):
+        self.items = []
+
+    def insert(self, index, text):
+        self.items.append(text)
+
+    def selection_set(self, index):
+        self.selection = (index,)
+
+    def activate(self, index):
+        pass
+
+    def curselection(self):
+        return self.selection
+
+    def event_generate(self, sequence):
+        pass
+
+
+class FakeScrollbar:
+    def __init__(self, parent, **options):
+        self.position = None
+
+    def pack(self, **options):
+        pass
+
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+@pytest.fixture
+def widgets(monkeypatch):
+    monkeypatch.setattr(tk.Frame, "__init__", lambda self, parent: None)
+    monkeypatch.setattr(tk, "Listbox", FakeListbox)
+    monkeypatch.setattr(tk, "Scrollbar", FakeScrollbar)
+
+
+def catalog(size):
+    return [{"_id": i, "title": f"Movie {i}", "rating": 5.0 - i / size} for i in range(size)]
+
+
+def paged(data, starts=None):
+    """fetch(after, limit) over `data` by cursor, like movie_repository.find_page."""
+    def fetch(after, limit):
+        start = 0 if after is None else next(i for i, row in enumerate(data) if row["_id"] == after["_id"]) + 1
+        if starts is not None:
+            starts.append(start)
+        return data[start:start + limit]
+    return fetch
+
+
+def shown(view):
+    return view.listbox.items
+
+
+def test_rows_are_records_and_selection_returns_the_movie(widgets):
+    data = catalog(30)
+    view = VirtualList(None, height=5, page_size=10)
+    view.load(paged(data), format_row=lambda movie: movie["title"])
+    assert shown(view) == [f"Movie {i}" for i in range(5)]
+
+    view.listbox.selection = (2,)
+    view._on_select(None)
+    assert view.selected() is data[2] and view.selected_id() == 2
+
+    view._move_selection(1)
+    assert view.selected_id() == 3
+
+
+def test_remove_drops_the_row_and_later_pages_still_follow(widgets):
+    data = catalog(30)
+    view = VirtualList(None, height=5, page_size=10)
+    view.load(paged(data), format_row=lambda movie: movie["title"])
+    view._move_selection(3)  # selects row 2
+
+    view.remove(2)
+    del data[2]
+    assert view.selected() is None
+    assert shown(view) == ["Movie 0", "Movie 1", "Movie 3", "Movie 4", "Movie 5"]
+    for _ in range(10):
+        view._scroll_by(3)
+    assert view.ids == [row["_id"] for row in data]
+
+
+def test_fixed_rows_need_no_fetch(widgets):
+    view = VirtualList(None, height=5)
+    view.load(rows=catalog(3), format_row=lambda movie: movie["title"])
+    assert shown(view) == ["Movie 0", "Movie 1", "Movie 2"]
+    view.show_message("Nothing liked yet.")
+    assert shown(view) == ["Nothing liked yet."] and view.selected() is None
+
+
+def test_held_pages_are_capped_and_dropped_pages_refetched_by_cursor(widgets):
+    data = catalog(1000)
+    starts = []
+    view = VirtualList(None, height=20, page_size=50, max_pages=4)
+    view.load(paged(data, starts), format_row=lambda movie: movie["title"])
+
+    def check():
+        assert len(view.pages) <= 4 and sum(count for _, count in view.pages) == len(view.rows)
+        assert view.ids == [row["_id"] for row in view.rows] == list(range(view.offset, view.offset + len(view.rows)))
+        first = view.offset + view.top
+        assert shown(view) == [f"Movie {i}" for i in range(first, min(first + 20, len(data)))]
+
+    for _ in range(400):
+        view._scroll_by(7)
+        check()
+    assert view.offset + view.top == len(data) - 20 and not view.more
+    down = len(starts)
+
+    for _ in range(400):
+        view._scroll_by(-7)
+        check()
+    assert view.offset == view.top == 0
+    # Each dropped page is fetched again from the cursor it was first fetched with
+    assert sorted(starts[down:]) == list(range(0, 1000 - 4 * 50, 50))
+
+
+def test_selection_outlives_its_page(widgets):
+    data = catalog(1000)
+    view = VirtualList(None, height=20, page_size=50, max_pages=3)
+    view.load(paged(data), format_row=lambda movie: movie["title"])
+    view._move_selection(6)
+    for _ in range(100):
+        view._scroll_by(5)
+    assert view.offset > 0 and view.selected_index is None
+    assert view.selected() is data[5]
@@ -0,0 +1,151 @@
+import os
+import io
+import time
+import hashlib
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, features
+
+from poster_api import PosterCache, POSTER_CACHE_DIR
+
+THUMB_DIR = os.path.join(POSTER_CACHE_DIR, "thumbs")
+SIZES = {"small": (92, 138), "medium": (185, 278), "large": (400, 600)}
+FORMAT = "WEBP" if features.check("webp") else "JPEG"
+QUALITY = 80
+PHOTO_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def thumbnail_path(digest, size, fmt=FORMAT, thumb_dir=THUMB_DIR):
+    """Thumbnails are keyed by the sha256 of the source poster, like the blobs they come from."""
+    return os.path.join(thumb_dir, size, f"{digest}.{fmt.lower()}")
+
+
+def render(source, sizes, digest, fmt=FORMAT, thumb_dir=THUMB_DIR):
+    """Decode one poster once and write every requested size. Returns the sizes written."""
+    with Image.open(source) as image:
+        largest = max(SIZES[s] for s in sizes)
+        image.draft("RGB", largest)  # JPEG: let the decoder downscale by 1/2, 1/4 or 1/8 for free
+        image = image.convert("RGB")
+        written = []
+        for size in sorted(sizes, key=lambda s: SIZES[s], reverse=True):
+            image.thumbnail(SIZES[size], Image.LANCZOS)  # each size shrinks the previous one
+            path = thumbnail_path(digest, size, fmt, thumb_dir)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            image.save(tmp, fmt, quality=QUALITY)
+            os.replace(tmp, path)
+            written.append(size)
+    return written
+
+
+def _render_blob(job):
+    blob_path, digest, sizes, fmt, thumb_dir = job
+    try:
+        return digest, render(blob_path, sizes, digest, fmt, thumb_dir), None
+    except Exception as e:
+        return digest, [], str(e)
+
+
+def build_thumbnails(cache=None, sizes=tuple(SIZES), fmt=FORMAT, thumb_dir=THUMB_DIR, workers=None, prune=True):
+    """Render missing thumbnails for every cached poster in a process pool.
+
+    Posters whose thumbnails all exist are skipped, so reruns only pay for
+    new downloads. With `prune`, thumbnails of evicted posters are removed.
+    """
+    cache = cache or PosterCache()
+    digests = cache.digests()
+    jobs = []
+    for digest in digests:
+        missing = [s for s in sizes if not os.path.exists(thumbnail_path(digest, s, fmt, thumb_dir))]
+        if missing:
+            jobs.append((cache.blob_path(digest), digest, missing, fmt, thumb_dir))
+
+    started = time.perf_counter()
+    rendered = failed = 0
+    if jobs:
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for digest, written, error in pool.map(_render_blob, jobs, chunksize=16):
+                if error:
+                    failed += 1
+                    print(f"⚠️ Could not render {digest[:12]}: {error}")
+                else:
+                    rendered += len(written)
+
+    removed = 0
+    if prune:
+        keep = set(digests)
+        for size in sizes:
+            size_dir = os.path.join(thumb_dir, size)
+            for name in os.listdir(size_dir) if os.path.isdir(size_dir) else []:
+                if name.split(".")[0] not in keep:
+                    os.remove(os.path.join(size_dir, name))
+                    removed += 1
+
+    seconds = time.perf_counter() - started
+    print(f"✅ {rendered} thumbnails rendered for {len(jobs)} of {len(digests)} posters "
+          f"({failed} failed, {removed} stale removed) in {seconds:.1f}s")
+    return rendered
+
+
+def thumbnail(data, size="medium", fmt=FORMAT, thumb_dir=THUMB_DIR):
+    """Decoded thumbnail for poster bytes, rendering and saving it on first use.
+
+    Meant for a worker thread: the returned image is fully loaded, so the Tk
+    thread only has to wrap it in a PhotoImage.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    path = thumbnail_path(digest, size, fmt, thumb_dir)
+    if not os.path.exists(path):
+        render(io.BytesIO(data), [size], digest, fmt, thumb_dir)
+    with Image.open(path) as image:
+        image.load()
+        return image
+
+
+class PhotoCache:
+    """LRU of Tk PhotoImages, bounded by their decoded size (4 bytes per pixel).
+
+    Holding the PhotoImage also keeps Tk from garbage-collecting an image
+    that a Label is still showing.
+    """
+
+    def __init__(self, max_bytes=PHOTO_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()  # key -> (PhotoImage, bytes)
+        self.bytes = 0
+
+    def get(self, key):
+        entry = self.items.get(key)
+        if entry is None:
+            return None
+        self.items.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, image):
+        """Wrap a PIL image in a PhotoImage (Tk thread only), cache and return it."""
+        from PIL import ImageTk
+
+        if key in self.items:
+            self.bytes -= self.items.pop(key)[1]
+        photo = ImageTk.PhotoImage(image)
+        cost = image.width * image.height * 4
+        self.items[key] = (photo, cost)
+        self.bytes += cost
+        while self.bytes > self.max_bytes and len(self.items) > 1:
+            _, (_, old_cost) = self.items.popitem(last=False)
+            self.bytes -= old_cost
+        return photo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render poster thumbnails for the poster cache.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--format", choices=["WEBP", "JPEG"], default=FORMAT)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--no-prune", action="store_true", help="keep thumbnails of evicted posters")
+    args = parser.parse_args()
+
+    build_thumbnails(sizes=args.sizes, fmt=args.format, workers=args.workers, prune=not args.no_prune)
@@ -0,0 +1,171 @@
+import re
+import difflib
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+YEAR_RE = re.compile(r"\s*\((\d{4})(?:-\d{0,4})?\)\s*$")
+TRAILING_ARTICLE_RE = re.compile(r"^(.*), (the|a|an|l'|la|le|les|il|el|die|der|das)$")
+LEADING_ARTICLE_RE = re.compile(r"^(?:the|a|an|l|la|le|les|il|el|die|der|das) (?=\S)")
+BARE_YEAR_RE = re.compile(r"^(.*\S)\s+((?:18|19|20)\d\d)$")   # 'matrix 1999'
+ALT_TITLE_RE = re.compile(r"^(.*\S)\s*\(([^()]+)\)$")        # 'Amelie (Fabuleux destin d'Amélie Poulain, Le)'
+NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def split_year(title):
+    """'Toy Story (1995)' -> ('Toy Story', 1995); titles without a year get None."""
+    match = YEAR_RE.search(title)
+    if not match:
+        return title.strip(), None
+    return title[:match.start()].strip(), int(match.group(1))
+
+
+def normalize(name):
+    """Lowercase, strip accents and punctuation, and move MovieLens' trailing
+    articles back to the front ('Usual Suspects, The' -> 'the usual suspects')."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower().strip()
+    article = TRAILING_ARTICLE_RE.match(name)
+    if article:
+        name = f"{article.group(2)} {article.group(1)}"
+    return NON_ALNUM_RE.sub(" ", name).strip()
+
+
+def title_keys(name):
+    """Every key a title answers to: its normalized name, the name without a
+    leading article ('matrix' for 'Matrix, The'), and the same for a
+    MovieLens alternate title in parentheses and the name before it."""
+    names = [name]
+    alt = ALT_TITLE_RE.match(name)
+    if alt:
+        names += [alt.group(1), alt.group(2)]
+    keys = []
+    for part in names:
+        key = normalize(part)
+        for k in (key, LEADING_ARTICLE_RE.sub("", key)):
+            if k and k not in keys:
+                keys.append(k)
+    return keys
+
+
+def query_readings(query):
+    """(key, year) ways to read a query, most literal first: 'Death Race 2000'
+    is tried as a name before 2000 is taken as a bare year."""
+    name, year = split_year(query)
+    readings = [(name, year)]
+    if year is None:
+        bare = BARE_YEAR_RE.match(name)
+        if bare:
+            readings.append((bare.group(1), int(bare.group(2))))
+    keys = []
+    for name, year in readings:
+        key = normalize(name)
+        for k in (key, LEADING_ARTICLE_RE.sub("", key)):
+            if k and (k, year) not in keys:
+                keys.append((k, year))
+    return keys
+
+
+def with_year(key, year):
+    return f"{key} {year}" if year else key
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """Fuzzy title lookup built once over the catalog.
+
+    Exact normalized keys are a dict hit. Otherwise character trigram
+    postings pick a short list of candidates, and only those are scored
+    with difflib's SequenceMatcher, instead of the whole catalog. Like
+    difflib.get_close_matches over full titles, the ratio is taken against
+    the title with its year, so a short query needs more than a few shared
+    letters to clear the cutoff.
+    """
+
+    def __init__(self, titles, candidates=50):
+        self.titles = list(titles)
+        self.candidates = candidates
+        self.keys = []                # one entry per (title, key) pair
+        self.owners = []              # title row of each entry
+        self.years = np.zeros(len(self.titles), dtype=np.int32)  # 0 = no year
+        self.exact = defaultdict(list)
+
+        postings = defaultdict(list)
+        gram_counts = []
+        for i, title in enumerate(self.titles):
+            name, year = split_year(title)
+            self.years[i] = year or 0
+            for key in title_keys(name):
+                entry = len(self.keys)
+                self.keys.append(key)
+                self.owners.append(i)
+                self.exact[key].append(i)
+
+                grams = trigrams(key)
+                gram_counts.append(len(grams))
+                for gram in grams:
+                    postings[gram].append(entry)
+
+        self.postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+        self.gram_counts = np.array(gram_counts, dtype=np.int32)
+        self.owners = np.array(self.owners, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def _prefer_year(self, ids, year):
+        if year is None:
+            return ids
+        same = [i for i in ids if self.years[i] == year]
+        return same + [i for i in ids if self.years[i] != year]
+
+    def match(self, query, n=1, cutoff=0.6):
+        """Return up to `n` catalog titles closest to `query`, best first.
+
+        `cutoff` is a SequenceMatcher ratio, as in difflib.get_close_matches.
+        A year in the query ('Hamlet (1996)' or 'hamlet 1996') breaks ties
+        between titles that share a name.
+        """
+        readings = query_readings(query)
+        if not readings or not self.titles:
+            return []
+
+        for key, year in readings:
+            exact = self.exact.get(key)
+            if exact and len(exact) >= n:
+                return [self.titles[i] for i in self._prefer_year(exact, year)[:n]]
+
+        # Fuzzy matching reads a trailing number as a year when it can
+        key, year = readings[-1]
+        grams = trigrams(key)
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return []
+
+        # Dice coefficient over shared trigrams, computed only for keys that share any
+        touched, hits = np.unique(np.concatenate(lists), return_counts=True)
+        dice = 2.0 * hits / (len(grams) + self.gram_counts[touched])
+        if len(touched) > self.candidates:
+            keep = np.argpartition(-dice, self.candidates - 1)[:self.candidates]
+            touched = touched[keep]
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(with_year(key, year))
+        best = {}
+        for entry in touched:
+            i = int(self.owners[entry])
+            matcher.set_seq1(with_year(self.keys[entry], self.years[i]))
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= cutoff and ratio > best.get(i, 0.0):
+                best[i] = ratio
+
+        scored = sorted(((ratio, year is not None and self.years[i] == year, -i) for i, ratio in best.items()),
+                        reverse=True)
+        return [self.titles[-neg_i] for _, _, neg_i in scored[:n]]
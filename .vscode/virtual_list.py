@@ -0,0 +1,294 @@
+import tkinter as tk
+
+from movie_repository import PAGE_SIZE
+
+MAX_PAGES = 10  # fetched pages kept in memory; pages scrolled further away are dropped and refetched
+
+
+class VirtualList(tk.Frame):
+    """A Listbox that only ever holds the rows on screen.
+
+    Rows are movie documents, with their `_id`s kept in `ids` in display
+    order, so actions address the selected movie directly instead of
+    parsing the displayed text.
+
+    Rows are fetched a page at a time with `fetch(after, limit)`, where
+    `after` is the last row loaded so far (None for the first page), and
+    the next page is requested as the view scrolls within a screen of the
+    end. Scrolling re-renders the visible slice, so the widget costs the
+    same for 20 results as for 20,000.
+
+    At most `max_pages` fetched pages are held. Past that, the page furthest
+    from the view is dropped: pages after the view are fetched again from the
+    last row kept, and pages before it from the `after` row each was first
+    fetched with, so memory stays bounded however far the user scrolls.
+
+    With a TaskRunner, pages load in the background under `key`; without
+    one, they load inline.
+    """
+
+    def __init__(self, parent, width=100, height=20, tasks=None, key="rows", page_size=PAGE_SIZE,
+                 empty_text="No results.", on_error=None, max_pages=MAX_PAGES):
+        super().__init__(parent)
+        self.visible = height
+        self.tasks = tasks
+        self.key = key
+        self.page_size = page_size
+        self.max_pages = max(max_pages, 3)  # the page on screen and one either side
+        self.empty_text = empty_text
+        self.on_error = on_error
+
+        self.listbox = tk.Listbox(self, width=width, height=height, activestyle="none", exportselection=False)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.rows = []        # the rows held: a window of the result set
+        self.ids = []
+        self.pages = []       # [after, row count] of each page in `rows`, in order
+        self.dropped = []     # `after` of each page dropped before `rows`, in order
+        self.offset = 0       # result rows before `rows`
+        self.top = 0          # first visible row, as an index into `rows`
+        self.selected_index = None
+        self.selected_row = None
+        self.fetch = None
+        self.format_row = str
+        self.more = False
+        self.loading = False
+        self.generation = 0
+        self.message = None
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<MouseWheel>", lambda e: self._scroll_by(-3 if e.delta > 0 else 3))
+        self.listbox.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.listbox.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.listbox.bind("<Up>", lambda e: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda e: self._move_selection(1))
+        self.listbox.bind("<Prior>", lambda e: self._move_selection(-self.visible))
+        self.listbox.bind("<Next>", lambda e: self._move_selection(self.visible))
+
+    def bind_rows(self, sequence, callback):
+        """Bind an event on the rows (e.g. <Double-1>, <<ListboxSelect>>) after the widget's own handling."""
+        self.listbox.bind(sequence, callback, add="+")
+
+    def load(self, fetch=None, format_row=str, rows=()):
+        """Show a new result set: `rows` right away, then pages from `fetch` if given."""
+        if self.tasks is not None:
+            self.tasks.cancel(self.key)
+        self.generation += 1
+        self.rows = list(rows)
+        self.ids = [row["_id"] for row in self.rows]
+        self.pages = [[None, len(self.rows)]] if self.rows else []
+        self.dropped = []
+        self.offset = 0
+        self.top = 0
+        self.selected_index = None
+        self.selected_row = None
+        self.fetch = fetch
+        self.format_row = format_row
+        self.more = fetch is not None
+        self.loading = False
+        self.message = None
+        self._render()
+        self._fetch_if_needed()
+
+    def show_message(self, text):
+        """Replace the rows with a single, unselectable line of text."""
+        self.load()
+        self.message = text
+        self._render()
+
+    def clear(self):
+        self.load()
+
+    def selected(self):
+        """The selected row (still available after it was scrolled out of the held pages), or None."""
+        return self.selected_row
+
+    def selected_id(self):
+        movie = self.selected()
+        return movie["_id"] if movie else None
+
+    def remove(self, row_id):
+        """Drop a row (e.g. a deleted movie) without reloading; later pages still follow the last row."""
+        try:
+            index = self.ids.index(row_id)
+        except ValueError:
+            return
+        del self.ids[index]
+        del self.rows[index]
+        self._page_at(index)[1] -= 1
+        if self.selected_index is not None and self.selected_index >= index:
+            self.selected_index = None if self.selected_index == index else self.selected_index - 1
+        if self.selected_row is not None and self.selected_row["_id"] == row_id:
+            self.selected_row = None
+        self.top = max(0, min(self.top, len(self.rows) - self.visible))
+        self._render()
+        self._fetch_if_needed()
+
+    # --- Paging ---
+
+    def _page_at(self, index):
+        """The [after, count] entry of the page holding rows[index]."""
+        for page in self.pages:
+            if index < page[1]:
+                return page
+            index -= page[1]
+        return self.pages[-1]
+
+    def _fetch_if_needed(self):
+        if self.loading or self.fetch is None:
+            return
+        if self.more and self.top + 2 * self.visible >= len(self.rows):
+            after, before = (self.rows[-1] if self.rows else None), False
+        elif self.dropped and self.top < self.visible:
+            after, before = self.dropped[-1], True
+        else:
+            return
+        self.loading = True
+        generation = self.generation
+
+        def done(page):
+            if generation != self.generation:
+                return  # a newer result set replaced this one
+            self.loading = False
+            if before:
+                self._prepend(after, page)
+            else:
+                self.more = len(page) == self.page_size
+                if page:
+                    self.rows.extend(page)
+                    self.ids.extend(row["_id"] for row in page)
+                    self.pages.append([after, len(page)])
+            self._trim()
+            self._render()
+            self._fetch_if_needed()
+
+        def failed(error):
+            if generation != self.generation:
+                return
+            self.loading = False
+            self.more = False
+            self.dropped = []  # stop refetching too; what is held stays usable
+            if self.on_error:
+                self.on_error(error)
+
+        if self.tasks is not None:
+            self.tasks.submit(self.key, self.fetch, after, self.page_size,
+                              on_done=done, on_error=failed, status="Loading results...")
+        else:
+            try:
+                page = self.fetch(after, self.page_size)
+            except Exception as e:
+                failed(e)
+            else:
+                done(page)
+
+    def _prepend(self, after, page):
+        """Put a dropped page back in front of the held rows."""
+        self.dropped.pop()
+        # Rows added since the page was dropped may push it past the first held row: cut it there
+        if self.ids:
+            first = self.ids[0]
+            for i, row in enumerate(page):
+                if row["_id"] == first:
+                    page = page[:i]
+                    break
+        self.rows[:0] = page
+        self.ids[:0] = [row["_id"] for row in page]
+        self.pages.insert(0, [after, len(page)])
+        self.offset = max(0, self.offset - len(page)) if self.dropped else 0
+        self.top += len(page)
+        if self.selected_index is not None:
+            self.selected_index += len(page)
+
+    def _trim(self):
+        """Drop held pages beyond max_pages, furthest from the view first."""
+        while len(self.pages) > self.max_pages:
+            first_after, first_count = self.pages[0]
+            last_count = self.pages[-1][1]
+            above, below = self.top, len(self.rows) - self.top - self.visible
+            if first_count <= above and (above >= below or last_count > below):
+                # Refetched from the `after` it was first fetched with
+                self.pages.pop(0)
+                del self.rows[:first_count]
+                del self.ids[:first_count]
+                self.dropped.append(first_after)
+                self.offset += first_count
+                self.top -= first_count
+                if self.selected_index is not None:
+                    self.selected_index -= first_count
+                    if self.selected_index < 0:
+                        self.selected_index = None
+            elif last_count <= below:
+                # Refetched after the last row kept
+                self.pages.pop()
+                del self.rows[len(self.rows) - last_count:]
+                del self.ids[len(self.ids) - last_count:]
+                self.more = True
+                if self.selected_index is not None and self.selected_index >= len(self.rows):
+                    self.selected_index = None
+            else:
+                break  # every held page is on screen
+
+    # --- Rendering and scrolling ---
+
+    def _render(self):
+        self.listbox.delete(0, tk.END)
+        if not self.rows:
+            if self.message:
+                self.listbox.insert(tk.END, self.message)
+            elif self.fetch is not None and not (self.more or self.loading):
+                self.listbox.insert(tk.END, self.empty_text)  # the query ran and matched nothing
+            self.scrollbar.set(0.0, 1.0)
+            return
+
+        for row in self.rows[self.top:self.top + self.visible]:
+            self.listbox.insert(tk.END, self.format_row(row))
+        if self.selected_index is not None and self.top <= self.selected_index < self.top + self.visible:
+            self.listbox.selection_set(self.selected_index - self.top)
+            self.listbox.activate(self.selected_index - self.top)
+
+        total = self.offset + len(self.rows) + (self.page_size if self.more else 0)
+        first = self.offset + self.top
+        self.scrollbar.set(first / total, min((first + self.visible) / total, 1.0))
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, len(self.rows) - self.visible))
+        if top != self.top:
+            self.top = top
+            self._render()
+        self._fetch_if_needed()
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self.top + rows)
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            # Beyond the held rows, this stops at their edge and the next page loads from there
+            total = self.offset + len(self.rows) + (self.page_size if self.more else 0)
+            self._scroll_to(int(float(amount) * total) - self.offset)
+        else:
+            self._scroll_by(int(amount) * (self.visible if unit == "pages" else 1))
+
+    def _on_select(self, event):
+        selection = self.listbox.curselection()
+        if selection and self.rows:
+            self.selected_index = self.top + selection[0]
+            self.selected_row = self.rows[self.selected_index]
+
+    def _move_selection(self, step):
+        if not self.rows:
+            return "break"
+        current = self.top - 1 if self.selected_index is None else self.selected_index
+        self.selected_index = max(0, min(current + step, len(self.rows) - 1))
+        self.selected_row = self.rows[self.selected_index]
+        if self.selected_index < self.top:
+            self.top = self.selected_index
+        elif self.selected_index >= self.top + self.visible:
+            self.top = self.selected_index - self.visible + 1
+        self._render()
+        self._fetch_if_needed()
+        self.listbox.event_generate("<<ListboxSelect>>")
+        return "break"
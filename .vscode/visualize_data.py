@@ -1,30 +1,27 @@
-import pymongo
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+import movie_repository as repo
+import genre_stats
+import columnar_store
 
 # Set theme
 sns.set(style="whitegrid")
 
 # Connect to MongoDB
-client = pymongo.MongoClient("mongodb://localhost:27017/")
-db = client["movie_db"]
-collection = db["movies"]
+collection = repo.movies()
 
-# Load data into Pandas DataFrame
-movies = list(collection.find())
-df = pd.DataFrame(movies)
-
-# Drop missing/invalid rows
-df.dropna(subset=["genres", "rating"], inplace=True)
-
-# Explode genres list to rows
-df_exploded = df.explode("genres")
+# Per-genre aggregates come from the columnar snapshot when it is current,
+# otherwise from the server-side genre_stats collection;
+# only rated movies count, as the charts always have
+store = columnar_store.open_current()
+stats = pd.DataFrame(store.genre_stats() if store is not None else genre_stats.genre_stats())
+stats = stats[stats["rated"] > 0].set_index("genre")
 
 # -------------------------
 # 1. Genre Distribution Pie Chart
 # -------------------------
-genre_counts = df_exploded["genres"].value_counts().head(10)
+genre_counts = stats["rated"].sort_values(ascending=False).head(10)
 plt.figure(figsize=(8, 8))
 genre_counts.plot.pie(autopct="%1.1f%%", startangle=140)
 plt.title("Top 10 Genres Distribution")
@@ -36,7 +33,7 @@ plt.show()
 # -------------------------
 # 2. Average Rating per Genre
 # -------------------------
-avg_ratings = df_exploded.groupby("genres")["rating"].mean().sort_values(ascending=False).head(10)
+avg_ratings = stats["avg_rating"].sort_values(ascending=False).head(10)
 plt.figure(figsize=(10, 5))
 sns.barplot(x=avg_ratings.values, y=avg_ratings.index, palette="viridis")
 plt.title("Top 10 Genres by Average Rating")
@@ -49,7 +46,12 @@ plt.show()
 # -------------------------
 # 3. Top Rated Movies Overall
 # -------------------------
-top_movies = df.sort_values(by="rating", ascending=False).head(10)
+if store is not None:
+    top_movies = pd.DataFrame(store.records(store.top_rated(10)))
+else:
+    top_movies = pd.DataFrame(list(
+        collection.find({"rating": {"$ne": None}}, repo.TITLE_RATING_FIELDS).sort("rating", -1).limit(10)
+    ))
 plt.figure(figsize=(10, 5))
 sns.barplot(x=top_movies["rating"], y=top_movies["title"], palette="magma")
 plt.title("Top 10 Rated Movies")